@@ -1,6 +1,97 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento, Doacao
+from .models import (
+    User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento, Doacao, DoacaoArquivada, Tarefa,
+    BackfillProgresso,
+)
+from .eventos import registrar_criacoes, alterar_status
+
+
+class ContagemParcial(int):
+    """Contagem interrompida no limite: exibida como '10000+'"""
+
+    def __str__(self):
+        return f'{int(self)}+'
+
+
+class PaginatorContagemEstimada(Paginator):
+    """
+    Paginator que não executa COUNT(*) sobre a tabela inteira.
+
+    Sem filtros, no PostgreSQL, usa a estimativa de linhas do catálogo
+    (pg_class.reltuples). Nos demais casos conta no máximo `limite_contagem`
+    linhas, com um COUNT sobre uma subconsulta com LIMIT; se o limite é
+    atingido, a contagem é uma ContagemParcial. O changelist amplia o limite
+    até a página pedida e a seguinte, então as páginas além dele continuam
+    acessíveis pelo "próxima".
+    """
+    limite_contagem = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                linha = cursor.fetchone()
+            if linha and linha[0] > self.limite_contagem:
+                return int(linha[0])
+        contagem = queryset.values('pk')[:self.limite_contagem].count()
+        return ContagemParcial(contagem) if contagem >= self.limite_contagem else contagem
+
+
+class ChangelistGrandeMixin:
+    """
+    Configuração comum para changelists de tabelas grandes.
+
+    A busca resolve o termo primeiro nas tabelas pequenas relacionadas
+    (`busca_relacionada`: campo FK -> lookup no modelo relacionado) e filtra a
+    tabela grande pelas chaves estrangeiras indexadas, em vez de fazer LIKE
+    sobre três tabelas unidas. `search_fields` só habilita a caixa de busca.
+    """
+    paginator = PaginatorContagemEstimada
+    show_full_result_count = False
+    busca_relacionada = {}
+    limite_busca_relacionada = 200
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator = super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        pagina = request.GET.get(PAGE_VAR, '')
+        if pagina.isdigit():
+            # Conta o bastante para chegar à página pedida e saber se há uma seguinte
+            paginator.limite_contagem = max(paginator.limite_contagem, (int(pagina) + 1) * per_page + 1)
+        return paginator
+
+    def get_search_results(self, request, queryset, search_term):
+        termo = search_term.strip()
+        if not termo:
+            return queryset, False
+
+        filtro = Q()
+        if termo.isdigit():
+            filtro |= Q(pk=int(termo))
+        for campo, lookup in self.busca_relacionada.items():
+            relacionado = self.model._meta.get_field(campo).related_model
+            ids = list(
+                relacionado._default_manager.filter(**{lookup: termo})
+                .order_by()
+                .values_list('pk', flat=True)[:self.limite_busca_relacionada]
+            )
+            if ids:
+                filtro |= Q(**{f'{campo}__in': ids})
+
+        if not filtro:
+            return queryset.none(), False
+        return queryset.filter(filtro), False
 
 
 @admin.register(User)
@@ -21,6 +112,7 @@ class ONGAdmin(admin.ModelAdmin):
     list_filter = ['ativa', 'data_cadastro']
     search_fields = ['nome', 'cnpj', 'responsavel', 'email_contato']
     readonly_fields = ['data_cadastro']
+    autocomplete_fields = ['user']
     fieldsets = (
         ('Informações Básicas', {
             'fields': ('user', 'nome', 'cnpj', 'descricao', 'foto')
@@ -44,22 +136,36 @@ class CategoriaAlimentoAdmin(admin.ModelAdmin):
 class AlimentoAdmin(admin.ModelAdmin):
     list_display = ['nome', 'categoria', 'unidade_medida']
     list_filter = ['categoria', 'unidade_medida']
-    search_fields = ['nome', 'descricao']
+    search_fields = ['nome', 'sinonimos', 'descricao']
 
 
 @admin.register(NecessidadeAlimento)
-class NecessidadeAlimentoAdmin(admin.ModelAdmin):
-    list_display = ['ong', 'alimento', 'quantidade_necessaria', 'quantidade_recebida', 'prioridade', 'ativa']
-    list_filter = ['prioridade', 'ativa', 'ong']
+class NecessidadeAlimentoAdmin(ChangelistGrandeMixin, admin.ModelAdmin):
+    list_display = ['ong', 'alimento', 'quantidade_necessaria', 'quantidade_recebida', 'percentual_recebido', 'prioridade', 'ativa']
+    list_filter = ['prioridade', 'ativa']
+    list_select_related = ['ong', 'alimento']
     search_fields = ['ong__nome', 'alimento__nome']
-    readonly_fields = ['data_criacao']
+    busca_relacionada = {
+        'ong': 'nome__istartswith',
+        'alimento': 'nome__istartswith',
+    }
+    autocomplete_fields = ['ong', 'alimento']
+    readonly_fields = ['data_criacao', 'quantidade_faltante', 'percentual_recebido']
 
 
 @admin.register(Doacao)
-class DoacaoAdmin(admin.ModelAdmin):
+class DoacaoAdmin(ChangelistGrandeMixin, admin.ModelAdmin):
     list_display = ['doador', 'ong', 'alimento', 'quantidade', 'status', 'data_doacao']
-    list_filter = ['status', 'data_doacao', 'ong']
+    list_filter = ['status']
+    list_select_related = ['doador', 'ong', 'alimento']
+    date_hierarchy = 'data_doacao'
     search_fields = ['doador__username', 'ong__nome', 'alimento__nome']
+    busca_relacionada = {
+        'doador': 'username__iexact',
+        'ong': 'nome__istartswith',
+        'alimento': 'nome__istartswith',
+    }
+    autocomplete_fields = ['doador', 'ong', 'alimento']
     readonly_fields = ['data_doacao', 'data_atualizacao']
     fieldsets = (
         ('Informações da Doação', {
@@ -72,3 +178,56 @@ class DoacaoAdmin(admin.ModelAdmin):
             'fields': ('data_doacao', 'data_atualizacao')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        # Mudanças feitas pelo admin também entram no log de eventos
+        if obj.necessidade_id is None:
+            obj.necessidade = NecessidadeAlimento.objects.filter(ong=obj.ong, alimento=obj.alimento).first()
+        if not change:
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+                registrar_criacoes([obj])
+        elif 'status' in form.changed_data:
+            novo_status = obj.status
+            obj.status = form.initial['status']
+            with transaction.atomic():
+                alterar_status(obj, novo_status)
+                super().save_model(request, obj, form, change)
+        else:
+            super().save_model(request, obj, form, change)
+
+
+@admin.register(DoacaoArquivada)
+class DoacaoArquivadaAdmin(ChangelistGrandeMixin, admin.ModelAdmin):
+    list_display = ['id', 'doador', 'ong', 'alimento', 'quantidade', 'status', 'data_doacao', 'data_arquivamento']
+    list_filter = ['status']
+    list_select_related = ['doador', 'ong', 'alimento']
+    date_hierarchy = 'data_doacao'
+    search_fields = ['doador__username', 'ong__nome', 'alimento__nome']
+    busca_relacionada = DoacaoAdmin.busca_relacionada
+    
+    # O arquivo é somente leitura: as linhas chegam pelo manage.py arquivar_doacoes
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'status', 'tentativas', 'executar_em', 'concluida_em', 'data_criacao']
+    list_filter = ['status', 'nome']
+    readonly_fields = ['reserva', 'iniciada_em', 'concluida_em', 'erro', 'data_criacao']
+    paginator = PaginatorContagemEstimada
+    show_full_result_count = False
+
+
+@admin.register(BackfillProgresso)
+class BackfillProgressoAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'ultimo_id', 'linhas_processadas', 'lotes', 'iniciado_em', 'concluido_em']
+    readonly_fields = ['ultimo_id', 'linhas_processadas', 'lotes', 'iniciado_em', 'concluido_em', 'data_atualizacao']
+    
+    # Checkpoints são gravados por manage.py executar_backfill; apagar um recomeça o backfill
+    def has_add_permission(self, request):
+        return False
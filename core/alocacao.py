@@ -0,0 +1,116 @@
+"""
+Alocação de uma doação grande entre várias necessidades.
+
+Dado um alimento e uma quantidade total, planejar() carrega de uma vez as
+necessidades ativas candidatas (uma consulta com values_list, mais uma para
+as doações ainda pendentes) e distribui a quantidade de forma gulosa:
+primeiro a prioridade mais alta, depois a maior quantidade restante, depois a
+necessidade mais antiga (menor id). As candidatas ficam em um heap (heapify é
+O(n)), e só as k necessidades efetivamente atendidas são retiradas dele, em
+O(k log n); não é preciso ordenar todas as dezenas de milhares de candidatas.
+
+alocar() grava as doações resultantes em lote, com os eventos de criação e as
+notificações das ONGs, em uma única transação.
+"""
+import heapq
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .eventos import registrar_criacoes
+from .models import Doacao, NecessidadeAlimento
+from .notificacoes import notificar_ong_nova_doacao
+
+PESO_PRIORIDADE = {'urgente': 3, 'alta': 2, 'media': 1, 'baixa': 0}
+
+
+class Parcela:
+    """Parte da doação destinada a uma necessidade"""
+    __slots__ = ('necessidade_id', 'ong_id', 'quantidade', 'restante')
+
+    def __init__(self, necessidade_id, ong_id, quantidade, restante):
+        self.necessidade_id = necessidade_id
+        self.ong_id = ong_id
+        self.quantidade = quantidade
+        self.restante = restante
+
+
+def candidatas(alimento_id, regiao=None):
+    """[(necessidade_id, ong_id, prioridade, restante)] com restante efetivo > 0"""
+    necessidades = NecessidadeAlimento.objects.filter(
+        alimento_id=alimento_id,
+        ativa=True,
+        ong__ativa=True,
+        quantidade_faltante__gt=0,
+    )
+    doacoes = Doacao.objects.filter(alimento_id=alimento_id, status='pendente')
+    if regiao:
+        # ONG não tem campos de região: filtra pelo endereço (cidade, UF, bairro...)
+        necessidades = necessidades.filter(ong__endereco_completo__icontains=regiao)
+        doacoes = doacoes.filter(ong__endereco_completo__icontains=regiao)
+
+    # Doações pendentes já prometidas descontam do que falta; confirmadas já entraram
+    # em quantidade_recebida (registrar_recebimento) e não podem contar duas vezes
+    pendentes = dict(doacoes.order_by().values_list('ong_id').annotate(total=Sum('quantidade')))
+
+    # Sem data_criacao: o id já segue a ordem de criação, e converter datas dobraria o custo da carga
+    resultado = []
+    for necessidade_id, ong_id, prioridade, faltante in necessidades.order_by().values_list(
+        'id', 'ong_id', 'prioridade', 'quantidade_faltante'
+    ):
+        restante = faltante - pendentes.get(ong_id, Decimal('0'))
+        if restante > 0:
+            resultado.append((necessidade_id, ong_id, prioridade, restante))
+    return resultado
+
+
+def planejar(alimento_id, quantidade, regiao=None, minimo=Decimal('0'), max_parcelas=None, candidatos=None):
+    """
+    Divide `quantidade` entre as necessidades candidatas.
+
+    Parcelas menores que `minimo` só são criadas quando completam a
+    necessidade. Retorna (parcelas, sobra não alocada).
+    """
+    quantidade = Decimal(quantidade)
+    if candidatos is None:
+        candidatos = candidatas(alimento_id, regiao)
+
+    # Menor tupla sai primeiro: maior prioridade, maior restante, necessidade mais antiga (menor id)
+    heap = [
+        (-PESO_PRIORIDADE.get(prioridade, 0), -restante, necessidade_id, ong_id, restante)
+        for necessidade_id, ong_id, prioridade, restante in candidatos
+    ]
+    heapq.heapify(heap)
+
+    parcelas = []
+    sobra = quantidade
+    while heap and sobra > 0 and (max_parcelas is None or len(parcelas) < max_parcelas):
+        *_, necessidade_id, ong_id, restante = heapq.heappop(heap)
+        parte = min(restante, sobra)
+        if parte < minimo and parte < restante:
+            continue
+        parcelas.append(Parcela(necessidade_id, ong_id, parte, restante))
+        sobra -= parte
+    return parcelas, sobra
+
+
+def alocar(doador, alimento_id, quantidade, regiao=None, mensagem='', **opcoes):
+    """Planeja e cria as doações em lote; retorna (doações criadas, sobra)"""
+    with transaction.atomic():
+        parcelas, sobra = planejar(alimento_id, quantidade, regiao, **opcoes)
+        doacoes = Doacao.objects.bulk_create([
+            Doacao(
+                doador=doador,
+                ong_id=parcela.ong_id,
+                alimento_id=alimento_id,
+                necessidade_id=parcela.necessidade_id,
+                quantidade=parcela.quantidade,
+                mensagem=mensagem,
+                status='pendente',
+            )
+            for parcela in parcelas
+        ])
+        registrar_criacoes(doacoes)
+        notificar_ong_nova_doacao.enfileirar_lote([(doacao.id,) for doacao in doacoes])
+    return doacoes, sobra
@@ -0,0 +1,285 @@
+"""
+Eventos ao vivo (Server-Sent Events) do progresso das necessidades e das doações.
+
+O log DoacaoEvento é a fonte: cada processo ASGI tem um único Distribuidor,
+que lê o log a partir do último id visto e repassa as mensagens às filas dos
+assinantes conectados (pub/sub em memória, por canal). Quem grava eventos
+chama notificar() após o commit, acordando o leitor do próprio processo na
+hora; os demais workers veem os eventos na consulta periódica do log
+(AO_VIVO['intervalo_consulta']), que só acontece enquanto há assinantes.
+
+Conexões paradas não custam consultas nem threads: cada uma é só uma fila
+e uma corrotina esperando por ela, com um comentário de keep-alive a cada
+AO_VIVO['heartbeat'] segundos. O id de cada mensagem é o id do evento, então
+o navegador reconecta com Last-Event-ID e recebe o que perdeu.
+
+Sob WSGI não há fluxo: a view responde 204 (o EventSource não reconecta) e
+o contexto `ao_vivo_disponivel` deixa o script fora das páginas.
+
+Canais:
+- catalogo: progresso de todas as necessidades;
+- categoria:<id>: progresso das necessidades de alimentos da categoria;
+- ong:<id>: progresso das necessidades da ONG;
+- doacoes:<id>: doações novas e mudanças de status da ONG (só para a própria ONG).
+"""
+import asyncio
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError
+from django.db.models import Max, Q
+
+from .catalogo import catalogo
+from .models import DoacaoEvento, NecessidadeAlimento
+
+CANAL_VALIDO = re.compile(r'^(catalogo|(categoria|ong|doacoes):\d+)$')
+# Uma doação pendente que passa a um destes status soma à quantidade recebida da necessidade
+STATUS_RECEBIDOS = ('confirmada', 'entregue')
+
+logger = logging.getLogger(__name__)
+
+
+def _config():
+    return settings.AO_VIVO
+
+
+def disponivel(request):
+    """Eventos ao vivo só existem quando o servidor é ASGI"""
+    return isinstance(request, ASGIRequest)
+
+
+def contexto(request):
+    """Context processor: as páginas só incluem o script dos eventos ao vivo sob ASGI"""
+    return {'ao_vivo_disponivel': disponivel(request)}
+
+
+class Mensagem:
+    """Evento SSE destinado a um ou mais canais"""
+    __slots__ = ('id', 'canais', 'tipo', 'dados')
+
+    def __init__(self, id, canais, tipo, dados):
+        self.id = id
+        self.canais = canais
+        self.tipo = tipo
+        self.dados = dados
+
+    def sse(self):
+        dados = json.dumps(self.dados, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return f'id: {self.id}\nevent: {self.tipo}\ndata: {dados}\n\n'
+
+
+def _recebimento(evento):
+    return evento.status_anterior == 'pendente' and evento.status_novo in STATUS_RECEBIDOS
+
+
+def mensagens(eventos):
+    """Mensagens dos eventos do log; o progresso das necessidades vem de uma única consulta"""
+    recebidas = {(e.ong_id, e.alimento_id) for e in eventos if _recebimento(e)}
+    progresso = {}
+    if recebidas:
+        filtro = Q()
+        for ong_id, alimento_id in recebidas:
+            filtro |= Q(ong_id=ong_id, alimento_id=alimento_id)
+        for linha in NecessidadeAlimento.objects.filter(filtro).values(
+            'id', 'ong_id', 'alimento_id', 'quantidade_necessaria', 'quantidade_recebida',
+            'quantidade_faltante', 'percentual_recebido', 'ativa',
+        ):
+            progresso[linha['ong_id'], linha['alimento_id']] = linha
+
+    indice = catalogo()
+    resultado = []
+    for evento in eventos:
+        alimento = indice.alimento(evento.alimento_id)
+        resultado.append(Mensagem(evento.id, (f'doacoes:{evento.ong_id}',), 'doacao', {
+            'doacao_id': evento.doacao_id,
+            'status': evento.status_novo,
+            'status_anterior': evento.status_anterior,
+            'quantidade': evento.quantidade,
+            'alimento_id': evento.alimento_id,
+            'alimento': alimento.nome if alimento else '',
+        }))
+        necessidade = progresso.get((evento.ong_id, evento.alimento_id)) if _recebimento(evento) else None
+        if necessidade:
+            canais = [f'ong:{evento.ong_id}', 'catalogo']
+            if alimento and alimento.categoria_id:
+                canais.append(f'categoria:{alimento.categoria_id}')
+            resultado.append(Mensagem(evento.id, tuple(canais), 'progresso', {
+                'necessidade_id': necessidade['id'],
+                'ong_id': necessidade['ong_id'],
+                'alimento_id': necessidade['alimento_id'],
+                'quantidade_necessaria': necessidade['quantidade_necessaria'],
+                'quantidade_recebida': necessidade['quantidade_recebida'],
+                'quantidade_faltante': necessidade['quantidade_faltante'],
+                'percentual_recebido': necessidade['percentual_recebido'],
+                'ativa': necessidade['ativa'],
+            }))
+    return resultado
+
+
+def _ultimo_evento():
+    return DoacaoEvento.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+
+def ler_log(desde, limite=500):
+    """(mensagens dos eventos após `desde`, novo último id)"""
+    eventos = list(DoacaoEvento.objects.filter(id__gt=desde).order_by('id')[:limite])
+    return mensagens(eventos), (eventos[-1].id if eventos else desde)
+
+
+def reenviar(canais, desde):
+    """Mensagens perdidas desde o id `desde` (Last-Event-ID), limitadas a AO_VIVO['max_reenvio'] eventos"""
+    filtro = Q()
+    recebidas = Q()
+    todas_recebidas = False
+    for canal in canais:
+        nome, _, valor = canal.partition(':')
+        if nome == 'doacoes':
+            filtro |= Q(ong_id=valor)
+        elif nome == 'ong':
+            recebidas |= Q(ong_id=valor)
+        elif nome == 'categoria':
+            recebidas |= Q(alimento_id__in=[a.id for a in catalogo().alimentos_da_categoria(valor)])
+        elif nome == 'catalogo':
+            todas_recebidas = True
+    recebimento = Q(status_anterior='pendente', status_novo__in=STATUS_RECEBIDOS)
+    if todas_recebidas:
+        filtro |= recebimento
+    elif recebidas:
+        filtro |= recebidas & recebimento
+    if not filtro:
+        return []
+    eventos = list(
+        DoacaoEvento.objects.filter(filtro, id__gt=desde).order_by('id')[:_config()['max_reenvio']]
+    )
+    canais = set(canais)
+    return [mensagem for mensagem in mensagens(eventos) if canais.intersection(mensagem.canais)]
+
+
+class Assinante:
+    """Conexão SSE: canais assinados e fila limitada de mensagens pendentes"""
+    __slots__ = ('canais', 'fila', 'ultimo_id', 'descartado')
+
+    def __init__(self, canais, tamanho_fila):
+        self.canais = canais
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.ultimo_id = 0
+        self.descartado = False
+
+    def entregar(self, mensagem):
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            # Cliente lento: a conexão é encerrada e ele reconecta com Last-Event-ID
+            self.descartado = True
+
+
+class Distribuidor:
+    """Pub/sub do processo: um único leitor do log repassa as mensagens aos assinantes"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.assinantes = {}
+        self.total = 0
+        self.acordar = asyncio.Event()
+        self.pronto = asyncio.Event()
+        self.ultimo_id = 0
+        self.tarefa = None
+
+    def assinar(self, canais):
+        assinante = Assinante(tuple(canais), _config()['max_fila'])
+        for canal in assinante.canais:
+            self.assinantes.setdefault(canal, set()).add(assinante)
+        self.total += 1
+        if self.tarefa is None or self.tarefa.done():
+            self.pronto.clear()
+            self.tarefa = self.loop.create_task(self._ler())
+        return assinante
+
+    def cancelar(self, assinante):
+        for canal in assinante.canais:
+            conjunto = self.assinantes.get(canal)
+            if conjunto is not None:
+                conjunto.discard(assinante)
+                if not conjunto:
+                    del self.assinantes[canal]
+        self.total -= 1
+
+    def publicar(self, mensagem):
+        alvos = set()
+        for canal in mensagem.canais:
+            alvos.update(self.assinantes.get(canal, ()))
+        for assinante in alvos:
+            if not assinante.descartado:
+                assinante.entregar(mensagem)
+
+    async def _ler(self):
+        self.ultimo_id = await sync_to_async(_ultimo_evento)()
+        self.pronto.set()
+        intervalo = _config()['intervalo_consulta']
+        while self.total:
+            try:
+                await asyncio.wait_for(self.acordar.wait(), timeout=intervalo)
+            except TimeoutError:
+                pass
+            self.acordar.clear()
+            try:
+                lidas, self.ultimo_id = await sync_to_async(ler_log)(self.ultimo_id)
+            except DatabaseError:
+                # Falha passageira do banco: tenta de novo na próxima rodada sem derrubar as conexões
+                logger.exception('Falha ao ler o log de eventos')
+                continue
+            for mensagem in lidas:
+                self.publicar(mensagem)
+
+
+_distribuidor = None
+
+
+def distribuidor():
+    """Distribuidor do event loop atual"""
+    global _distribuidor
+    loop = asyncio.get_running_loop()
+    if _distribuidor is None or _distribuidor.loop is not loop:
+        _distribuidor = Distribuidor(loop)
+    return _distribuidor
+
+
+def notificar():
+    """Acorda o leitor do log deste processo; seguro para chamar de qualquer thread"""
+    atual = _distribuidor
+    if atual is None or atual.tarefa is None or atual.tarefa.done():
+        return
+    try:
+        atual.loop.call_soon_threadsafe(atual.acordar.set)
+    except RuntimeError:
+        # Event loop já encerrado
+        pass
+
+
+async def fluxo(canais, ultimo_id=None):
+    """Corpo da resposta SSE: reenvio desde `ultimo_id`, depois as mensagens ao vivo"""
+    atual = distribuidor()
+    assinante = atual.assinar(canais)
+    try:
+        yield f'retry: {_config()["reconexao_ms"]}\n\n'
+        # Só depois que o leitor fixou sua posição no log: o que vier antes dela sai no reenvio
+        await atual.pronto.wait()
+        if ultimo_id is not None:
+            for mensagem in await sync_to_async(reenviar)(assinante.canais, ultimo_id):
+                assinante.ultimo_id = mensagem.id
+                yield mensagem.sse()
+        while not assinante.descartado:
+            try:
+                mensagem = await asyncio.wait_for(assinante.fila.get(), timeout=_config()['heartbeat'])
+            except TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if mensagem.id > assinante.ultimo_id:
+                yield mensagem.sse()
+    finally:
+        atual.cancelar(assinante)
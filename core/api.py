@@ -0,0 +1,101 @@
+"""
+Views da API REST (Django REST Framework).
+
+Separadas de core.views porque importar o DRF custa dezenas de milissegundos
+(rest_framework.views puxa serializers, pygments, coreapi...). core.urls
+referencia estas views por nome e só importa este módulo na primeira
+requisição à API, então o boot do worker, os comandos de manage.py e as
+páginas HTML não pagam esse custo.
+"""
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import serializadores, sincronizacao
+from .catalogo import catalogo
+from .historico import contagem_status_historico
+from .models import ONG, NecessidadeAlimento, Doacao, DoacaoArquivada
+
+
+@api_view(['GET'])
+def api_status(request):
+    """Endpoint de API para verificar o status do sistema"""
+    return Response({
+        'status': 'online',
+        'message': 'Alimenta+ API está funcionando!',
+        'total_ongs': ONG.objects.filter(ativa=True).count(),
+        'total_necessidades': NecessidadeAlimento.objects.filter(ativa=True).count(),
+        'total_doacoes': sum(contagem_status_historico().values()),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_sincronizar(request):
+    """ONGs, necessidades e doações do usuário alteradas desde o cursor"""
+    try:
+        return Response(sincronizacao.alteracoes(request.user, request.query_params.get('cursor', '')))
+    except sincronizacao.CursorInvalido:
+        return Response({'erro': 'Cursor inválido.'}, status=400)
+
+
+def _parametro_inteiro(request, nome, padrao=None, minimo=None, maximo=None):
+    valor = request.query_params.get(nome, '')
+    if not valor.isdigit():
+        return padrao
+    valor = int(valor)
+    if minimo is not None:
+        valor = max(valor, minimo)
+    return min(valor, maximo) if maximo else valor
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_necessidades(request):
+    """Necessidades ativas, paginadas por id (?apos=<id>), com filtros por ONG, alimento e categoria"""
+    limite = _parametro_inteiro(request, 'limite', 100, minimo=1, maximo=1000)
+    necessidades = NecessidadeAlimento.objects.filter(ativa=True, ong__ativa=True)
+    for parametro in ('ong', 'alimento'):
+        valor = _parametro_inteiro(request, parametro)
+        if valor is not None:
+            necessidades = necessidades.filter(**{f'{parametro}_id': valor})
+    categoria = _parametro_inteiro(request, 'categoria')
+    if categoria is not None:
+        necessidades = necessidades.filter(
+            alimento_id__in=[a.id for a in catalogo().alimentos_da_categoria(categoria)]
+        )
+    apos = _parametro_inteiro(request, 'apos')
+    if apos is not None:
+        necessidades = necessidades.filter(id__gt=apos)
+    
+    resultados = serializadores.NecessidadeLeitura().serializar(necessidades.order_by('id')[:limite])
+    return Response({
+        'resultados': resultados,
+        'proximo': resultados[-1]['id'] if len(resultados) == limite else None,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_minhas_doacoes(request):
+    """Doações do usuário, incluindo as arquivadas, da mais recente (?antes=<id>)"""
+    limite = _parametro_inteiro(request, 'limite', 100, minimo=1, maximo=1000)
+    filtros = {'doador': request.user}
+    antes = _parametro_inteiro(request, 'antes')
+    if antes is not None:
+        filtros['id__lt'] = antes
+    
+    # Uma consulta só (UNION ALL) sobre a tabela quente e o arquivo
+    campos = serializadores.DoacaoLeitura.campos
+    doacoes = (
+        Doacao.objects.filter(**filtros).order_by().values(*campos)
+        .union(DoacaoArquivada.objects.filter(**filtros).order_by().values(*campos), all=True)
+        .order_by('-id')[:limite]
+    )
+    leitura = serializadores.DoacaoLeitura()
+    indice = catalogo()
+    resultados = [leitura.formatar(linha, indice) for linha in doacoes]
+    return Response({
+        'resultados': resultados,
+        'proximo': resultados[-1]['id'] if len(resultados) == limite else None,
+    })
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registra os consumidores do log de eventos, as tarefas em segundo plano,
+        # a invalidação do catálogo em memória, os backfills e a faixa de ids dos shards
+        from . import catalogo, consumidores, notificacoes, preenchimentos, shards  # noqa: F401
+
+        # Aqui, e não só em uma verificação do sistema: servidores WSGI/ASGI e comandos
+        # com requires_system_checks = [] não rodam as verificações
+        shards.recusar_shards_ativos()
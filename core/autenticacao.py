@@ -0,0 +1,100 @@
+"""
+Autenticação assíncrona com o hash de senha fora do event loop.
+
+O aauthenticate() padrão do Django calcula o PBKDF2 na thread do event loop,
+travando o worker ASGI inteiro por dezenas de milissegundos a cada login.
+BackendHashEmPool envia a verificação e o recálculo do hash para um pool
+limitado de threads (o hashlib libera o GIL durante o PBKDF2) ou de processos,
+configurado por SENHAS_POOL_TIPO e SENHAS_POOL_TAMANHO.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+_pool = None
+_trava_pool = threading.Lock()
+
+
+def pool_hash():
+    """Pool compartilhado pelo processo, criado no primeiro uso"""
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            if settings.SENHAS_POOL_TIPO == 'processos':
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.SENHAS_POOL_TAMANHO,
+                    initializer=django.setup
+                )
+            else:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.SENHAS_POOL_TAMANHO,
+                    thread_name_prefix='hash-senha'
+                )
+        return _pool
+
+
+def encerrar_pool():
+    """Encerra o pool; o próximo uso cria outro com a configuração vigente"""
+    global _pool
+    with _trava_pool:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def hashes_em_paralelo(senhas, processos=None, tamanho_bloco=8):
+    """
+    Hashes das senhas, na mesma ordem, calculados em um pool de processos dedicado.
+
+    Para importações em massa: usa todos os núcleos (ou `processos`) e devolve
+    os hashes à medida que ficam prontos, então o chamador pode gravar os
+    primeiros lotes enquanto os demais ainda são calculados.
+    """
+    processos = processos or os.cpu_count() or 1
+    if processos == 1:
+        yield from map(make_password, senhas)
+        return
+    with ProcessPoolExecutor(max_workers=processos, initializer=django.setup) as pool:
+        yield from pool.map(make_password, senhas, chunksize=tamanho_bloco)
+
+
+async def no_pool(func, *args):
+    """Executa func(*args) no pool de hash sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool_hash(), partial(func, *args))
+
+
+class BackendHashEmPool(ModelBackend):
+    """ModelBackend cuja versão assíncrona calcula os hashes no pool"""
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Calcula um hash mesmo assim, para não revelar quais usuários existem pelo tempo de resposta
+            await no_pool(make_password, password)
+            return None
+
+        correta, desatualizada = await no_pool(verify_password, password, user.password)
+        if not correta or not self.user_can_authenticate(user):
+            return None
+
+        if desatualizada:
+            # Parâmetros do hasher mudaram: regrava o hash com a configuração atual
+            user.password = await no_pool(make_password, password)
+            await user.asave(update_fields=['password'])
+        return user
@@ -0,0 +1,98 @@
+"""
+Backfills online: migrações de dados executadas em lotes, fora das migrações.
+
+Uma migração de dados do Django reescreve a tabela inteira em uma única
+transação. Um Backfill percorre a tabela pela chave primária em lotes
+pequenos, cada um em sua própria transação, junto com o checkpoint gravado
+em BackfillProgresso: uma execução interrompida retoma do último lote
+confirmado. Só as linhas existentes no início da execução são percorridas;
+as novas já devem ser gravadas corretamente pelo código da aplicação.
+
+Backfills são subclasses de Backfill registradas com @registrar_backfill
+(ver core/preenchimentos.py) e executadas por manage.py executar_backfill.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import BackfillProgresso
+
+
+class Backfill:
+    """
+    Base para backfills.
+
+    Subclasses definem `nome` e `modelo` e implementam `processar(lote)`, que
+    recebe um queryset com as linhas de um trecho da chave primária e retorna
+    quantas alterou. `pendentes(queryset)` pode restringir o lote às linhas
+    que ainda precisam de trabalho.
+    """
+    nome = None
+    modelo = None
+    tamanho_lote = 1000
+
+    def pendentes(self, queryset):
+        return queryset
+
+    def processar(self, lote):
+        raise NotImplementedError
+
+
+_backfills = {}
+
+
+def registrar_backfill(cls):
+    """Decorador que registra uma subclasse de Backfill"""
+    if cls.nome in _backfills:
+        raise ValueError(f'Backfill {cls.nome!r} já registrado')
+    _backfills[cls.nome] = cls()
+    return cls
+
+
+def backfills():
+    return dict(_backfills)
+
+
+def executar(backfill, tamanho_lote=None, pausa=0.0, max_lotes=None, reiniciar=False, ao_concluir_lote=None):
+    """
+    Executa (ou retoma) o backfill até o fim ou até `max_lotes` lotes.
+
+    `ao_concluir_lote(progresso, linhas, alteradas, segundos)` é chamado
+    depois de cada lote confirmado. Retorna o BackfillProgresso atualizado.
+    """
+    tamanho_lote = tamanho_lote or backfill.tamanho_lote
+    if reiniciar:
+        BackfillProgresso.objects.filter(nome=backfill.nome).delete()
+    progresso, _ = BackfillProgresso.objects.get_or_create(nome=backfill.nome)
+    if progresso.concluido_em:
+        return progresso
+
+    ultimo_existente = backfill.modelo.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            progresso = BackfillProgresso.objects.select_for_update().get(nome=backfill.nome)
+            # Paginação pela chave (keyset): ids esparsos não geram lotes vazios
+            ids = list(
+                backfill.modelo.objects.filter(pk__gt=progresso.ultimo_id, pk__lte=ultimo_existente)
+                .order_by('pk').values_list('pk', flat=True)[:tamanho_lote]
+            )
+            if not ids:
+                progresso.concluido_em = timezone.now()
+                progresso.save(update_fields=['concluido_em', 'data_atualizacao'])
+                break
+            lote = backfill.pendentes(backfill.modelo.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]))
+            alteradas = backfill.processar(lote)
+            progresso.ultimo_id = ids[-1]
+            progresso.linhas_processadas += len(ids)
+            progresso.lotes += 1
+            progresso.save(update_fields=['ultimo_id', 'linhas_processadas', 'lotes', 'data_atualizacao'])
+        lotes += 1
+        if ao_concluir_lote:
+            ao_concluir_lote(progresso, len(ids), alteradas, time.perf_counter() - inicio)
+        if pausa:
+            time.sleep(pausa)
+    return progresso
@@ -0,0 +1,100 @@
+"""
+Utilitários compartilhados pelos comandos `manage.py benchmark_*`.
+
+Os benchmarks rodam em um banco de teste descartável, criado e destruído
+pelo próprio comando, para não tocar nos dados reais.
+"""
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def banco_descartavel():
+    """Cria um banco de teste com as migrações aplicadas e o remove ao final"""
+    nome_original = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        # Arquivo em vez de memória: visível para várias threads e processos ao mesmo tempo
+        diretorio = tempfile.mkdtemp(prefix='alimenta-benchmark-')
+        connection.settings_dict['TEST']['NAME'] = str(Path(diretorio) / 'benchmark.sqlite3')
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def shards_descartaveis(quantidade):
+    """
+    Registra `quantidade` shards SQLite temporários em settings.SHARDS, já migrados.
+
+    Os aliases só existem durante o bloco; os arquivos são apagados ao final.
+    """
+    diretorio = tempfile.mkdtemp(prefix='alimenta-shards-')
+    aliases = [f'shard_{indice}' for indice in range(quantidade)]
+    novos = {
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(Path(diretorio) / f'{alias}.sqlite3'),
+            # Escritores concorrentes esperam a trava do arquivo em vez de falhar
+            'OPTIONS': {'timeout': 60, 'transaction_mode': 'IMMEDIATE'},
+        }
+        for alias in aliases
+    }
+    # configure_settings completa as chaves padrão (ATOMIC_REQUESTS, TEST...) e exige 'default'
+    connections.settings.update(connections.configure_settings({**connections.settings, **novos}))
+    try:
+        with override_settings(SHARDS=aliases):
+            for alias in aliases:
+                call_command('migrate', database=alias, verbosity=0)
+            yield aliases
+    finally:
+        for alias in aliases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+class Cronometro:
+    """Acumula durações (em segundos) de operações repetidas"""
+
+    def __init__(self):
+        self.duracoes = []
+
+    @contextmanager
+    def medir(self):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.duracoes.append(time.perf_counter() - inicio)
+
+    def resumo(self):
+        """p50, p95 e máximo em milissegundos"""
+        if not self.duracoes:
+            return {'n': 0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        ordenadas = sorted(self.duracoes)
+        return {
+            'n': len(ordenadas),
+            'p50': statistics.median(ordenadas) * 1000,
+            'p95': ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))] * 1000,
+            'max': ordenadas[-1] * 1000,
+        }
+
+
+def formatar_resumo(rotulo, resumo):
+    return (
+        f"{rotulo:<28} n={resumo['n']:<5} p50={resumo['p50']:8.1f} ms  "
+        f"p95={resumo['p95']:8.1f} ms  max={resumo['max']:8.1f} ms"
+    )
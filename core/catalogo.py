@@ -0,0 +1,238 @@
+"""
+Snapshot imutável, em memória, do catálogo de alimentos.
+
+Categorias e alimentos quase nunca mudam, então cada processo carrega o
+catálogo uma vez (duas consultas) e passa a resolver alimentos e categorias
+por id sem tocar no banco. O snapshot guarda um carimbo de versão que fica
+no banco (VersaoCatalogo), então vale para todos os processos: salvar ou
+apagar uma categoria ou um alimento troca o carimbo na mesma transação. Cada
+processo relê o carimbo no máximo a cada CATALOGO['intervalo_versao']
+segundos; o processo que fez a alteração recarrega já no próximo acesso.
+
+Operações que não disparam sinais (bulk_create, update) devem chamar
+invalidar() depois de alterar o catálogo.
+
+Cada snapshot traz também um índice de prefixos (IndicePrefixos) sobre nomes
+e sinônimos sem acentos, usado pelo autocompletar de alimentos; ele é
+montado junto com o snapshot, então acompanha o mesmo carimbo de versão.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Alimento, CategoriaAlimento, VersaoCatalogo
+
+UNIDADES = dict(Alimento._meta.get_field('unidade_medida').choices)
+
+
+def normalizar_nome(nome):
+    """Nome sem acentos, minúsculo e com espaços simples, para comparação"""
+    decomposto = unicodedata.normalize('NFKD', str(nome))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+class CategoriaInfo:
+    """Categoria de alimento, somente leitura"""
+    __slots__ = ('id', 'nome', 'descricao')
+
+    def __init__(self, id, nome, descricao):
+        self.id = id
+        self.nome = nome
+        self.descricao = descricao
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.nome
+
+
+def separar_sinonimos(texto):
+    """Sinônimos do campo Alimento.sinonimos (separados por vírgula, ponto e vírgula ou linha)"""
+    return tuple(sinonimo.strip() for sinonimo in re.split(r'[,;\n]', texto or '') if sinonimo.strip())
+
+
+class AlimentoInfo:
+    """Alimento com a categoria já resolvida, somente leitura"""
+    __slots__ = ('id', 'nome', 'descricao', 'unidade_medida', 'categoria', 'sinonimos')
+
+    def __init__(self, id, nome, descricao, unidade_medida, categoria, sinonimos=()):
+        self.id = id
+        self.nome = nome
+        self.descricao = descricao
+        self.unidade_medida = unidade_medida
+        self.categoria = categoria
+        self.sinonimos = sinonimos
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def categoria_id(self):
+        return self.categoria.id if self.categoria else None
+
+    def get_unidade_medida_display(self):
+        return UNIDADES.get(self.unidade_medida, self.unidade_medida)
+
+    def __str__(self):
+        return f"{self.nome} ({self.get_unidade_medida_display()})"
+
+
+class IndicePrefixos:
+    """
+    Busca por prefixo, sem acentos e sem caixa, em nomes e sinônimos de alimentos.
+
+    Cada nível é um par de tuplas ordenadas (chaves, ids) consultado com
+    bisect: a busca custa O(log n) mais os resultados devolvidos. Os níveis
+    definem a relevância: início do nome, início de um sinônimo e, por fim,
+    início de outra palavra do nome ou de um sinônimo ('preto' acha
+    'Feijão Preto'). Dentro de um nível, ordem alfabética.
+    """
+
+    def __init__(self, alimentos):
+        niveis = ([], [], [])
+        for alimento in alimentos:
+            nome = normalizar_nome(alimento.nome)
+            sinonimos = [normalizar_nome(sinonimo) for sinonimo in alimento.sinonimos]
+            niveis[0].append((nome, alimento.id))
+            niveis[1].extend((sinonimo, alimento.id) for sinonimo in sinonimos)
+            for texto in (nome, *sinonimos):
+                palavras = texto.split(' ')
+                niveis[2].extend((' '.join(palavras[i:]), alimento.id) for i in range(1, len(palavras)))
+        self._niveis = tuple(tuple(zip(*sorted(set(nivel)))) or ((), ()) for nivel in niveis)
+
+    def buscar(self, prefixo, limite=10):
+        """Ids dos alimentos cujo nome, sinônimo ou palavra começa com `prefixo`, dos mais relevantes"""
+        prefixo = normalizar_nome(prefixo)
+        if not prefixo or limite <= 0:
+            return []
+        encontrados = {}
+        for chaves, ids in self._niveis:
+            posicao = bisect_left(chaves, prefixo)
+            while posicao < len(chaves) and chaves[posicao].startswith(prefixo):
+                encontrados.setdefault(ids[posicao])
+                if len(encontrados) == limite:
+                    return list(encontrados)
+                posicao += 1
+        return list(encontrados)
+
+
+class Catalogo:
+    """Categorias e alimentos indexados por id e por categoria"""
+
+    def __init__(self, versao, categorias, alimentos):
+        self.versao = versao
+        # Mesma ordem das telas: categorias por nome, alimentos por categoria e nome
+        self.categorias = tuple(sorted(categorias, key=lambda c: c.nome))
+        self.alimentos = tuple(sorted(
+            alimentos, key=lambda a: (a.categoria.nome if a.categoria else '', a.nome)
+        ))
+        self._categorias = {c.id: c for c in self.categorias}
+        self._alimentos = {a.id: a for a in self.alimentos}
+        por_categoria = {}
+        for alimento in self.alimentos:
+            por_categoria.setdefault(alimento.categoria_id, []).append(alimento)
+        self._por_categoria = {chave: tuple(lista) for chave, lista in por_categoria.items()}
+        por_nome = {}
+        for alimento in self.alimentos:
+            por_nome.setdefault(normalizar_nome(alimento.nome), []).append(alimento)
+        self._por_nome = {chave: tuple(lista) for chave, lista in por_nome.items()}
+        self._prefixos = IndicePrefixos(self.alimentos)
+
+    def alimento(self, alimento_id):
+        """AlimentoInfo pelo id (aceita string, como vem do formulário) ou None"""
+        try:
+            return self._alimentos.get(int(alimento_id))
+        except (TypeError, ValueError):
+            return None
+
+    def alimentos_por_nome(self, nome):
+        """Alimentos com o nome informado, ignorando acentos, caixa e espaços"""
+        return self._por_nome.get(normalizar_nome(nome), ())
+
+    def buscar_alimentos(self, prefixo, limite=10):
+        """AlimentoInfo cujo nome, sinônimo ou palavra começa com `prefixo` (autocompletar)"""
+        return [self._alimentos[alimento_id] for alimento_id in self._prefixos.buscar(prefixo, limite)]
+
+    def categoria(self, categoria_id):
+        try:
+            return self._categorias.get(int(categoria_id))
+        except (TypeError, ValueError):
+            return None
+
+    def alimentos_da_categoria(self, categoria_id):
+        categoria = self.categoria(categoria_id)
+        return self._por_categoria.get(categoria.id, ()) if categoria else ()
+
+
+_snapshot = None
+_trava = threading.Lock()
+# (versão, instante) da última leitura do carimbo no banco; None força nova leitura
+_leitura = None
+
+
+def _versao_atual():
+    global _leitura
+    leitura = _leitura
+    agora = time.monotonic()
+    if leitura is None or agora - leitura[1] >= settings.CATALOGO['intervalo_versao']:
+        # Sem linha ainda (banco novo): '' vale como versão até a primeira alteração
+        versao = VersaoCatalogo.objects.filter(pk=1).values_list('versao', flat=True).first() or ''
+        leitura = _leitura = (versao, agora)
+    return leitura[0]
+
+
+def _carregar(versao):
+    categorias = {
+        c.id: c for c in (
+            CategoriaInfo(*linha)
+            for linha in CategoriaAlimento.objects.values_list('id', 'nome', 'descricao')
+        )
+    }
+    alimentos = [
+        AlimentoInfo(id, nome, descricao, unidade, categorias.get(categoria_id), separar_sinonimos(sinonimos))
+        for id, nome, descricao, unidade, categoria_id, sinonimos in Alimento.objects.values_list(
+            'id', 'nome', 'descricao', 'unidade_medida', 'categoria_id', 'sinonimos'
+        )
+    ]
+    return Catalogo(versao, categorias.values(), alimentos)
+
+
+def catalogo():
+    """Snapshot atual do catálogo; recarrega só quando o carimbo de versão mudou"""
+    global _snapshot
+    versao = _versao_atual()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.versao != versao:
+        with _trava:
+            if _snapshot is None or _snapshot.versao != versao:
+                _snapshot = _carregar(versao)
+            snapshot = _snapshot
+    return snapshot
+
+
+def invalidar():
+    """Troca o carimbo de versão: todos os processos recarregam no próximo acesso"""
+    global _leitura
+    versao = uuid.uuid4().hex
+    if not VersaoCatalogo.objects.filter(pk=1).update(versao=versao):
+        VersaoCatalogo.objects.update_or_create(pk=1, defaults={'versao': versao})
+    _leitura = None
+
+
+@receiver([post_save, post_delete], sender=CategoriaAlimento)
+@receiver([post_save, post_delete], sender=Alimento)
+def _catalogo_alterado(sender, **kwargs):
+    # O carimbo muda na mesma transação da alteração: os outros processos só o
+    # veem depois do commit, junto com os dados novos
+    invalidar()
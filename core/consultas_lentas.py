@@ -0,0 +1,266 @@
+"""
+Log de consultas lentas com captura automática do plano de execução.
+
+ConsultasLentasMiddleware instala um execute_wrapper nas conexões durante a
+requisição. Toda consulta acima de CONSULTAS_LENTAS['limite_ms'] é registrada
+com SQL, parâmetros, view de origem e duração. O SQL é normalizado em uma
+"forma" (literais, números e listas de IN trocados por marcadores) para
+agrupar consultas iguais; na primeira vez que uma forma aparece no processo,
+o plano é capturado com EXPLAIN (EXPLAIN QUERY PLAN no SQLite).
+
+Os registros ficam em dois lugares, ambos limitados:
+- em memória, por processo: as últimas N ocorrências e as formas agregadas,
+  exibidas na página de staff;
+- em um arquivo JSON-lines com rotação por tamanho, lido por
+  manage.py consultas_lentas e compartilhado por todos os workers.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+def normalizar(sql):
+    """Forma da consulta: mesmo texto para consultas que só diferem nos valores"""
+    forma = _LITERAIS.sub('?', sql)
+    forma = _NUMEROS.sub('?', forma)
+    forma = forma.replace('%s', '?')
+    forma = _LISTAS.sub('(...)', forma)
+    return _ESPACOS.sub(' ', forma).strip()
+
+
+def id_forma(forma):
+    return hashlib.sha1(forma.encode()).hexdigest()[:12]
+
+
+class RegistroConsultas:
+    """Ocorrências recentes e formas agregadas, em memória e com tamanho limitado"""
+
+    def __init__(self, max_ocorrencias, max_formas):
+        self.ocorrencias = deque(maxlen=max_ocorrencias)
+        self.formas = OrderedDict()
+        self.max_formas = max_formas
+        self._trava = threading.Lock()
+
+    def registrar(self, ocorrencia):
+        """Guarda a ocorrência; retorna True se a forma ainda não era conhecida"""
+        with self._trava:
+            self.ocorrencias.append(ocorrencia)
+            forma = self.formas.get(ocorrencia['id_forma'])
+            nova = forma is None
+            if nova:
+                forma = self.formas[ocorrencia['id_forma']] = {
+                    'id_forma': ocorrencia['id_forma'],
+                    'forma': ocorrencia['forma'],
+                    'contagem': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'views': set(),
+                    'plano': None,
+                    'exemplo': ocorrencia['sql'],
+                }
+                # Descarta a forma usada há mais tempo quando o limite é atingido
+                while len(self.formas) > self.max_formas:
+                    self.formas.popitem(last=False)
+            else:
+                self.formas.move_to_end(ocorrencia['id_forma'])
+            forma['contagem'] += 1
+            forma['total_ms'] += ocorrencia['duracao_ms']
+            forma['max_ms'] = max(forma['max_ms'], ocorrencia['duracao_ms'])
+            if ocorrencia['view']:
+                forma['views'].add(ocorrencia['view'])
+            return nova
+
+    def definir_plano(self, chave, plano):
+        with self._trava:
+            if chave in self.formas:
+                self.formas[chave]['plano'] = plano
+
+    def formas_por_tempo(self):
+        with self._trava:
+            return sorted(
+                (dict(f, views=sorted(f['views'])) for f in self.formas.values()),
+                key=lambda f: f['total_ms'],
+                reverse=True,
+            )
+
+    def recentes(self):
+        with self._trava:
+            return list(reversed(self.ocorrencias))
+
+    def limpar(self):
+        with self._trava:
+            self.ocorrencias.clear()
+            self.formas.clear()
+
+
+_registro = None
+_logger = None
+_trava_init = threading.Lock()
+
+
+def _config():
+    return settings.CONSULTAS_LENTAS
+
+
+def registro():
+    """Registro em memória deste processo"""
+    global _registro
+    with _trava_init:
+        if _registro is None:
+            config = _config()
+            _registro = RegistroConsultas(config['max_ocorrencias'], config['max_formas'])
+        return _registro
+
+
+def _log_arquivo():
+    global _logger
+    with _trava_init:
+        if _logger is None:
+            config = _config()
+            arquivo = Path(config['arquivo'])
+            arquivo.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                arquivo, maxBytes=config['max_bytes'], backupCount=config['backups'], encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger = logging.getLogger('core.consultas_lentas.arquivo')
+            _logger.propagate = False
+            _logger.setLevel(logging.INFO)
+            _logger.addHandler(handler)
+        return _logger
+
+
+def reiniciar():
+    """Descarta o registro em memória e o handler do arquivo (ex.: após mudar a configuração)"""
+    global _registro, _logger
+    with _trava_init:
+        if _logger is not None:
+            for handler in list(_logger.handlers):
+                _logger.removeHandler(handler)
+                handler.close()
+        _registro = None
+        _logger = None
+
+
+def arquivos_de_log():
+    """Arquivo atual e os rotacionados, do mais antigo ao mais novo"""
+    arquivo = Path(_config()['arquivo'])
+    rotacionados = [arquivo.with_name(f'{arquivo.name}.{n}') for n in range(_config()['backups'], 0, -1)]
+    return [caminho for caminho in rotacionados + [arquivo] if caminho.exists()]
+
+
+def capturar_plano(conexao, sql, params):
+    """Plano de execução da consulta, ou None se o banco não conseguir explicá-la"""
+    prefixo = conexao.ops.explain_query_prefix()
+    _local.explicando = True
+    try:
+        # Savepoint próprio: um EXPLAIN com erro não invalida a transação da view
+        with transaction.atomic(using=conexao.alias):
+            with conexao.cursor() as cursor:
+                cursor.execute(f'{prefixo} {sql}', params)
+                return '\n'.join(' '.join(str(coluna) for coluna in linha) for linha in cursor.fetchall())
+    except DatabaseError:
+        return None
+    finally:
+        _local.explicando = False
+
+
+class MonitorConsultas:
+    """execute_wrapper que registra as consultas acima do limite"""
+
+    def __init__(self, view=None):
+        self.view = view
+        self.limite_ms = _config()['limite_ms']
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explicando', False):
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        resultado = execute(sql, params, many, context)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if duracao_ms >= self.limite_ms:
+            self.registrar(sql, params, many, duracao_ms, context['connection'])
+        return resultado
+
+    def registrar(self, sql, params, many, duracao_ms, conexao):
+        forma = normalizar(sql)
+        ocorrencia = {
+            'momento': timezone.now().isoformat(),
+            'id_forma': id_forma(forma),
+            'forma': forma,
+            'sql': sql,
+            'params': None if many else repr(params)[:500],
+            'view': self.view,
+            'duracao_ms': round(duracao_ms, 2),
+        }
+        nova = registro().registrar(ocorrencia)
+        if nova and not many and sql.lstrip()[:6].upper() == 'SELECT':
+            ocorrencia['plano'] = capturar_plano(conexao, sql, params)
+            registro().definir_plano(ocorrencia['id_forma'], ocorrencia['plano'])
+        _log_arquivo().info(json.dumps(ocorrencia, ensure_ascii=False))
+
+
+class ConsultasLentasMiddleware:
+    """Monitora as consultas feitas durante cada requisição"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def _instalar(self, monitor):
+        pilha = ExitStack()
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(monitor))
+        return pilha
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        if not _config()['ativo']:
+            return self.get_response(request)
+        monitor = MonitorConsultas()
+        request._monitor_consultas = monitor
+        with self._instalar(monitor):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not _config()['ativo']:
+            return await self.get_response(request)
+        monitor = MonitorConsultas()
+        request._monitor_consultas = monitor
+        # As conexões são por thread: o wrapper é instalado na thread em que o ORM
+        # roda (sync_to_async com thread_sensitive, a mesma durante a requisição)
+        pilha = await sync_to_async(self._instalar)(monitor)
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        monitor = getattr(request, '_monitor_consultas', None)
+        if monitor is not None:
+            monitor.view = request.resolver_match.view_name if request.resolver_match else view_func.__name__
@@ -0,0 +1,355 @@
+"""
+Consumidores do log de eventos de doações.
+
+Importado em CoreConfig.ready() para que todos fiquem registrados.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import shards
+from .eventos import Consumidor, registrar_consumidor, processar_pendentes
+from .models import (
+    Doacao, DoacaoArquivada, ContadorStatusDoacao, DoacaoDiaria, PlacarEntregas, EntregaDiaria, JanelaPlacar,
+)
+
+# Janelas (em dias) exibidas nos dashboards
+PERIODOS_TENDENCIA = (7, 30, 365)
+# Janelas dos placares; 0 é todo o período
+JANELAS_PLACAR = (0,) + PERIODOS_TENDENCIA
+
+
+@registrar_consumidor
+class ContadoresStatus(Consumidor):
+    """Mantém o total de doações por status"""
+    nome = 'contadores_status'
+
+    def processar(self, eventos):
+        deltas = Counter()
+        for evento in eventos:
+            if evento.status_anterior:
+                deltas[evento.status_anterior] -= 1
+            # status_novo vazio: a doação foi removida
+            if evento.status_novo:
+                deltas[evento.status_novo] += 1
+
+        for status, delta in deltas.items():
+            if delta and not ContadorStatusDoacao.objects.filter(status=status).update(
+                total=F('total') + delta
+            ):
+                ContadorStatusDoacao.objects.create(status=status, total=delta)
+
+    def reconstruir(self):
+        # Doações arquivadas continuam contadas (core.historico)
+        totais = Counter()
+        for parcial in shards.em_paralelo(lambda alias: [
+            dict(model.objects.using(alias).order_by().values_list('status').annotate(total=Count('id')))
+            for model in (Doacao, DoacaoArquivada)
+        ]):
+            for contagens in parcial:
+                totais.update(contagens)
+        ContadorStatusDoacao.objects.all().delete()
+        ContadorStatusDoacao.objects.bulk_create([
+            ContadorStatusDoacao(status=status, total=total) for status, total in totais.items()
+        ])
+
+
+def contagem_por_status():
+    """Lê os contadores; quem processa os eventos pendentes é o comando processar_eventos"""
+    return dict(ContadorStatusDoacao.objects.values_list('status', 'total'))
+
+
+@registrar_consumidor
+class RollupsDiarios(Consumidor):
+    """Mantém DoacaoDiaria: doações por dia de criação, ONG, alimento e status"""
+    nome = 'rollups_diarios'
+
+    def processar(self, eventos):
+        deltas = defaultdict(lambda: [0, Decimal('0')])
+        for evento in eventos:
+            dia = timezone.localdate(evento.data_doacao)
+            if evento.status_anterior:
+                saida = deltas[(dia, evento.ong_id, evento.alimento_id, evento.status_anterior)]
+                saida[0] -= 1
+                saida[1] -= evento.quantidade
+            if evento.status_novo:
+                entrada = deltas[(dia, evento.ong_id, evento.alimento_id, evento.status_novo)]
+                entrada[0] += 1
+                entrada[1] += evento.quantidade
+
+        # Lê os valores atuais das chaves afetadas e grava os novos em um único upsert
+        existentes = {
+            (dia, ong_id, alimento_id, status): (total, quantidade)
+            for dia, ong_id, alimento_id, status, total, quantidade in DoacaoDiaria.objects.filter(
+                dia__in={chave[0] for chave in deltas},
+                ong_id__in={chave[1] for chave in deltas},
+            ).values_list('dia', 'ong_id', 'alimento_id', 'status', 'total', 'quantidade')
+        }
+        linhas = []
+        for chave, (total, quantidade) in deltas.items():
+            total_atual, quantidade_atual = existentes.get(chave, (0, Decimal('0')))
+            dia, ong_id, alimento_id, status = chave
+            linhas.append(DoacaoDiaria(
+                dia=dia,
+                ong_id=ong_id,
+                alimento_id=alimento_id,
+                status=status,
+                total=total_atual + total,
+                quantidade=quantidade_atual + quantidade,
+            ))
+        DoacaoDiaria.objects.bulk_create(
+            linhas,
+            update_conflicts=True,
+            unique_fields=['dia', 'ong', 'alimento', 'status'],
+            update_fields=['total', 'quantidade'],
+        )
+
+    def reconstruir(self):
+        DoacaoDiaria.objects.all().delete()
+        # Cada ONG está em um só shard: as chaves (dia, ong, alimento, status) não se repetem entre eles,
+        # mas a mesma chave pode ter doações ativas e arquivadas
+        for alias in shards.aliases():
+            linhas = defaultdict(lambda: [0, Decimal('0')])
+            for model in (Doacao, DoacaoArquivada):
+                agregados = (
+                    model.objects.using(alias).order_by()
+                    .annotate(dia=TruncDate('data_doacao'))
+                    .values_list('dia', 'ong_id', 'alimento_id', 'status')
+                    .annotate(total=Count('id'), soma=Sum('quantidade'))
+                )
+                for dia, ong_id, alimento_id, status, total, soma in agregados.iterator():
+                    linha = linhas[(dia, ong_id, alimento_id, status)]
+                    linha[0] += total
+                    linha[1] += soma
+            DoacaoDiaria.objects.bulk_create(
+                (
+                    DoacaoDiaria(
+                        dia=dia,
+                        ong_id=ong_id,
+                        alimento_id=alimento_id,
+                        status=status,
+                        total=total,
+                        quantidade=quantidade,
+                    )
+                    for (dia, ong_id, alimento_id, status), (total, quantidade) in linhas.items()
+                ),
+                batch_size=1000,
+            )
+
+
+def resumo_tendencias(ong=None):
+    """Doações criadas e entregues em cada janela de PERIODOS_TENDENCIA, lidas dos rollups"""
+    hoje = timezone.localdate()
+    rollups = DoacaoDiaria.objects.filter(dia__gt=hoje - timedelta(days=max(PERIODOS_TENDENCIA)))
+    if ong is not None:
+        rollups = rollups.filter(ong=ong)
+
+    agregados = {}
+    for dias in PERIODOS_TENDENCIA:
+        inicio = hoje - timedelta(days=dias)
+        agregados[f'doacoes_{dias}'] = Sum('total', filter=Q(dia__gt=inicio))
+        agregados[f'entregues_{dias}'] = Sum('total', filter=Q(dia__gt=inicio, status='entregue'))
+    totais = rollups.aggregate(**agregados)
+
+    return [
+        {
+            'dias': dias,
+            'doacoes': totais[f'doacoes_{dias}'] or 0,
+            'entregues': totais[f'entregues_{dias}'] or 0,
+        }
+        for dias in PERIODOS_TENDENCIA
+    ]
+
+
+def serie_diaria(dias=30, ong=None):
+    """Doações criadas por dia nos últimos `dias` dias, incluindo dias sem doações"""
+    hoje = timezone.localdate()
+    inicio = hoje - timedelta(days=dias - 1)
+    rollups = DoacaoDiaria.objects.filter(dia__gte=inicio)
+    if ong is not None:
+        rollups = rollups.filter(ong=ong)
+
+    por_dia = dict(rollups.order_by().values('dia').annotate(soma=Sum('total')).values_list('dia', 'soma'))
+    maximo = max(por_dia.values(), default=0) or 1
+    return [
+        {
+            'dia': dia,
+            'total': por_dia.get(dia, 0),
+            'altura': round(por_dia.get(dia, 0) * 100 / maximo),
+        }
+        for dia in (inicio + timedelta(days=n) for n in range(dias))
+    ]
+
+
+def _dimensoes(ong_id, doador_id, alimento_id):
+    return (('ong', ong_id), ('doador', doador_id), ('alimento', alimento_id))
+
+
+def _somar(model, campos, deltas):
+    """Soma {chave: [total, quantidade]} às linhas de `model` identificadas por `campos`, em um único upsert"""
+    if not deltas:
+        return
+    filtros = {f'{campo}__in': {chave[i] for chave in deltas} for i, campo in enumerate(campos)}
+    existentes = {
+        tuple(linha[:-2]): linha[-2:]
+        for linha in model.objects.filter(**filtros).values_list(*campos, 'total', 'quantidade')
+    }
+    linhas = []
+    for chave, (total, quantidade) in deltas.items():
+        total_atual, quantidade_atual = existentes.get(chave, (0, Decimal('0')))
+        linhas.append(model(
+            **dict(zip(campos, chave)),
+            total=total_atual + total,
+            quantidade=quantidade_atual + quantidade,
+        ))
+    model.objects.bulk_create(
+        linhas,
+        update_conflicts=True,
+        unique_fields=list(campos),
+        update_fields=['total', 'quantidade'],
+    )
+
+
+def inicios_das_janelas(hoje):
+    """{janela: primeiro dia contado nela} para JANELAS_PLACAR"""
+    return {janela: hoje - timedelta(days=janela - 1) if janela else date.min for janela in JANELAS_PLACAR}
+
+
+def deslizar_janelas():
+    """
+    Tira das janelas móveis os dias que saíram delas desde a última chamada.
+
+    Precisa rodar dentro de uma transação: as linhas de JanelaPlacar ficam
+    travadas até o fim dela, o que também serializa quem atualiza os placares.
+    Retorna {janela: primeiro dia contado}.
+    """
+    inicios = inicios_das_janelas(timezone.localdate())
+    atuais = {janela.janela: janela for janela in JanelaPlacar.objects.select_for_update()}
+    for janela, inicio in inicios.items():
+        atual = atuais.get(janela)
+        if not janela or (atual is not None and atual.inicio >= inicio):
+            continue
+        if atual is None:
+            JanelaPlacar.objects.create(janela=janela, inicio=inicio)
+            continue
+        saidas = (
+            EntregaDiaria.objects.filter(dia__gte=atual.inicio, dia__lt=inicio).order_by()
+            .values_list('dimensao', 'chave').annotate(soma_total=Sum('total'), soma_quantidade=Sum('quantidade'))
+        )
+        _somar(PlacarEntregas, ('dimensao', 'janela', 'chave'), {
+            (dimensao, janela, chave): [-total, -quantidade] for dimensao, chave, total, quantidade in saidas
+        })
+        atual.inicio = inicio
+        atual.save(update_fields=['inicio'])
+    # Dias anteriores à maior janela não voltam a ser usados
+    EntregaDiaria.objects.filter(dia__lt=inicios[max(JANELAS_PLACAR)]).delete()
+    return inicios
+
+
+@registrar_consumidor
+class Placares(Consumidor):
+    """Mantém os placares de doações entregues por ONG, doador e alimento (PlacarEntregas)"""
+    nome = 'placares'
+
+    def processar(self, eventos):
+        inicios = deslizar_janelas()
+        diarias = defaultdict(lambda: [0, Decimal('0')])
+        for evento in eventos:
+            # +1 ao entrar em 'entregue', -1 ao sair; as demais transições não mexem no placar
+            sinal = (evento.status_novo == 'entregue') - (evento.status_anterior == 'entregue')
+            if not sinal:
+                continue
+            dia = timezone.localdate(evento.data_doacao)
+            for dimensao, chave in _dimensoes(evento.ong_id, evento.doador_id, evento.alimento_id):
+                diaria = diarias[(dia, dimensao, chave)]
+                diaria[0] += sinal
+                diaria[1] += sinal * evento.quantidade
+        self.gravar(diarias, inicios)
+
+    def reconstruir(self):
+        def entregues(alias):
+            return [
+                linha
+                for model in (Doacao, DoacaoArquivada)
+                for linha in model.objects.using(alias).filter(status='entregue').order_by()
+                .annotate(dia=TruncDate('data_doacao'))
+                .values_list('dia', 'ong_id', 'doador_id', 'alimento_id')
+                .annotate(total=Count('id'), soma=Sum('quantidade'))
+            ]
+
+        diarias = defaultdict(lambda: [0, Decimal('0')])
+        for linhas in shards.em_paralelo(entregues):
+            for dia, ong_id, doador_id, alimento_id, total, soma in linhas:
+                for dimensao, chave in _dimensoes(ong_id, doador_id, alimento_id):
+                    diaria = diarias[(dia, dimensao, chave)]
+                    diaria[0] += total
+                    diaria[1] += soma
+
+        PlacarEntregas.objects.all().delete()
+        EntregaDiaria.objects.all().delete()
+        JanelaPlacar.objects.all().delete()
+        inicios = inicios_das_janelas(timezone.localdate())
+        JanelaPlacar.objects.bulk_create(
+            [JanelaPlacar(janela=janela, inicio=inicio) for janela, inicio in inicios.items() if janela]
+        )
+        self.gravar(diarias, inicios)
+
+    def manter(self):
+        # Sem eventos novos as janelas móveis também precisam andar com os dias
+        with transaction.atomic():
+            deslizar_janelas()
+
+    def gravar(self, diarias, inicios):
+        """Soma os deltas por (dia, dimensão, chave) aos dias guardados e a cada janela que contém o dia"""
+        placar = defaultdict(lambda: [0, Decimal('0')])
+        for (dia, dimensao, chave), (total, quantidade) in diarias.items():
+            for janela, inicio in inicios.items():
+                if dia >= inicio:
+                    linha = placar[(dimensao, janela, chave)]
+                    linha[0] += total
+                    linha[1] += quantidade
+        inicio_guardado = inicios[max(JANELAS_PLACAR)]
+        _somar(EntregaDiaria, ('dia', 'dimensao', 'chave'), {
+            chave: delta for chave, delta in diarias.items() if chave[0] >= inicio_guardado
+        })
+        _somar(PlacarEntregas, ('dimensao', 'janela', 'chave'), placar)
+
+
+def atualizar_placares():
+    """
+    Processa os eventos pendentes e desliza as janelas móveis até hoje.
+
+    É o que o comando processar_eventos faz a cada rodada; as views só leem
+    PlacarEntregas (placar e posicao_no_placar).
+    """
+    consumidor = Placares()
+    processar_pendentes(consumidor)
+    consumidor.manter()
+
+
+def placar(dimensao, janela=0, limite=5):
+    """[(id, total, quantidade)] dos `limite` primeiros do placar, lidos em ordem do índice"""
+    return list(
+        PlacarEntregas.objects.filter(dimensao=dimensao, janela=janela, total__gt=0)
+        .order_by('-total', 'chave')
+        .values_list('chave', 'total', 'quantidade')[:limite]
+    )
+
+
+def posicao_no_placar(dimensao, chave, janela=0):
+    """{'posicao', 'total', 'quantidade'} de `chave` no placar, ou None sem entregas na janela"""
+    linha = PlacarEntregas.objects.filter(
+        dimensao=dimensao, janela=janela, chave=chave, total__gt=0
+    ).values('total', 'quantidade').first()
+    if linha is None:
+        return None
+    # Empates dividem a posição: conta só quem tem mais entregas
+    linha['posicao'] = PlacarEntregas.objects.filter(
+        dimensao=dimensao, janela=janela, total__gt=linha['total']
+    ).count() + 1
+    return linha
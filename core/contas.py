@@ -0,0 +1,152 @@
+"""
+Importação em massa de contas: doadores e ONGs com seus perfis.
+
+Cada linha do arquivo (lido pelos mesmos leitores de core/importacao.py) é
+uma conta; linhas com CNPJ viram usuários do tipo ONG com o perfil ONG
+correspondente. A validação não consulta o banco linha a linha: usernames,
+e-mails e CNPJs existentes são carregados uma vez em conjuntos, que também
+recebem os valores das linhas já aceitas para pegar duplicatas no próprio
+arquivo.
+
+O custo está no hash das senhas (PBKDF2 com SENHAS_PBKDF2_ITERACOES), que é
+calculado em um pool de processos com todos os núcleos; os usuários e perfis
+são gravados com bulk_create em lotes à medida que os hashes ficam prontos.
+Linhas sem senha recebem uma senha inutilizável (sem custo de hash), e a
+conta é ativada pelo fluxo de redefinição de senha.
+"""
+import re
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .autenticacao import hashes_em_paralelo
+from .importacao import ResultadoImportacao
+from .models import ONG, User
+
+COLUNAS_OBRIGATORIAS = ('username', 'email')
+APELIDOS = {
+    'usuario': 'username',
+    'e-mail': 'email',
+    'password': 'senha',
+    'first_name': 'primeiro_nome',
+    'nome': 'primeiro_nome',
+    'last_name': 'sobrenome',
+    'nome_da_ong': 'ong',
+    'endereco_da_ong': 'endereco_completo',
+}
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def validar_cnpj(valor):
+    """CNPJ formatado (00.000.000/0000-00) se os dígitos verificadores conferem; ValueError se não"""
+    digitos = _digitos(valor)
+    if len(digitos) != 14 or len(set(digitos)) == 1:
+        raise ValueError(f'CNPJ inválido: "{valor}"')
+    for tamanho in (12, 13):
+        pesos = list(range(tamanho - 7, 1, -1)) + list(range(9, 1, -1))
+        resto = sum(int(digito) * peso for digito, peso in zip(digitos, pesos)) % 11
+        if int(digitos[tamanho]) != (0 if resto < 2 else 11 - resto):
+            raise ValueError(f'CNPJ inválido: "{valor}"')
+    return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+
+
+def conta_da_linha(linha):
+    """(User, ONG ou None, senha) não salvos, montados a partir da linha; ValueError se inválida"""
+    username = _texto(linha.get('username'))
+    if not username or len(username) > 150:
+        raise ValueError(f'username inválido: "{username}"')
+    try:
+        User.username_validator(username)
+        email = _texto(linha.get('email')).lower()
+        validate_email(email)
+    except ValidationError as erro:
+        raise ValueError('; '.join(erro.messages))
+
+    cnpj = _texto(linha.get('cnpj'))
+    usuario = User(
+        username=username,
+        email=email,
+        first_name=_texto(linha.get('primeiro_nome'))[:150],
+        last_name=_texto(linha.get('sobrenome'))[:150],
+        telefone=_texto(linha.get('telefone'))[:20],
+        endereco=_texto(linha.get('endereco')),
+        user_type='ong' if cnpj else 'cliente',
+    )
+
+    ong = None
+    if cnpj:
+        nome = _texto(linha.get('ong'))
+        endereco = _texto(linha.get('endereco_completo'))
+        if not nome or not endereco:
+            raise ValueError('linhas com CNPJ precisam das colunas ong e endereco_completo')
+        ong = ONG(
+            user=usuario,
+            nome=nome[:200],
+            cnpj=validar_cnpj(cnpj),
+            descricao=_texto(linha.get('descricao')),
+            endereco_completo=endereco,
+            telefone_contato=(_texto(linha.get('telefone_contato')) or usuario.telefone)[:20],
+            email_contato=_texto(linha.get('email_contato')) or email,
+            responsavel=(_texto(linha.get('responsavel')) or usuario.get_full_name() or username)[:200],
+        )
+    return usuario, ong, _texto(linha.get('senha')) or None
+
+
+def importar_contas(linhas, processos=None, tamanho_lote=500, simular=False):
+    """Cria as contas válidas; retorna um ResultadoImportacao (criadas = contas gravadas)"""
+    resultado = ResultadoImportacao()
+    usernames = set(User.objects.values_list('username', flat=True))
+    emails = {email.lower() for email in User.objects.exclude(email='').values_list('email', flat=True)}
+    cnpjs = {_digitos(cnpj) for cnpj in ONG.objects.values_list('cnpj', flat=True)}
+
+    validas = []
+    for numero, linha in linhas:
+        resultado.linhas += 1
+        try:
+            usuario, ong, senha = conta_da_linha(linha)
+            if usuario.username in usernames:
+                raise ValueError(f'username "{usuario.username}" já está em uso')
+            if usuario.email in emails:
+                raise ValueError(f'e-mail "{usuario.email}" já está cadastrado')
+            if ong and _digitos(ong.cnpj) in cnpjs:
+                raise ValueError(f'CNPJ {ong.cnpj} já está cadastrado')
+        except ValueError as erro:
+            resultado.erros.append((numero, str(erro)))
+            continue
+        usernames.add(usuario.username)
+        emails.add(usuario.email)
+        if ong:
+            cnpjs.add(_digitos(ong.cnpj))
+        validas.append((numero, usuario, ong, senha))
+
+    if simular or not validas:
+        return resultado
+
+    hashes = hashes_em_paralelo([senha for _, _, _, senha in validas], processos)
+    try:
+        for inicio in range(0, len(validas), tamanho_lote):
+            lote = validas[inicio:inicio + tamanho_lote]
+            for (_, usuario, _, _), hash_senha in zip(lote, islice(hashes, len(lote))):
+                usuario.password = hash_senha
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([usuario for _, usuario, _, _ in lote])
+                    # bulk_create preenche o pk dos usuários, que o perfil ONG passa a referenciar
+                    ONG.objects.bulk_create([ong for _, _, ong, _ in lote if ong])
+            except IntegrityError as erro:
+                # Conta criada por outro caminho durante a importação: o lote inteiro fica de fora
+                resultado.erros.extend((numero, f'lote não gravado: {erro}') for numero, _, _, _ in lote)
+                continue
+            resultado.criadas += len(lote)
+    finally:
+        hashes.close()
+    return resultado
@@ -0,0 +1,201 @@
+"""
+Log de eventos das doações e consumidores incrementais.
+
+Toda mudança de status de uma doação grava um DoacaoEvento na mesma transação
+da alteração. Consumidores (contadores, rollups, notificações) guardam o id do
+último evento processado em ConsumidorEvento e, a cada execução, leem apenas
+os eventos posteriores, em vez de varrer a tabela de doações inteira.
+
+Com shards (core.shards) o evento fica no shard da doação, e cada consumidor
+guarda um offset por shard ('<nome>@<alias>'); o estado derivado continua em
+'default'.
+
+Remover uma doação (admin, cascata de usuário, ONG ou alimento) grava um
+evento de remoção, com status_novo vazio, para os consumidores descontarem a
+doação; o arquivamento (core.historico) não grava, porque a doação arquivada
+continua contada.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from . import shards
+from .ao_vivo import notificar
+from .models import Doacao, DoacaoArquivada, DoacaoEvento, ConsumidorEvento
+
+_arquivando = ContextVar('arquivando', default=False)
+
+
+def _evento(doacao, status_anterior, status_novo=None):
+    return DoacaoEvento(
+        doacao_id=doacao.pk,
+        doador_id=doacao.doador_id,
+        ong_id=doacao.ong_id,
+        alimento_id=doacao.alimento_id,
+        status_anterior=status_anterior,
+        status_novo=doacao.status if status_novo is None else status_novo,
+        quantidade=doacao.quantidade,
+        data_doacao=doacao.data_doacao,
+    )
+
+
+def registrar_criacoes(doacoes):
+    """Registra o evento de criação de doações já salvas, no shard de cada uma"""
+    eventos = []
+    for alias, grupo in shards.agrupar_por_shard(doacoes).items():
+        eventos += DoacaoEvento.objects.using(alias).bulk_create([_evento(doacao, '') for doacao in grupo])
+        transaction.on_commit(notificar, using=alias)
+    return eventos
+
+
+def registrar_transicoes(doacoes, status_anterior, alias):
+    """Registra em lote os eventos de doações de um shard que saíram de `status_anterior`"""
+    eventos = DoacaoEvento.objects.using(alias).bulk_create([_evento(doacao, status_anterior) for doacao in doacoes])
+    transaction.on_commit(notificar, using=alias)
+    return eventos
+
+
+def criar_doacao(**campos):
+    """Cria uma doação e seu evento de criação na mesma transação"""
+    ong = campos.get('ong')
+    alias = shards.shard_da_ong(ong.pk if ong is not None else campos['ong_id'])
+    with transaction.atomic(using=alias):
+        doacao = Doacao.objects.using(alias).create(**campos)
+        registrar_criacoes([doacao])
+    return doacao
+
+
+def alterar_status(doacao, novo_status):
+    """Altera o status da doação e registra a transição na mesma transação"""
+    status_anterior = doacao.status
+    if status_anterior == novo_status:
+        return None
+    alias = shards.shard_da_ong(doacao.ong_id)
+    with transaction.atomic(using=alias):
+        doacao.status = novo_status
+        doacao.save(using=alias, update_fields=['status', 'data_atualizacao'])
+        evento = _evento(doacao, status_anterior)
+        evento.save(using=alias)
+        transaction.on_commit(notificar, using=alias)
+    return evento
+
+
+@contextmanager
+def arquivando():
+    """Remoções de Doacao dentro do bloco são arquivamentos e não gravam eventos"""
+    token = _arquivando.set(True)
+    try:
+        yield
+    finally:
+        _arquivando.reset(token)
+
+
+@receiver(pre_delete, sender=Doacao)
+@receiver(pre_delete, sender=DoacaoArquivada)
+def registrar_remocao(sender, instance, using, **kwargs):
+    """Registra a saída da doação removida, na transação da remoção"""
+    if sender is Doacao and _arquivando.get():
+        return
+    _evento(instance, instance.status, status_novo='').save(using=using)
+    transaction.on_commit(notificar, using=using)
+
+
+class Consumidor:
+    """
+    Base para consumidores do log de eventos.
+
+    Subclasses definem `nome` e implementam `processar(eventos)`. Se
+    implementarem `reconstruir()`, o estado derivado é recalculado a partir
+    das tabelas na primeira execução (ou com --reconstruir), e o consumidor
+    passa a ler o log a partir do último evento existente. `manter()` é
+    chamado pelo comando processar_eventos a cada rodada, mesmo sem eventos
+    novos, para manutenção que depende só do tempo.
+    """
+    nome = None
+    tamanho_lote = 1000
+
+    def processar(self, eventos):
+        raise NotImplementedError
+
+    def reconstruir(self):
+        pass
+
+    def manter(self):
+        pass
+
+
+_consumidores = {}
+
+
+def registrar_consumidor(cls):
+    """Decorador que registra uma subclasse de Consumidor"""
+    _consumidores[cls.nome] = cls()
+    return cls
+
+
+def consumidores():
+    return dict(_consumidores)
+
+
+def nome_offset(consumidor, alias):
+    """Nome do offset do consumidor no log de um shard (sem shards, só o nome)"""
+    return consumidor.nome if alias == 'default' else f'{consumidor.nome}@{alias}'
+
+
+def reconstruir(consumidor):
+    """Recalcula o estado do consumidor e posiciona os offsets no fim do log"""
+    with transaction.atomic():
+        offsets = []
+        for alias in shards.aliases():
+            offset, _ = ConsumidorEvento.objects.select_for_update().get_or_create(
+                nome=nome_offset(consumidor, alias)
+            )
+            offset.ultimo_evento_id = DoacaoEvento.objects.using(alias).aggregate(ultimo=Max('id'))['ultimo'] or 0
+            offsets.append(offset)
+        consumidor.reconstruir()
+        for offset in offsets:
+            offset.save()
+
+
+def processar_pendentes(consumidor, max_lotes=None):
+    """
+    Entrega ao consumidor os eventos ainda não processados, em lotes.
+
+    Cada lote e o avanço do offset são gravados na mesma transação: efeitos no
+    banco acontecem exatamente uma vez; efeitos externos (emails), ao menos uma.
+    Retorna o número de eventos processados.
+    """
+    nomes = {alias: nome_offset(consumidor, alias) for alias in shards.aliases()}
+    if ConsumidorEvento.objects.filter(nome__in=nomes.values()).count() < len(nomes):
+        reconstruir(consumidor)
+
+    processados = 0
+    lotes = 0
+    for alias, nome in nomes.items():
+        while max_lotes is None or lotes < max_lotes:
+            # O offset e o estado derivado ficam em 'default'; o log é só lido do shard
+            with transaction.atomic():
+                offset = ConsumidorEvento.objects.select_for_update().get(nome=nome)
+                eventos = list(
+                    DoacaoEvento.objects.using(alias).filter(id__gt=offset.ultimo_evento_id)
+                    .order_by('id')[:consumidor.tamanho_lote]
+                )
+                if not eventos:
+                    break
+                consumidor.processar(eventos)
+                offset.ultimo_evento_id = eventos[-1].id
+                offset.save(update_fields=['ultimo_evento_id', 'data_atualizacao'])
+            processados += len(eventos)
+            lotes += 1
+    return processados
+
+
+def reiniciar():
+    """Apaga o log e os offsets; os consumidores se reconstroem na próxima execução"""
+    for alias in shards.aliases():
+        DoacaoEvento.objects.using(alias).all().delete()
+    ConsumidorEvento.objects.all().delete()
@@ -0,0 +1,48 @@
+"""
+Expiração de doações pendentes que a ONG nunca confirmou.
+
+manage.py expirar_doacoes passa para 'expirada', em lotes curtos, as doações
+pendentes criadas há mais de EXPIRACAO_DOACOES_DIAS dias, com um evento por
+doação no log (core.eventos). Cada lote é uma transação própria no shard das
+doações, então as travas duram só um lote.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import eventos
+from .models import Doacao
+
+
+def expiraveis(dias, alias='default'):
+    """Doações pendentes criadas há mais de `dias` dias, das mais antigas para as mais novas"""
+    corte = timezone.now() - timedelta(days=dias)
+    # status + data_doacao usa o índice doacao_status_data_idx
+    return Doacao.objects.using(alias).filter(status='pendente', data_doacao__lt=corte).order_by('data_doacao', 'id')
+
+
+def expirar_lote(dias, tamanho_lote=500, alias='default'):
+    """
+    Expira um lote de um shard em uma transação.
+
+    Retorna (selecionadas, expiradas): doações confirmadas entre a seleção e o
+    UPDATE contam só nas selecionadas, então o lote pode expirar zero sem que
+    a varredura tenha acabado.
+    """
+    with transaction.atomic(using=alias):
+        ids = list(expiraveis(dias, alias).select_for_update().values_list('id', flat=True)[:tamanho_lote])
+        if not ids:
+            return 0, 0
+        agora = timezone.now()
+        # status='pendente' de novo no UPDATE: onde não há SELECT ... FOR UPDATE (SQLite),
+        # uma confirmação gravada entre as duas consultas vence a expiração
+        Doacao.objects.using(alias).filter(id__in=ids, status='pendente').update(
+            status='expirada', data_atualizacao=agora
+        )
+        # Relê o que este UPDATE expirou (a trava de escrita já é desta transação) para registrar os eventos
+        expiradas = list(Doacao.objects.using(alias).filter(
+            id__in=ids, status='expirada', data_atualizacao=agora
+        ).order_by().only('id', 'doador_id', 'ong_id', 'alimento_id', 'status', 'quantidade', 'data_doacao'))
+        eventos.registrar_transicoes(expiradas, 'pendente', alias)
+    return len(ids), len(expiradas)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PBKDF2ConfiguravelHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 com o número de iterações definido em SENHAS_PBKDF2_ITERACOES.
+
+    Mantém o identificador 'pbkdf2_sha256', então os hashes existentes continuam
+    válidos; quando o número de iterações muda, o hash é regravado no próximo login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'SENHAS_PBKDF2_ITERACOES', PBKDF2PasswordHasher.iterations)
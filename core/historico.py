@@ -0,0 +1,104 @@
+"""
+Arquivamento de doações finalizadas e leitura transparente do histórico.
+
+A tabela Doacao (quente) guarda as doações em andamento e as finalizadas
+recentes; manage.py arquivar_doacoes move as finalizadas antigas (entregues,
+canceladas e expiradas), em lotes, para DoacaoArquivada (fria), mantendo a
+tabela quente limitada.
+As telas de histórico leem das duas tabelas pelas funções deste módulo, em
+todos os shards (core.shards) que podem ter doações para os filtros pedidos.
+"""
+import heapq
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, prefetch_related_objects
+from django.utils import timezone
+
+from . import shards
+from .eventos import arquivando
+from .models import Doacao, DoacaoArquivada, STATUS_FINALIZADOS
+
+CAMPOS_ARQUIVADOS = (
+    'id', 'doador_id', 'ong_id', 'alimento_id', 'necessidade_id', 'quantidade', 'status',
+    'mensagem', 'data_doacao', 'data_atualizacao',
+)
+
+
+def arquivaveis(dias, alias='default'):
+    """Doações finalizadas há mais de `dias` dias, na ordem em que são arquivadas"""
+    corte = timezone.now() - timedelta(days=dias)
+    # status + data_doacao usa o índice doacao_status_data_idx; a data de atualização
+    # garante que a doação também foi finalizada antes do corte
+    return Doacao.objects.using(alias).filter(
+        status__in=STATUS_FINALIZADOS,
+        data_doacao__lt=corte,
+        data_atualizacao__lt=corte,
+    ).order_by('data_doacao', 'id')
+
+
+def arquivar_lote(dias, tamanho_lote=1000, alias='default'):
+    """Move um lote de um shard para DoacaoArquivada em uma transação; retorna quantas doações moveu"""
+    with transaction.atomic(using=alias):
+        linhas = list(
+            arquivaveis(dias, alias).select_for_update().values(*CAMPOS_ARQUIVADOS)[:tamanho_lote]
+        )
+        if not linhas:
+            return 0
+        agora = timezone.now()
+        # ignore_conflicts: um lote repetido (ex.: arquivo em outro banco) não duplica linhas
+        DoacaoArquivada.objects.using(alias).bulk_create(
+            [DoacaoArquivada(data_arquivamento=agora, **linha) for linha in linhas],
+            ignore_conflicts=True,
+        )
+        with arquivando():
+            Doacao.objects.using(alias).filter(id__in=[linha['id'] for linha in linhas]).delete()
+    return len(linhas)
+
+
+def historico_doacoes(limite=None, select_related=(), **filtros):
+    """Doações quentes e arquivadas que atendem aos filtros, mais recentes primeiro"""
+    alvos = shards.aliases_dos_filtros(filtros)
+    # Doador, ONG e alimento ficam em 'default' quando há shards: sem JOIN, buscados depois
+    juntar = select_related and alvos == ('default',)
+
+    def consultar(alias):
+        consultas = []
+        for modelo in (Doacao, DoacaoArquivada):
+            consulta = modelo.objects.using(alias).filter(**filtros).order_by('-data_doacao', '-id')
+            consultas.append(consulta.select_related(*select_related) if juntar else consulta)
+        if limite is not None:
+            consultas = [consulta[:limite] for consulta in consultas]
+        return [list(consulta) for consulta in consultas]
+
+    # Cada consulta já vem ordenada: basta intercalar
+    consultas = [consulta for resultado in shards.em_paralelo(consultar, alvos) for consulta in resultado]
+    combinadas = heapq.merge(*consultas, key=lambda d: (d.data_doacao, d.id), reverse=True)
+    doacoes = list(islice(combinadas, limite))
+    if select_related and not juntar:
+        prefetch_related_objects(doacoes, *select_related)
+    return doacoes
+
+
+def _contagens(consulta, filtros):
+    """Counter de consulta(queryset) somado entre as tabelas quente e arquivada dos shards"""
+    def contar(alias):
+        totais = Counter()
+        for modelo in (Doacao, DoacaoArquivada):
+            totais.update(dict(consulta(modelo.objects.using(alias).filter(**filtros).order_by())))
+        return totais
+
+    return sum(shards.em_paralelo(contar, shards.aliases_dos_filtros(filtros)), Counter())
+
+
+def contagem_status_historico(**filtros):
+    """{status: total} somando as tabelas quente e arquivada"""
+    return _contagens(lambda doacoes: doacoes.values_list('status').annotate(n=Count('id')), filtros)
+
+
+def ranking_entregues(campo, limite=5):
+    """[(id, total)] das doações entregues agrupadas por `campo` ('ong_id', 'doador_id'...)"""
+    totais = _contagens(lambda doacoes: doacoes.values_list(campo).annotate(n=Count('id')), {'status': 'entregue'})
+    return totais.most_common(limite)
@@ -0,0 +1,242 @@
+"""
+Importação em massa das necessidades de uma ONG a partir de CSV ou XLSX.
+
+O arquivo é lido linha a linha (csv.reader sobre o upload, ou openpyxl em
+modo read_only), e cada linha é validada sem consultas: o alimento é
+resolvido pelo catálogo em memória, por id ou por nome sem acentos. As
+linhas válidas são gravadas em lotes com um único INSERT ... ON CONFLICT
+(ong, alimento) DO UPDATE por lote; linhas inválidas são relatadas com o
+número da linha e não interrompem a importação.
+
+Colunas: alimento e quantidade_necessaria (obrigatórias), prioridade,
+observacoes e ativa. A quantidade recebida das necessidades existentes é
+preservada, e, como em editar_necessidade, uma linha não pode pedir menos
+do que já foi recebido.
+"""
+import csv
+import io
+import zipfile
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .catalogo import catalogo, normalizar_nome
+from .models import NecessidadeAlimento
+
+COLUNAS_OBRIGATORIAS = ('alimento', 'quantidade_necessaria')
+APELIDOS = {
+    'quantidade': 'quantidade_necessaria',
+    'observacao': 'observacoes',
+    'obs': 'observacoes',
+}
+CAMPOS_ATUALIZADOS = ['quantidade_necessaria', 'prioridade', 'observacoes', 'ativa', 'data_atualizacao']
+QUANTIDADE_MAXIMA = Decimal('99999999.99')
+VERDADEIROS = {'sim', 's', 'true', '1', 'ativa', 'x'}
+FALSOS = {'nao', 'n', 'false', '0', 'inativa'}
+
+# Aceita a chave ('media') ou o rótulo ('Média') de cada prioridade
+PRIORIDADES = {}
+for _chave, _rotulo in NecessidadeAlimento._meta.get_field('prioridade').choices:
+    PRIORIDADES[_chave] = _chave
+    PRIORIDADES[normalizar_nome(_rotulo)] = _chave
+
+
+class ErroImportacao(Exception):
+    """Arquivo que não pode ser importado (formato ou cabeçalho inválido)"""
+
+
+class ResultadoImportacao:
+    """Contagens da importação e erros por linha"""
+
+    def __init__(self):
+        self.linhas = 0
+        self.criadas = 0
+        self.atualizadas = 0
+        self.erros = []
+
+    @property
+    def importadas(self):
+        return self.criadas + self.atualizadas
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _cabecalho(valores, obrigatorias, apelidos):
+    colunas = []
+    for valor in valores:
+        coluna = normalizar_nome(valor or '').replace(' ', '_')
+        colunas.append(apelidos.get(coluna, coluna))
+    faltando = [coluna for coluna in obrigatorias if coluna not in colunas]
+    if faltando:
+        raise ErroImportacao(f'Coluna(s) obrigatória(s) ausente(s): {", ".join(faltando)}.')
+    return colunas
+
+
+def _linhas(cabecalho, linhas, primeira, obrigatorias, apelidos):
+    colunas = _cabecalho(cabecalho, obrigatorias, apelidos)
+    for numero, valores in enumerate(linhas, start=primeira):
+        # Linhas totalmente vazias (comuns no fim das planilhas) são ignoradas
+        if not any(_texto(valor) for valor in valores):
+            continue
+        yield numero, dict(zip(colunas, valores))
+
+
+def ler_csv(arquivo, obrigatorias=COLUNAS_OBRIGATORIAS, apelidos=APELIDOS, encoding='utf-8-sig'):
+    """(número da linha, {coluna: valor}) de um CSV separado por vírgula ou ponto e vírgula"""
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline='')
+    try:
+        primeira = texto.readline()
+        # Planilhas exportadas em português costumam usar ';'
+        delimitador = ';' if primeira.count(';') > primeira.count(',') else ','
+        cabecalho = next(csv.reader([primeira], delimiter=delimitador), [])
+        yield from _linhas(cabecalho, csv.reader(texto, delimiter=delimitador), 2, obrigatorias, apelidos)
+    except UnicodeDecodeError:
+        raise ErroImportacao(f'O arquivo não está codificado em {encoding}.')
+    except csv.Error as erro:
+        raise ErroImportacao(f'CSV inválido: {erro}.')
+    finally:
+        # Devolve o arquivo ao chamador, que é quem deve fechá-lo
+        texto.detach()
+
+
+def ler_xlsx(arquivo, obrigatorias=COLUNAS_OBRIGATORIAS, apelidos=APELIDOS):
+    """(número da linha, {coluna: valor}) da primeira planilha de um arquivo .xlsx"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao('A importação de arquivos .xlsx requer o pacote openpyxl; envie um CSV.')
+    try:
+        pasta = load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError):
+        # KeyError: zip válido sem as partes de uma planilha
+        raise ErroImportacao('O arquivo .xlsx está corrompido ou não é uma planilha do Excel.')
+    try:
+        linhas = pasta.active.iter_rows(values_only=True)
+        yield from _linhas(next(linhas, ()), linhas, 2, obrigatorias, apelidos)
+    finally:
+        pasta.close()
+
+
+def ler_arquivo(arquivo, nome, obrigatorias=COLUNAS_OBRIGATORIAS, apelidos=APELIDOS):
+    """Escolhe o leitor pela extensão do arquivo; as colunas padrão são as das necessidades"""
+    extensao = nome.rsplit('.', 1)[-1].lower() if '.' in nome else ''
+    if extensao == 'csv':
+        return ler_csv(arquivo, obrigatorias, apelidos)
+    if extensao == 'xlsx':
+        return ler_xlsx(arquivo, obrigatorias, apelidos)
+    raise ErroImportacao('Formato não suportado: envie um arquivo .csv ou .xlsx.')
+
+
+def _alimento(valor, indice):
+    texto = _texto(valor)
+    if not texto:
+        raise ValueError('alimento não informado')
+    if texto.isdigit():
+        alimento = indice.alimento(texto)
+        if alimento is None:
+            raise ValueError(f'alimento de id {texto} não encontrado')
+        return alimento
+    encontrados = indice.alimentos_por_nome(texto)
+    if not encontrados:
+        raise ValueError(f'alimento "{texto}" não encontrado')
+    if len(encontrados) > 1:
+        raise ValueError(f'há {len(encontrados)} alimentos chamados "{texto}"; use o id')
+    return encontrados[0]
+
+
+def _quantidade(valor):
+    if isinstance(valor, (int, float, Decimal)):
+        texto = str(valor)
+    else:
+        texto = _texto(valor).replace(' ', '')
+        if ',' in texto:
+            # Formato brasileiro: 1.234,5
+            texto = texto.replace('.', '').replace(',', '.')
+    try:
+        quantidade = Decimal(texto)
+        # NaN e infinito não são quantidades (e NaN nem pode ser comparado)
+        if not quantidade.is_finite():
+            raise InvalidOperation
+        quantidade = quantidade.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'quantidade inválida: "{_texto(valor)}"')
+    if not 0 < quantidade <= QUANTIDADE_MAXIMA:
+        raise ValueError(f'quantidade fora do intervalo: {quantidade}')
+    return quantidade
+
+
+def _prioridade(valor):
+    texto = normalizar_nome(_texto(valor))
+    if not texto:
+        return 'media'
+    if texto not in PRIORIDADES:
+        raise ValueError(f'prioridade inválida: "{_texto(valor)}"')
+    return PRIORIDADES[texto]
+
+
+def _ativa(valor):
+    texto = normalizar_nome(_texto(valor))
+    if not texto or texto in VERDADEIROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise ValueError(f'valor inválido para ativa: "{_texto(valor)}"')
+
+
+def necessidade_da_linha(ong, linha, indice):
+    """NecessidadeAlimento (não salva) montada a partir da linha; ValueError se inválida"""
+    alimento = _alimento(linha.get('alimento'), indice)
+    return NecessidadeAlimento(
+        ong=ong,
+        alimento_id=alimento.id,
+        quantidade_necessaria=_quantidade(linha.get('quantidade_necessaria')),
+        prioridade=_prioridade(linha.get('prioridade')),
+        observacoes=_texto(linha.get('observacoes')),
+        ativa=_ativa(linha.get('ativa')),
+    )
+
+
+def _gravar(lote, recebidas, resultado):
+    if not lote:
+        return
+    with transaction.atomic():
+        NecessidadeAlimento.objects.bulk_create(
+            lote.values(),
+            update_conflicts=True,
+            unique_fields=['ong', 'alimento'],
+            update_fields=CAMPOS_ATUALIZADOS,
+        )
+    novas = lote.keys() - recebidas.keys()
+    resultado.criadas += len(novas)
+    resultado.atualizadas += len(lote) - len(novas)
+    recebidas.update(dict.fromkeys(novas, Decimal('0')))
+
+
+def importar_necessidades(ong, linhas, tamanho_lote=1000):
+    """Cria ou atualiza as necessidades da ONG; retorna um ResultadoImportacao"""
+    resultado = ResultadoImportacao()
+    indice = catalogo()
+    # alimento_id -> quantidade já recebida das necessidades existentes
+    recebidas = dict(NecessidadeAlimento.objects.filter(ong=ong).values_list('alimento_id', 'quantidade_recebida'))
+    lote = {}
+    for numero, linha in linhas:
+        resultado.linhas += 1
+        try:
+            necessidade = necessidade_da_linha(ong, linha, indice)
+            recebida = recebidas.get(necessidade.alimento_id, 0)
+            if necessidade.quantidade_necessaria < recebida:
+                raise ValueError(
+                    f'quantidade {necessidade.quantidade_necessaria} menor que a já recebida ({recebida})'
+                )
+        except ValueError as erro:
+            resultado.erros.append((numero, str(erro)))
+            continue
+        # Alimento repetido no lote: vale a última linha (um INSERT não pode atualizar a mesma linha duas vezes)
+        lote[necessidade.alimento_id] = necessidade
+        if len(lote) >= tamanho_lote:
+            _gravar(lote, recebidas, resultado)
+            lote = {}
+    _gravar(lote, recebidas, resultado)
+    return resultado
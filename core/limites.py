@@ -0,0 +1,126 @@
+"""
+Limite de taxa por balde de tokens (token bucket), por IP e por conta.
+
+Cada balde tem uma capacidade (rajada máxima) e uma taxa de reposição em
+tokens por segundo. O estado fica no cache padrão do Django: com LocMemCache
+o limite vale por processo; com um cache compartilhado (Redis, Memcached)
+vale para todos os workers. A leitura e a escrita do balde não são atômicas,
+então rajadas concorrentes podem passar alguns tokens além do limite.
+
+A verificação acontece antes de qualquer trabalho caro da view (por exemplo,
+o hash PBKDF2 de authenticate()), e a rejeição é uma resposta 429 simples.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+class BaldeTokens:
+    """Balde de tokens com estado guardado no cache"""
+
+    def __init__(self, nome, capacidade, taxa):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.taxa = taxa
+
+    def consumir(self, chave, custo=1):
+        """Tenta retirar `custo` tokens; retorna (permitido, segundos até haver tokens)"""
+        # Hash da chave: nomes de usuário podem ter caracteres inválidos para o memcached
+        chave_cache = f'limite:{self.nome}:{hashlib.md5(str(chave).encode()).hexdigest()}'
+        agora = time.time()
+        tokens, atualizado = cache.get(chave_cache, (self.capacidade, agora))
+        tokens = min(self.capacidade, tokens + (agora - atualizado) * self.taxa)
+
+        if tokens >= custo:
+            cache.set(chave_cache, (tokens - custo, agora), self._validade())
+            return True, 0.0
+
+        cache.set(chave_cache, (tokens, agora), self._validade())
+        return False, (custo - tokens) / self.taxa
+
+    def _validade(self):
+        # Tempo para o balde encher de novo; depois disso a chave pode expirar
+        return int(self.capacidade / self.taxa) + 1
+
+
+def baldes(escopo):
+    """Baldes configurados em LIMITES_TAXA para o escopo, por dimensão ('ip', 'conta')"""
+    config = settings.LIMITES_TAXA.get(escopo, {})
+    return {
+        dimensao: BaldeTokens(f'{escopo}:{dimensao}', capacidade, taxa)
+        for dimensao, (capacidade, taxa) in config.items()
+    }
+
+
+def ip_cliente(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def verificar(escopo, ip, conta=None):
+    """Consome um token de cada balde do escopo; retorna os segundos de espera ou None"""
+    if not settings.LIMITES_TAXA_ATIVO:
+        return None
+    chaves = {'ip': ip, 'conta': conta}
+    espera = 0.0
+    for dimensao, balde in baldes(escopo).items():
+        chave = chaves.get(dimensao)
+        if chave in (None, ''):
+            continue
+        permitido, aguardar = balde.consumir(chave)
+        if not permitido:
+            espera = max(espera, aguardar)
+    return espera or None
+
+
+def resposta_limite_excedido(espera):
+    resposta = HttpResponse(
+        'Muitas tentativas. Aguarde alguns instantes e tente novamente.',
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    resposta['Retry-After'] = str(int(espera) + 1)
+    return resposta
+
+
+def limitar_taxa(escopo, conta=None, metodos=('POST',)):
+    """
+    Decorador de view que aplica os baldes de LIMITES_TAXA[escopo].
+
+    `conta` recebe a request e devolve a chave da conta (usuário informado no
+    login, id do usuário autenticado etc.). Só requisições com os `metodos`
+    informados consomem tokens.
+    """
+    def decorador(view):
+        def bloqueio(request):
+            if request.method not in metodos:
+                return None
+            chave_conta = conta(request) if conta else None
+            espera = verificar(escopo, ip_cliente(request), chave_conta)
+            return resposta_limite_excedido(espera) if espera is not None else None
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def envoltorio(request, *args, **kwargs):
+                return bloqueio(request) or await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def envoltorio(request, *args, **kwargs):
+                return bloqueio(request) or view(request, *args, **kwargs)
+        return envoltorio
+    return decorador
+
+
+def conta_do_formulario(campo):
+    """Chave de conta lida de um campo do POST (normalizada em minúsculas)"""
+    def extrair(request):
+        return request.POST.get(campo, '').strip().lower()
+    return extrair
+
+
+def conta_autenticada(request):
+    return request.user.pk if request.user.is_authenticated else None
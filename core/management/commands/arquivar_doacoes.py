@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core import historico, shards
+
+
+class Command(BaseCommand):
+    help = 'Move doações finalizadas antigas (entregues, canceladas, expiradas) para a tabela de arquivo, em lotes'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.ARQUIVO_DOACOES_DIAS,
+            help=f'Idade mínima, em dias, das doações arquivadas (padrão: {settings.ARQUIVO_DOACOES_DIAS})'
+        )
+        parser.add_argument('--lote', type=int, default=1000, help='Doações movidas por transação (padrão: 1000)')
+        parser.add_argument('--max-lotes', type=int, default=None, help='Para depois de N lotes')
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.0,
+            help='Segundos entre lotes, para aliviar o banco durante o horário de uso'
+        )
+
+    def handle(self, *args, **options):
+        # Cada lote é uma transação própria: interromper o comando perde no máximo
+        # o lote em andamento, e a próxima execução continua de onde parou
+        total = 0
+        lotes = 0
+        inicio = time.perf_counter()
+        for alias in shards.aliases():
+            while options['max_lotes'] is None or lotes < options['max_lotes']:
+                movidas = historico.arquivar_lote(options['dias'], options['lote'], alias)
+                if not movidas:
+                    break
+                total += movidas
+                lotes += 1
+                self.stdout.write(f'  lote {lotes} ({alias}): {movidas} doação(ões) arquivada(s)')
+                if options['pausa']:
+                    time.sleep(options['pausa'])
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} doação(ões) arquivada(s) em {lotes} lote(s) ({duracao:.1f}s)'
+        ))
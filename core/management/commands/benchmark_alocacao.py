@@ -0,0 +1,87 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from core import alocacao
+from core.benchmarks import banco_descartavel, Cronometro, formatar_resumo
+from core.models import User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento
+
+PRIORIDADES = ['baixa', 'media', 'alta', 'urgente']
+
+
+class Command(BaseCommand):
+    help = 'Mede o planejamento da alocação de uma doação grande entre muitas necessidades'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--necessidades', type=int, default=50000, help='Necessidades candidatas')
+        parser.add_argument('--repeticoes', type=int, default=10)
+        parser.add_argument(
+            '--quantidades',
+            type=Decimal,
+            nargs='+',
+            default=[Decimal('500'), Decimal('50000'), Decimal('10000000')],
+            help='Quantidades totais doadas'
+        )
+
+    def handle(self, *args, **options):
+        with banco_descartavel():
+            alimento = self.popular(options['necessidades'])
+
+            carga = Cronometro()
+            for _ in range(options['repeticoes']):
+                with carga.medir():
+                    candidatos = alocacao.candidatas(alimento.id)
+            self.stdout.write(formatar_resumo(f'carregar {len(candidatos)} candidatas', carga.resumo()))
+
+            for quantidade in options['quantidades']:
+                plano = Cronometro()
+                for _ in range(options['repeticoes']):
+                    with plano.medir():
+                        parcelas, sobra = alocacao.planejar(alimento.id, quantidade, candidatos=candidatos)
+                self.stdout.write(formatar_resumo(f'heap, {quantidade}', plano.resumo()))
+                self.stdout.write(f"{'':<28} {len(parcelas)} parcela(s), sobra {sobra}")
+
+            total = Cronometro()
+            for _ in range(options['repeticoes']):
+                with total.medir():
+                    alocacao.planejar(alimento.id, options['quantidades'][0])
+            self.stdout.write(formatar_resumo('carga + heap (ponta a ponta)', total.resumo()))
+
+    def popular(self, total):
+        self.stdout.write(f'Criando {total} ONGs com necessidades...')
+        categoria = CategoriaAlimento.objects.create(nome='Grãos e Cereais')
+        alimento = Alimento.objects.create(nome='Arroz', categoria=categoria, unidade_medida='kg')
+        usuarios = User.objects.bulk_create(
+            [User(username=f'ong{i}', password='!', user_type='ong') for i in range(total)],
+            batch_size=5000
+        )
+        ongs = ONG.objects.bulk_create(
+            [
+                ONG(
+                    user=usuario,
+                    nome=f'ONG {i}',
+                    cnpj=f'{i:014d}',
+                    descricao='-',
+                    endereco_completo='São Paulo, SP',
+                    telefone_contato='-',
+                    email_contato=f'ong{i}@example.com',
+                    responsavel='-',
+                )
+                for i, usuario in enumerate(usuarios)
+            ],
+            batch_size=5000
+        )
+        NecessidadeAlimento.objects.bulk_create(
+            [
+                NecessidadeAlimento(
+                    ong=ong,
+                    alimento=alimento,
+                    quantidade_necessaria=Decimal(random.randint(10, 2000)),
+                    quantidade_recebida=Decimal(random.randint(0, 10)),
+                    prioridade=random.choice(PRIORIDADES),
+                )
+                for ong in ongs
+            ],
+            batch_size=5000
+        )
+        return alimento
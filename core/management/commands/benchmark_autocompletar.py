@@ -0,0 +1,58 @@
+import random
+import string
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import Cronometro
+from core.catalogo import AlimentoInfo, CategoriaInfo, IndicePrefixos
+
+PALAVRAS = [
+    'Arroz', 'Feijão', 'Macarrão', 'Farinha', 'Açúcar', 'Óleo', 'Leite', 'Café', 'Milho', 'Aveia',
+    'Integral', 'Preto', 'Carioca', 'Parboilizado', 'Mandioca', 'Trigo', 'Fubá', 'Sardinha', 'Atum', 'Extrato',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mede o índice de prefixos do autocompletar de alimentos com um catálogo sintético (sem banco)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alimentos', type=int, nargs='+', default=[100, 5000, 50000])
+        parser.add_argument('--buscas', type=int, default=20000)
+        parser.add_argument('--limite', type=int, default=10)
+
+    def handle(self, *args, **options):
+        sorteio = random.Random(0)
+        categoria = CategoriaInfo(1, 'Grãos e Cereais', '')
+        for total in options['alimentos']:
+            alimentos = [
+                AlimentoInfo(
+                    i,
+                    f"{' '.join(sorteio.sample(PALAVRAS, 2))} {''.join(sorteio.choices(string.ascii_uppercase, k=3))}{i}",
+                    '',
+                    'kg',
+                    categoria,
+                    (sorteio.choice(PALAVRAS).lower(),),
+                )
+                for i in range(total)
+            ]
+            montagem = Cronometro()
+            with montagem.medir():
+                indice = IndicePrefixos(alimentos)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {total} alimentos: índice montado em {montagem.duracoes[0] * 1000:.1f} ms'
+            ))
+
+            prefixos = [
+                sorteio.choice(PALAVRAS)[:tamanho].lower()
+                for tamanho in sorteio.choices([1, 2, 3, 5], k=options['buscas'])
+            ]
+            buscas = Cronometro()
+            for prefixo in prefixos:
+                with buscas.medir():
+                    indice.buscar(prefixo, options['limite'])
+            resumo = buscas.resumo()
+            # resumo() vem em ms; aqui a escala é de microssegundos
+            self.stdout.write(
+                f"  busca (top {options['limite']}): n={resumo['n']}  p50={resumo['p50'] * 1000:.1f} µs  "
+                f"p95={resumo['p95'] * 1000:.1f} µs  max={resumo['max'] * 1000:.1f} µs"
+            )
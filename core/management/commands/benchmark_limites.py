@@ -0,0 +1,127 @@
+import logging
+import random
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from core.benchmarks import banco_descartavel, Cronometro, formatar_resumo
+from core.models import User
+
+SENHA = 'senha-do-benchmark'
+TOTAL_CONTAS = 50
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga: latência de logins legítimos durante um ataque de força bruta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duracao', type=float, default=10.0, help='Segundos medidos por fase')
+        parser.add_argument(
+            '--aquecimento',
+            type=float,
+            default=5.0,
+            help='Segundos de ataque antes de começar a medir (absorve a rajada inicial)'
+        )
+        parser.add_argument('--atacantes', type=int, default=4, help='Threads enviando senhas erradas')
+        parser.add_argument(
+            '--taxa-ataque',
+            type=float,
+            default=40.0,
+            help='Tentativas de login por segundo somando todos os atacantes'
+        )
+        parser.add_argument('--usuarios', type=int, default=2, help='Threads de usuários legítimos')
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=0.5,
+            help='Pausa entre logins de cada usuário legítimo'
+        )
+
+    def handle(self, *args, **options):
+        # Cada 429 geraria um aviso no log do django.request
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        with banco_descartavel():
+            hash_senha = make_password(SENHA)
+            User.objects.bulk_create([
+                User(username=f'usuario{i}', password=hash_senha) for i in range(TOTAL_CONTAS)
+            ])
+
+            fases = [
+                ('sem ataque', False, True),
+                ('ataque, sem limite de taxa', True, False),
+                ('ataque, com limite de taxa', True, True),
+            ]
+            for rotulo, com_ataque, limite_ativo in fases:
+                cache.clear()
+                with override_settings(LIMITES_TAXA_ATIVO=limite_ativo):
+                    legitimos, ataques = self.executar_fase(com_ataque, options)
+                self.stdout.write(formatar_resumo(rotulo, legitimos.resumo()))
+                if com_ataque:
+                    self.stdout.write(
+                        f"{'':<28} ataque: {ataques['total']} tentativas, {ataques[429]} rejeitadas com 429"
+                    )
+
+    def executar_fase(self, com_ataque, options):
+        parar = threading.Event()
+        medindo = threading.Event()
+        legitimos = Cronometro()
+        ataques = {'total': 0, 429: 0}
+        trava = threading.Lock()
+
+        def atacar(numero):
+            cliente = Client(REMOTE_ADDR=f'203.0.113.{numero % 2 + 1}')
+            # Carga em malha aberta: cada atacante dispara em ritmo fixo, sem esperar o servidor ficar livre
+            periodo = options['atacantes'] / options['taxa_ataque']
+            proximo = time.perf_counter()
+            try:
+                while not parar.is_set():
+                    proximo += periodo
+                    espera = proximo - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                    # Lista vazada de outras contas: o balde por conta dos usuários legítimos fica intacto
+                    resposta = cliente.post('/login/', {
+                        'username': f'vazado{random.randrange(10000)}',
+                        'password': 'senha-errada',
+                    })
+                    with trava:
+                        ataques['total'] += 1
+                        ataques[429] += resposta.status_code == 429
+            finally:
+                connections.close_all()
+
+        def usar(numero):
+            contador = 0
+            try:
+                medindo.wait()
+                while not parar.is_set():
+                    contador += 1
+                    cliente = Client(REMOTE_ADDR=f'198.51.{numero}.{contador % 250 + 1}')
+                    dados = {'username': f'usuario{contador % TOTAL_CONTAS}', 'password': SENHA}
+                    with legitimos.medir():
+                        resposta = cliente.post('/login/', dados)
+                    if resposta.status_code != 302:
+                        self.stderr.write(f'Login legítimo falhou: HTTP {resposta.status_code}')
+                    time.sleep(options['intervalo'])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=usar, args=(n,)) for n in range(options['usuarios'])]
+        if com_ataque:
+            threads += [threading.Thread(target=atacar, args=(n,)) for n in range(options['atacantes'])]
+        for thread in threads:
+            thread.start()
+
+        if com_ataque:
+            time.sleep(options['aquecimento'])
+        medindo.set()
+        time.sleep(options['duracao'])
+        parar.set()
+        for thread in threads:
+            thread.join()
+        return legitimos, ataques
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from core import autenticacao
+from core.benchmarks import banco_descartavel, Cronometro, formatar_resumo
+from core.models import User
+
+SENHA = 'senha-do-benchmark'
+TOTAL_CONTAS = 50
+BACKEND_PADRAO = 'django.contrib.auth.backends.ModelBackend'
+BACKEND_POOL = 'core.autenticacao.BackendHashEmPool'
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga: logins por segundo em um único event loop (um worker ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duracao', type=float, default=10.0, help='Segundos medidos por fase')
+        parser.add_argument('--concorrencia', type=int, default=8, help='Logins simultâneos no event loop')
+        parser.add_argument(
+            '--pools',
+            type=int,
+            nargs='+',
+            default=[1, 2, 4],
+            help='Tamanhos de pool de hash comparados com o backend padrão do Django'
+        )
+        parser.add_argument('--processos', action='store_true', help='Usa pool de processos em vez de threads')
+        parser.add_argument(
+            '--iteracoes',
+            type=int,
+            default=None,
+            help='Iterações do PBKDF2 (padrão: SENHAS_PBKDF2_ITERACOES)'
+        )
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        ajustes = {'LIMITES_TAXA_ATIVO': False}
+        if options['iteracoes']:
+            ajustes['SENHAS_PBKDF2_ITERACOES'] = options['iteracoes']
+
+        with banco_descartavel(), override_settings(**ajustes):
+            hash_senha = make_password(SENHA)
+            User.objects.bulk_create([
+                User(username=f'usuario{i}', password=hash_senha) for i in range(TOTAL_CONTAS)
+            ])
+
+            fases = [('hash no event loop', BACKEND_PADRAO, 1)]
+            tipo = 'processos' if options['processos'] else 'threads'
+            fases += [(f'pool de {n} {tipo}', BACKEND_POOL, n) for n in options['pools']]
+
+            for rotulo, backend, tamanho in fases:
+                autenticacao.encerrar_pool()
+                with override_settings(
+                    AUTHENTICATION_BACKENDS=[backend],
+                    SENHAS_POOL_TIPO=tipo,
+                    SENHAS_POOL_TAMANHO=tamanho,
+                ):
+                    logins, atraso_loop, total = asyncio.run(self.executar_fase(options))
+                self.stdout.write(formatar_resumo(rotulo, logins.resumo()))
+                self.stdout.write(
+                    f"{'':<28} {total / options['duracao']:.1f} logins/s; "
+                    f"atraso do event loop p95={atraso_loop.resumo()['p95']:.1f} ms "
+                    f"max={atraso_loop.resumo()['max']:.1f} ms"
+                )
+            autenticacao.encerrar_pool()
+
+    async def executar_fase(self, options):
+        logins = Cronometro()
+        atraso_loop = Cronometro()
+        fim = time.perf_counter() + options['duracao']
+        total = 0
+
+        async def logar(numero):
+            nonlocal total
+            contador = 0
+            while time.perf_counter() < fim:
+                contador += 1
+                cliente = AsyncClient(REMOTE_ADDR=f'198.51.{numero}.{contador % 250 + 1}')
+                dados = {'username': f'usuario{(numero + contador) % TOTAL_CONTAS}', 'password': SENHA}
+                with logins.medir():
+                    resposta = await cliente.post('/login/', dados)
+                if resposta.status_code != 302:
+                    self.stderr.write(f'Login falhou: HTTP {resposta.status_code}')
+                total += 1
+
+        async def pulsar():
+            # Mede quanto um timer de 10 ms atrasa: é o tempo que o loop passou bloqueado
+            while time.perf_counter() < fim:
+                previsto = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                atraso_loop.duracoes.append(max(0.0, time.perf_counter() - previsto))
+
+        await asyncio.gather(pulsar(), *(logar(n) for n in range(options['concorrencia'])))
+        return logins, atraso_loop, total
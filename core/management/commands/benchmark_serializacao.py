@@ -0,0 +1,127 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from core import renderizadores, serializadores
+from core.benchmarks import banco_descartavel, Cronometro, formatar_resumo
+from core.models import User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento, Doacao
+
+PRIORIDADES = ['baixa', 'media', 'alta', 'urgente']
+
+
+class NecessidadeModelSerializer(serializers.ModelSerializer):
+    alimento = serializers.CharField(source='alimento.nome')
+    unidade = serializers.CharField(source='alimento.get_unidade_medida_display')
+
+    class Meta:
+        model = NecessidadeAlimento
+        fields = [
+            'id', 'ong_id', 'alimento_id', 'quantidade_necessaria', 'quantidade_recebida',
+            'quantidade_faltante', 'percentual_recebido', 'prioridade', 'observacoes', 'alimento', 'unidade',
+        ]
+
+
+class DoacaoModelSerializer(serializers.ModelSerializer):
+    alimento = serializers.CharField(source='alimento.nome')
+
+    class Meta:
+        model = Doacao
+        fields = [
+            'id', 'ong_id', 'alimento_id', 'necessidade_id', 'quantidade', 'status', 'mensagem', 'data_doacao',
+            'alimento',
+        ]
+
+
+class Command(BaseCommand):
+    help = 'Compara ModelSerializer + JSONRenderer com values() + JSONRapidoRenderer em listas grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeticoes', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with banco_descartavel():
+            self.popular(max(options['linhas']))
+            padrao = JSONRenderer()
+            rapido = renderizadores.JSONRapidoRenderer()
+            casos = [
+                ('necessidades', NecessidadeAlimento.objects.select_related('alimento'),
+                 NecessidadeModelSerializer, serializadores.NecessidadeLeitura()),
+                ('doacoes', Doacao.objects.select_related('alimento'),
+                 DoacaoModelSerializer, serializadores.DoacaoLeitura()),
+            ]
+            for linhas in options['linhas']:
+                for nome, queryset, model_serializer, leitura in casos:
+                    pagina = queryset.order_by('id')[:linhas]
+                    variantes = [
+                        ('ModelSerializer + DRF', lambda: padrao.render(model_serializer(pagina, many=True).data)),
+                        ('values() + DRF', lambda: padrao.render(leitura.serializar(pagina))),
+                        ('values() + rápido', lambda: rapido.render(leitura.serializar(pagina))),
+                    ]
+                    for rotulo, funcao in variantes:
+                        cronometro = Cronometro()
+                        for _ in range(options['repeticoes']):
+                            with cronometro.medir():
+                                corpo = funcao()
+                        self.stdout.write(formatar_resumo(f'{nome} {linhas}, {rotulo}', cronometro.resumo()))
+                    self.stdout.write(f"{'':<28} {len(corpo) / 1024:.0f} KB por resposta")
+
+    def popular(self, total):
+        self.stdout.write(f'Criando {total} necessidades e {total} doações...')
+        categoria = CategoriaAlimento.objects.create(nome='Grãos e Cereais')
+        alimentos = [
+            Alimento.objects.create(nome=nome, categoria=categoria, unidade_medida='kg')
+            for nome in ('Arroz', 'Feijão', 'Macarrão', 'Farinha')
+        ]
+        doador = User.objects.create(username='doador', password='!', user_type='cliente')
+        usuarios = User.objects.bulk_create(
+            [User(username=f'ong{i}', password='!', user_type='ong') for i in range(total)],
+            batch_size=5000
+        )
+        ongs = ONG.objects.bulk_create(
+            [
+                ONG(
+                    user=usuario,
+                    nome=f'ONG {i}',
+                    cnpj=f'{i:014d}',
+                    descricao='-',
+                    endereco_completo='São Paulo, SP',
+                    telefone_contato='-',
+                    email_contato=f'ong{i}@example.com',
+                    responsavel='-',
+                )
+                for i, usuario in enumerate(usuarios)
+            ],
+            batch_size=5000
+        )
+        necessidades = NecessidadeAlimento.objects.bulk_create(
+            [
+                NecessidadeAlimento(
+                    ong=ong,
+                    alimento=random.choice(alimentos),
+                    quantidade_necessaria=Decimal(random.randint(10, 2000)),
+                    quantidade_recebida=Decimal(random.randint(0, 10)),
+                    prioridade=random.choice(PRIORIDADES),
+                    observacoes='Entregar pela manhã',
+                )
+                for ong in ongs
+            ],
+            batch_size=5000
+        )
+        Doacao.objects.bulk_create(
+            [
+                Doacao(
+                    doador=doador,
+                    ong_id=necessidade.ong_id,
+                    alimento_id=necessidade.alimento_id,
+                    necessidade=necessidade,
+                    quantidade=Decimal(random.randint(1, 50)),
+                    mensagem='Boa sorte!',
+                )
+                for necessidade in necessidades
+            ],
+            batch_size=5000
+        )
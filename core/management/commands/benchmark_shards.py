@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import eventos, shards
+from core.benchmarks import banco_descartavel, shards_descartaveis, Cronometro, formatar_resumo
+from core.models import User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga: doações gravadas por segundo com escritores concorrentes, por número de shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help='Números de shards medidos')
+        parser.add_argument('--escritores', type=int, default=8, help='Threads gravando doações ao mesmo tempo')
+        parser.add_argument('--doacoes', type=int, default=200, help='Doações gravadas por escritor')
+        parser.add_argument('--ongs', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with banco_descartavel():
+            doador, ongs, alimento = self.popular(options['ongs'])
+            for quantidade in options['shards']:
+                with shards_descartaveis(quantidade):
+                    necessidades = self.criar_necessidades(ongs, alimento)
+                    self.medir(quantidade, doador, ongs, necessidades, alimento, options)
+
+    def medir(self, quantidade, doador, ongs, necessidades, alimento, options):
+        cronometro = Cronometro()
+        trava = threading.Lock()
+
+        def escrever(semente):
+            sorteio = random.Random(semente)
+            duracoes = []
+            try:
+                for _ in range(options['doacoes']):
+                    ong = sorteio.choice(ongs)
+                    inicio = time.perf_counter()
+                    eventos.criar_doacao(
+                        doador=doador,
+                        ong=ong,
+                        alimento=alimento,
+                        necessidade_id=necessidades[ong.id],
+                        quantidade=Decimal(sorteio.randint(1, 50)),
+                    )
+                    duracoes.append(time.perf_counter() - inicio)
+            finally:
+                connections.close_all()
+            with trava:
+                cronometro.duracoes.extend(duracoes)
+
+        escritores = [threading.Thread(target=escrever, args=(semente,)) for semente in range(options['escritores'])]
+        inicio = time.perf_counter()
+        for escritor in escritores:
+            escritor.start()
+        for escritor in escritores:
+            escritor.join()
+        duracao = time.perf_counter() - inicio
+
+        total = len(cronometro.duracoes)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {quantidade} shard(s): {total} doações em {duracao:.2f}s = {total / duracao:,.0f} doações/s'
+        ))
+        self.stdout.write(formatar_resumo(f'  criar_doacao, {quantidade} shard(s)', cronometro.resumo()))
+
+    def criar_necessidades(self, ongs, alimento):
+        """{ong_id: necessidade_id}, com as necessidades gravadas no shard de cada ONG"""
+        necessidades = {}
+        for alias, grupo in shards.agrupar_por_shard(
+            NecessidadeAlimento(ong=ong, alimento=alimento, quantidade_necessaria=Decimal('1000000'))
+            for ong in ongs
+        ).items():
+            for necessidade in NecessidadeAlimento.objects.using(alias).bulk_create(grupo):
+                necessidades[necessidade.ong_id] = necessidade.id
+        return necessidades
+
+    def popular(self, total):
+        self.stdout.write(f'Criando {total} ONGs...')
+        categoria = CategoriaAlimento.objects.create(nome='Grãos e Cereais')
+        alimento = Alimento.objects.create(nome='Arroz', categoria=categoria, unidade_medida='kg')
+        doador = User.objects.create(username='doador', password='!', user_type='cliente')
+        usuarios = User.objects.bulk_create(
+            [User(username=f'ong{i}', password='!', user_type='ong') for i in range(total)]
+        )
+        ongs = ONG.objects.bulk_create([
+            ONG(
+                user=usuario,
+                nome=f'ONG {i}',
+                cnpj=f'{i:014d}',
+                descricao='-',
+                endereco_completo='São Paulo, SP',
+                telefone_contato='-',
+                email_contato=f'ong{i}@example.com',
+                responsavel='-',
+            )
+            for i, usuario in enumerate(usuarios)
+        ])
+        return doador, ongs, alimento
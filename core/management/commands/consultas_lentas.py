@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand
+from core.consultas_lentas import arquivos_de_log
+
+
+class Command(BaseCommand):
+    help = 'Resume o log de consultas lentas, agrupando as consultas pela forma normalizada'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Quantidade de formas exibidas (padrão: 10)')
+        parser.add_argument('--view', help='Considera apenas consultas feitas pela view informada')
+        parser.add_argument('--ordenar', choices=['total', 'max', 'contagem'], default='total')
+        parser.add_argument('--sem-plano', action='store_true', help='Não exibe os planos de execução')
+
+    def handle(self, *args, **options):
+        formas = {}
+        for caminho in arquivos_de_log():
+            with open(caminho, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        ocorrencia = json.loads(linha)
+                    except ValueError:
+                        continue
+                    if options['view'] and ocorrencia.get('view') != options['view']:
+                        continue
+                    forma = formas.setdefault(ocorrencia['id_forma'], {
+                        'forma': ocorrencia['forma'],
+                        'contagem': 0,
+                        'total': 0.0,
+                        'max': 0.0,
+                        'views': set(),
+                        'plano': None,
+                    })
+                    forma['contagem'] += 1
+                    forma['total'] += ocorrencia['duracao_ms']
+                    forma['max'] = max(forma['max'], ocorrencia['duracao_ms'])
+                    if ocorrencia.get('view'):
+                        forma['views'].add(ocorrencia['view'])
+                    forma['plano'] = ocorrencia.get('plano') or forma['plano']
+
+        if not formas:
+            self.stdout.write(self.style.WARNING('⚠ Nenhuma consulta lenta registrada'))
+            return
+
+        ordenadas = sorted(formas.items(), key=lambda item: item[1][options['ordenar']], reverse=True)
+        for id_forma, forma in ordenadas[:options['top']]:
+            self.stdout.write(self.style.SUCCESS(
+                f"\n[{id_forma}] {forma['contagem']}x  total={forma['total']:.1f} ms  "
+                f"max={forma['max']:.1f} ms  views={', '.join(sorted(forma['views'])) or '-'}"
+            ))
+            self.stdout.write(f"  {forma['forma']}")
+            if forma['plano'] and not options['sem_plano']:
+                for linha in forma['plano'].splitlines():
+                    self.stdout.write(f'    {linha}')
+        self.stdout.write(f'\n{len(formas)} forma(s) distinta(s)')
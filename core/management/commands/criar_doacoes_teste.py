@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from core.models import User, ONG, Alimento, Doacao
+from core.models import User, ONG, Alimento, NecessidadeAlimento, Doacao
+from core.eventos import registrar_criacoes
 
 
 class Command(BaseCommand):
@@ -64,12 +65,16 @@ class Command(BaseCommand):
                     ong=dados['ong'],
                     alimento=dados['alimento'],
                     defaults={
+                        'necessidade': NecessidadeAlimento.objects.filter(
+                            ong=dados['ong'], alimento=dados['alimento']
+                        ).first(),
                         'quantidade': dados['quantidade'],
                         'status': dados['status'],
                         'mensagem': dados['mensagem']
                     }
                 )
                 if created:
+                    registrar_criacoes([doacao])
                     self.stdout.write(
                         self.style.SUCCESS(
                             f"✓ Doação criada: {dados['alimento'].nome} → {dados['ong'].nome} ({dados['status']})"
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import backfill as backfill_mod
+from core.models import BackfillProgresso
+
+
+class Command(BaseCommand):
+    help = 'Executa backfills registrados em lotes pela chave primária, retomando do último checkpoint'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('nomes', nargs='*', help='Backfills a executar (sem nomes: lista os registrados)')
+        parser.add_argument('--lote', type=int, default=None, help='Linhas por lote (padrão: o do backfill)')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos entre lotes')
+        parser.add_argument('--max-lotes', type=int, default=None, help='Para depois de N lotes (retomável)')
+        parser.add_argument('--reiniciar', action='store_true', help='Descarta o checkpoint e recomeça do início')
+
+    def handle(self, *args, **options):
+        registrados = backfill_mod.backfills()
+        if not options['nomes']:
+            self.listar(registrados)
+            return
+
+        desconhecidos = [nome for nome in options['nomes'] if nome not in registrados]
+        if desconhecidos:
+            raise CommandError(f'Backfill(s) desconhecido(s): {", ".join(desconhecidos)}')
+
+        for nome in options['nomes']:
+            self.executar(registrados[nome], options)
+
+    def listar(self, registrados):
+        progressos = BackfillProgresso.objects.in_bulk(list(registrados), field_name='nome')
+        self.stdout.write('📋 Backfills registrados:')
+        for nome, item in sorted(registrados.items()):
+            progresso = progressos.get(nome)
+            if progresso is None:
+                situacao = 'não iniciado'
+            elif progresso.concluido_em:
+                situacao = f'concluído em {progresso.concluido_em:%d/%m/%Y %H:%M} ({progresso.linhas_processadas} linha(s))'
+            else:
+                situacao = f'em andamento: id {progresso.ultimo_id}, {progresso.linhas_processadas} linha(s)'
+            self.stdout.write(f'  {nome} ({item.modelo._meta.label}): {situacao}')
+
+    def executar(self, item, options):
+        totais = {'linhas': 0, 'alteradas': 0}
+        inicio = time.perf_counter()
+
+        def relatar(progresso, linhas, alteradas, segundos):
+            totais['linhas'] += linhas
+            totais['alteradas'] += alteradas
+            taxa = linhas / segundos if segundos else 0
+            self.stdout.write(
+                f'  {item.nome}: lote {progresso.lotes} até id {progresso.ultimo_id}, '
+                f'{alteradas}/{linhas} alterada(s) ({taxa:,.0f} linhas/s)'
+            )
+
+        progresso = backfill_mod.executar(
+            item,
+            tamanho_lote=options['lote'],
+            pausa=options['pausa'],
+            max_lotes=options['max_lotes'],
+            reiniciar=options['reiniciar'],
+            ao_concluir_lote=relatar,
+        )
+
+        duracao = time.perf_counter() - inicio
+        taxa = totais['linhas'] / duracao if duracao else 0
+        situacao = 'concluído' if progresso.concluido_em else f'pausado no id {progresso.ultimo_id}'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {item.nome}: {totais["alteradas"]} alterada(s) em {totais["linhas"]} linha(s) '
+            f'({duracao:.1f}s, {taxa:,.0f} linhas/s) - {situacao}'
+        ))
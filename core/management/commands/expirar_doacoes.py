@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core import expiracao, shards
+
+
+class Command(BaseCommand):
+    help = 'Expira, em lotes, doações pendentes que a ONG não confirmou dentro do prazo'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.EXPIRACAO_DOACOES_DIAS,
+            help=f'Idade mínima, em dias, das doações pendentes expiradas (padrão: {settings.EXPIRACAO_DOACOES_DIAS})'
+        )
+        parser.add_argument('--lote', type=int, default=500, help='Doações expiradas por transação (padrão: 500)')
+        parser.add_argument('--max-lotes', type=int, default=None, help='Para depois de N lotes')
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.0,
+            help='Segundos entre lotes, para aliviar o banco durante o horário de uso'
+        )
+
+    def handle(self, *args, **options):
+        # Lotes curtos, cada um em sua transação: as doações ficam travadas só
+        # durante um lote, e interromper o comando não desfaz os lotes anteriores
+        total = 0
+        lotes = 0
+        maior_lote = 0.0
+        inicio = time.perf_counter()
+        for alias in shards.aliases():
+            while options['max_lotes'] is None or lotes < options['max_lotes']:
+                inicio_lote = time.perf_counter()
+                selecionadas, expiradas = expiracao.expirar_lote(options['dias'], options['lote'], alias)
+                # Só para quando não há mais pendentes antigas: um lote todo confirmado
+                # no meio do caminho expira zero, mas ainda pode haver outros depois dele
+                if not selecionadas:
+                    break
+                duracao_lote = time.perf_counter() - inicio_lote
+                maior_lote = max(maior_lote, duracao_lote)
+                total += expiradas
+                lotes += 1
+                self.stdout.write(
+                    f'  lote {lotes} ({alias}): {expiradas} doação(ões) expirada(s) em {duracao_lote * 1000:.0f} ms'
+                )
+                if options['pausa']:
+                    time.sleep(options['pausa'])
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} doação(ões) expirada(s) em {lotes} lote(s) ({duracao:.1f}s, '
+            f'{total / duracao if duracao else 0:,.0f} doações/s, lote mais longo {maior_lote * 1000:.0f} ms)'
+        ))
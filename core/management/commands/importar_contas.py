@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import contas, importacao
+
+
+class Command(BaseCommand):
+    help = 'Cria contas de doadores e de ONGs (com perfil) a partir de um arquivo CSV ou XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=None,
+            help='Processos para o hash das senhas (padrão: todos os núcleos)'
+        )
+        parser.add_argument('--lote', type=int, default=500, help='Contas por bulk_create (padrão: 500)')
+        parser.add_argument('--simular', action='store_true', help='Só valida o arquivo, sem gravar')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                linhas = importacao.ler_arquivo(
+                    arquivo, options['arquivo'], contas.COLUNAS_OBRIGATORIAS, contas.APELIDOS
+                )
+                resultado = contas.importar_contas(
+                    linhas,
+                    processos=options['processos'],
+                    tamanho_lote=options['lote'],
+                    simular=options['simular'],
+                )
+        except (OSError, importacao.ErroImportacao) as erro:
+            raise CommandError(str(erro))
+        duracao = time.perf_counter() - inicio
+
+        for linha, erro in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'  linha {linha}: {erro}'))
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Simulação: {resultado.linhas - len(resultado.erros)} conta(s) válida(s), '
+                f'{len(resultado.erros)} erro(s) em {resultado.linhas} linha(s)'
+            ))
+            return
+        taxa = resultado.criadas / duracao if duracao else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {resultado.criadas} conta(s) criada(s), {len(resultado.erros)} erro(s) '
+            f'em {resultado.linhas} linha(s) ({duracao:.1f}s, {taxa:,.0f} contas/s)'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import importacao
+from core.models import ONG
+
+
+class Command(BaseCommand):
+    help = 'Cria ou atualiza as necessidades de uma ONG a partir de um arquivo CSV ou XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ong', type=int, help='Id da ONG')
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--lote', type=int, default=1000, help='Linhas por INSERT (padrão: 1000)')
+
+    def handle(self, *args, **options):
+        try:
+            ong = ONG.objects.get(pk=options['ong'])
+        except ONG.DoesNotExist:
+            raise CommandError(f'ONG {options["ong"]} não encontrada')
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importacao.importar_necessidades(
+                    ong, importacao.ler_arquivo(arquivo, options['arquivo']), options['lote']
+                )
+        except (OSError, importacao.ErroImportacao) as erro:
+            raise CommandError(str(erro))
+        duracao = time.perf_counter() - inicio
+
+        for linha, erro in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'  linha {linha}: {erro}'))
+        taxa = resultado.linhas / duracao if duracao else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {ong.nome}: {resultado.criadas} criada(s), {resultado.atualizadas} atualizada(s), '
+            f'{len(resultado.erros)} erro(s) em {resultado.linhas} linha(s) '
+            f'({duracao:.2f}s, {taxa:,.0f} linhas/s)'
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import eventos
+
+
+class Command(BaseCommand):
+    help = 'Processa os eventos de doações pendentes para cada consumidor registrado'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumidor',
+            action='append',
+            dest='nomes',
+            help='Processa apenas o consumidor informado (pode ser repetido)'
+        )
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Recalcula o estado dos consumidores a partir das tabelas antes de processar'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Continua executando, verificando novos eventos a cada intervalo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5.0,
+            help='Segundos entre verificações no modo contínuo (padrão: 5)'
+        )
+
+    def handle(self, *args, **options):
+        registrados = eventos.consumidores()
+        nomes = options['nomes'] or sorted(registrados)
+        desconhecidos = set(nomes) - set(registrados)
+        if desconhecidos:
+            raise CommandError(f"Consumidor(es) desconhecido(s): {', '.join(sorted(desconhecidos))}")
+
+        selecionados = [registrados[nome] for nome in nomes]
+
+        if options['reconstruir']:
+            for consumidor in selecionados:
+                eventos.reconstruir(consumidor)
+                self.stdout.write(self.style.SUCCESS(f'✓ {consumidor.nome} reconstruído'))
+
+        while True:
+            for consumidor in selecionados:
+                processados = eventos.processar_pendentes(consumidor)
+                consumidor.manter()
+                if processados or not options['continuo']:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'✓ {consumidor.nome}: {processados} evento(s) processado(s)')
+                    )
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import tarefas
+
+
+def _inicializar_processo():
+    # Necessário quando os processos são criados com "spawn" em vez de "fork"
+    django.setup()
+
+
+def _executar(tarefa_id):
+    try:
+        return tarefas.executar_tarefa(tarefa_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas da fila em segundo plano'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=settings.TAREFAS_CONCORRENCIA,
+            help='Número de threads (ou processos) executando tarefas'
+        )
+        parser.add_argument(
+            '--processos',
+            action='store_true',
+            help='Usa um pool de processos em vez de threads (tarefas que usam muita CPU)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Tarefas reservadas por vez (padrão: 2x a concorrência)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Segundos de espera quando a fila está vazia (padrão: 1)'
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa as tarefas prontas e encerra'
+        )
+
+    def handle(self, *args, **options):
+        concorrencia = max(1, options['concorrencia'])
+        lote = options['lote'] or concorrencia * 2
+
+        if options['processos']:
+            # As conexões abertas não podem ser herdadas pelos processos filhos
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concorrencia, initializer=_inicializar_processo)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix='tarefa')
+
+        modo = 'processos' if options['processos'] else 'threads'
+        self.stdout.write(f'Worker iniciado com {concorrencia} {modo}')
+
+        with pool:
+            while True:
+                liberadas, falharam = tarefas.liberar_travadas()
+                if liberadas:
+                    self.stdout.write(self.style.WARNING(f'⚠ {liberadas} tarefa(s) travada(s) devolvida(s) à fila'))
+                if falharam:
+                    self.stdout.write(self.style.ERROR(f'❌ {falharam} tarefa(s) travada(s) sem tentativas restantes'))
+
+                ids = tarefas.reservar_lote(lote)
+                if options['processos']:
+                    connections.close_all()
+
+                for tarefa_id, status in zip(ids, pool.map(_executar, ids)):
+                    estilo = self.style.SUCCESS if status == 'concluida' else self.style.WARNING
+                    self.stdout.write(estilo(f'Tarefa {tarefa_id}: {status}'))
+
+                if not ids:
+                    if options['uma_vez']:
+                        break
+                    time.sleep(options['intervalo'])
@@ -1,14 +1,17 @@
 from django.core.management.base import BaseCommand
 from core.models import Doacao, NecessidadeAlimento, ONG, Alimento
+from core import eventos
 import random
 
 
 class Command(BaseCommand):
     help = 'Reinicia o banco de doações e necessidades'
+    requires_system_checks = []
 
     def handle(self, *args, **kwargs):
         # Limpar
         Doacao.objects.all().delete()
+        eventos.reiniciar()
         NecessidadeAlimento.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✅ Banco limpo!'))
         
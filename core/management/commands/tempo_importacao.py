@@ -0,0 +1,92 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Partida de um worker: aplicação WSGI e URLconf carregadas, sem atender requisições
+PARTIDA_WORKER = (
+    'from donation_project.wsgi import application\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+# Partida de um comando: carrega a classe e roda as verificações que ele exigir, sem chamar handle()
+PARTIDA_COMANDO = (
+    'import django\n'
+    'django.setup()\n'
+    'from django.core.management import ManagementUtility\n'
+    'comando = ManagementUtility().fetch_command({nome!r})\n'
+    'if comando.requires_system_checks:\n'
+    '    comando.check()\n'
+)
+
+
+def ler_importtime(saida):
+    """Linhas de `python -X importtime` como (modulo, nivel, proprio_us, acumulado_us)"""
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        nivel = (len(nome) - len(nome.lstrip(' ')) - 1) // 2
+        modulos.append((nome.strip(), nivel, int(proprio), int(acumulado)))
+    return modulos
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de importação na partida de um worker ou de comandos do manage.py (python -X importtime)'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'alvos', nargs='*', default=['worker'],
+            help='"worker" ou nomes de comandos do manage.py (padrão: worker)'
+        )
+        parser.add_argument('--repeticoes', type=int, default=5, help='Partidas medidas por alvo')
+        parser.add_argument('--top', type=int, default=15, help='Módulos listados por tempo acumulado')
+        parser.add_argument('--saida', help='Grava o relatório bruto do -X importtime da última partida neste arquivo')
+
+    def handle(self, *args, **options):
+        for alvo in options['alvos']:
+            codigo = PARTIDA_WORKER if alvo == 'worker' else PARTIDA_COMANDO.format(nome=alvo)
+            duracoes = []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                processo = subprocess.run(
+                    [sys.executable, '-X', 'importtime', '-c', codigo],
+                    cwd=settings.BASE_DIR,
+                    env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+                        'DJANGO_SETTINGS_MODULE', 'donation_project.settings'
+                    )},
+                    capture_output=True,
+                    text=True,
+                )
+                duracoes.append(time.perf_counter() - inicio)
+                if processo.returncode:
+                    raise CommandError(f'A partida de {alvo!r} falhou:\n{processo.stderr[-2000:]}')
+            if options['saida']:
+                with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                    arquivo.write(processo.stderr)
+            self.relatar(alvo, duracoes, ler_importtime(processo.stderr), options['top'])
+
+    def relatar(self, alvo, duracoes, modulos, top):
+        total_us = sum(proprio for _, _, proprio, _ in modulos)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {alvo}: partida em {statistics.median(duracoes) * 1000:.0f} ms (mediana de {len(duracoes)}), '
+            f'{total_us / 1000:.0f} ms importando {len(modulos)} módulos'
+        ))
+
+        pacotes = defaultdict(int)
+        for nome, _, proprio, _ in modulos:
+            pacotes[nome.split('.')[0]] += proprio
+        self.stdout.write('  Por pacote (tempo próprio):')
+        for pacote, proprio in sorted(pacotes.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'    {proprio / 1000:8.1f} ms  {pacote}')
+
+        self.stdout.write('  Por módulo (tempo acumulado, com dependências):')
+        for nome, _, _, acumulado in sorted(modulos, key=lambda modulo: -modulo[3])[:top]:
+            self.stdout.write(f'    {acumulado / 1000:8.1f} ms  {nome}')
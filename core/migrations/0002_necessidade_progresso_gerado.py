@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:57
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='necessidadealimento',
+            name='percentual_recebido',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(quantidade_necessaria__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('quantidade_recebida', models.FloatField()), '*', models.Value(100.0)), '/', django.db.models.functions.comparison.Cast('quantidade_necessaria', models.FloatField()))), default=models.Value(0.0), output_field=models.FloatField()), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Percentual Recebido'),
+        ),
+        migrations.AddField(
+            model_name='necessidadealimento',
+            name='quantidade_faltante',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Greatest(django.db.models.expressions.CombinedExpression(models.F('quantidade_necessaria'), '-', models.F('quantidade_recebida')), models.Value(Decimal('0.00'))), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Quantidade Faltante'),
+        ),
+        migrations.AddIndex(
+            model_name='necessidadealimento',
+            index=models.Index(fields=['ativa', 'percentual_recebido'], name='necessidade_ativa_pct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='necessidadealimento',
+            index=models.Index(fields=['ativa', 'quantidade_faltante'], name='necessidade_ativa_falta_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_necessidade_progresso_gerado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumidorEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, unique=True, verbose_name='Nome')),
+                ('ultimo_evento_id', models.BigIntegerField(default=0, verbose_name='Último Evento Processado')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+            ],
+            options={
+                'verbose_name': 'Consumidor de Eventos',
+                'verbose_name_plural': 'Consumidores de Eventos',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorStatusDoacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20, unique=True, verbose_name='Status')),
+                ('total', models.BigIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Contador de Status',
+                'verbose_name_plural': 'Contadores de Status',
+                'ordering': ['status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoacaoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_anterior', models.CharField(blank=True, help_text='Vazio quando o evento registra a criação da doação', max_length=20, verbose_name='Status Anterior')),
+                ('status_novo', models.CharField(max_length=20, verbose_name='Status Novo')),
+                ('quantidade', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Quantidade')),
+                ('data_doacao', models.DateTimeField(verbose_name='Data da Doação')),
+                ('data_evento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data do Evento')),
+                ('alimento', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.alimento', verbose_name='Alimento')),
+                ('doacao', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='core.doacao', verbose_name='Doação')),
+                ('doador', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Doador')),
+                ('ong', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.ong', verbose_name='ONG')),
+            ],
+            options={
+                'verbose_name': 'Evento de Doação',
+                'verbose_name_plural': 'Eventos de Doações',
+                'ordering': ['id'],
+            },
+        ),
+    ]
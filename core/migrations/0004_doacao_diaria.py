@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_doacao_evento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('total', models.IntegerField(default=0, verbose_name='Total de Doações')),
+                ('quantidade', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Quantidade')),
+                ('alimento', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_diarias', to='core.alimento', verbose_name='Alimento')),
+                ('ong', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_diarias', to='core.ong', verbose_name='ONG')),
+            ],
+            options={
+                'verbose_name': 'Doações do Dia',
+                'verbose_name_plural': 'Doações por Dia',
+                'ordering': ['-dia'],
+                'indexes': [models.Index(fields=['ong', 'dia'], name='doacao_diaria_ong_dia_idx')],
+                'unique_together': {('dia', 'ong', 'alimento', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_doacao_diaria'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(fields=['data_doacao'], name='doacao_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(fields=['status', 'data_doacao'], name='doacao_status_data_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_doacao_indices_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('argumentos', models.JSONField(blank=True, default=list, verbose_name='Argumentos')),
+                ('argumentos_nomeados', models.JSONField(blank=True, default=dict, verbose_name='Argumentos Nomeados')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_tentativas', models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar Em')),
+                ('reserva', models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Reserva')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada Em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída Em')),
+                ('erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-data_criacao'],
+                'indexes': [models.Index(fields=['status', 'executar_em'], name='tarefa_status_executar_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tarefa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoacaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantidade', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Quantidade')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('confirmada', 'Confirmada'), ('em_transito', 'Em Trânsito'), ('entregue', 'Entregue'), ('cancelada', 'Cancelada')], max_length=20, verbose_name='Status')),
+                ('mensagem', models.TextField(blank=True, verbose_name='Mensagem do Doador')),
+                ('data_doacao', models.DateTimeField(verbose_name='Data da Doação')),
+                ('data_atualizacao', models.DateTimeField(verbose_name='Última Atualização')),
+                ('data_arquivamento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data do Arquivamento')),
+                ('alimento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.alimento', verbose_name='Alimento')),
+                ('doador', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Doador')),
+                ('ong', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.ong', verbose_name='ONG Beneficiada')),
+            ],
+            options={
+                'verbose_name': 'Doação Arquivada',
+                'verbose_name_plural': 'Doações Arquivadas',
+                'ordering': ['-data_doacao'],
+                'indexes': [models.Index(fields=['doador', 'data_doacao'], name='doacao_arq_doador_data_idx'), models.Index(fields=['ong', 'data_doacao'], name='doacao_arq_ong_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_doacao_arquivada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doacao',
+            name='necessidade',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doacoes', to='core.necessidadealimento', verbose_name='Necessidade'),
+        ),
+        migrations.AddField(
+            model_name='doacaoarquivada',
+            name='necessidade',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.necessidadealimento', verbose_name='Necessidade'),
+        ),
+    ]
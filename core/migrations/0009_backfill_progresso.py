@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_doacao_necessidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillProgresso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, unique=True, verbose_name='Nome')),
+                ('ultimo_id', models.BigIntegerField(default=0, verbose_name='Último Id Processado')),
+                ('linhas_processadas', models.BigIntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('lotes', models.PositiveIntegerField(default=0, verbose_name='Lotes')),
+                ('iniciado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Iniciado Em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído Em')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+            ],
+            options={
+                'verbose_name': 'Progresso de Backfill',
+                'verbose_name_plural': 'Progresso dos Backfills',
+                'ordering': ['nome'],
+            },
+        ),
+    ]
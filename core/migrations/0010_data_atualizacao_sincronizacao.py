@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backfill_progresso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ong',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última Atualização'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='necessidadealimento',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última Atualização'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='ong',
+            index=models.Index(fields=['data_atualizacao', 'id'], name='ong_atualizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='necessidadealimento',
+            index=models.Index(fields=['data_atualizacao', 'id'], name='necessidade_atualizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(fields=['doador', 'data_atualizacao', 'id'], name='doacao_doador_atualizacao_idx'),
+        ),
+    ]
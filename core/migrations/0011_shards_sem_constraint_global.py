@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_data_atualizacao_sincronizacao'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doacao',
+            name='alimento',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='doacoes', to='core.alimento', verbose_name='Alimento'),
+        ),
+        migrations.AlterField(
+            model_name='doacao',
+            name='doador',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_realizadas', to=settings.AUTH_USER_MODEL, verbose_name='Doador'),
+        ),
+        migrations.AlterField(
+            model_name='doacao',
+            name='ong',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_recebidas', to='core.ong', verbose_name='ONG Beneficiada'),
+        ),
+        migrations.AlterField(
+            model_name='doacaoarquivada',
+            name='alimento',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.alimento', verbose_name='Alimento'),
+        ),
+        migrations.AlterField(
+            model_name='doacaoarquivada',
+            name='doador',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Doador'),
+        ),
+        migrations.AlterField(
+            model_name='doacaoarquivada',
+            name='ong',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.ong', verbose_name='ONG Beneficiada'),
+        ),
+        migrations.AlterField(
+            model_name='necessidadealimento',
+            name='alimento',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='necessidades', to='core.alimento', verbose_name='Alimento'),
+        ),
+        migrations.AlterField(
+            model_name='necessidadealimento',
+            name='ong',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='necessidades', to='core.ong', verbose_name='ONG'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_shards_sem_constraint_global'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JanelaPlacar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('janela', models.PositiveIntegerField(unique=True, verbose_name='Janela (dias)')),
+                ('inicio', models.DateField(verbose_name='Início')),
+            ],
+            options={
+                'verbose_name': 'Janela do Placar',
+                'verbose_name_plural': 'Janelas do Placar',
+                'ordering': ['janela'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EntregaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('dimensao', models.CharField(choices=[('ong', 'ONG'), ('doador', 'Doador'), ('alimento', 'Alimento')], max_length=10, verbose_name='Dimensão')),
+                ('chave', models.BigIntegerField(verbose_name='Id')),
+                ('total', models.IntegerField(default=0, verbose_name='Doações Entregues')),
+                ('quantidade', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Quantidade Entregue')),
+            ],
+            options={
+                'verbose_name': 'Entregas do Dia',
+                'verbose_name_plural': 'Entregas por Dia',
+                'ordering': ['-dia'],
+                'unique_together': {('dia', 'dimensao', 'chave')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PlacarEntregas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('ong', 'ONG'), ('doador', 'Doador'), ('alimento', 'Alimento')], max_length=10, verbose_name='Dimensão')),
+                ('janela', models.PositiveIntegerField(help_text='0 para todo o período', verbose_name='Janela (dias)')),
+                ('chave', models.BigIntegerField(verbose_name='Id')),
+                ('total', models.IntegerField(default=0, verbose_name='Doações Entregues')),
+                ('quantidade', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Quantidade Entregue')),
+            ],
+            options={
+                'verbose_name': 'Placar de Entregas',
+                'verbose_name_plural': 'Placares de Entregas',
+                'indexes': [models.Index(fields=['dimensao', 'janela', '-total', 'chave'], name='placar_ranking_idx')],
+                'unique_together': {('dimensao', 'janela', 'chave')},
+            },
+        ),
+    ]
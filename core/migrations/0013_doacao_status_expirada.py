@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_placares_entregas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doacao',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('confirmada', 'Confirmada'), ('em_transito', 'Em Trânsito'), ('entregue', 'Entregue'), ('cancelada', 'Cancelada'), ('expirada', 'Expirada')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='doacaoarquivada',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('confirmada', 'Confirmada'), ('em_transito', 'Em Trânsito'), ('entregue', 'Entregue'), ('cancelada', 'Cancelada'), ('expirada', 'Expirada')], max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_doacao_status_expirada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alimento',
+            name='sinonimos',
+            field=models.CharField(blank=True, help_text='Outros nomes usados na busca, separados por vírgula (ex.: macaxeira, aipim)', max_length=500, verbose_name='Sinônimos'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class AlterFieldForaDosShards(migrations.AlterField):
+    """
+    AlterField aplicado só fora de settings.SHARDS.
+
+    Sem shards as chaves estrangeiras voltam a ter constraint no banco; nos
+    shards a ONG, o doador e o alimento ficam em 'default', e as tabelas
+    continuam sem constraint como na 0011.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.SHARDS:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.SHARDS:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_alimento_sinonimos'),
+    ]
+
+    operations = [
+        AlterFieldForaDosShards(
+            model_name='doacao',
+            name='alimento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doacoes', to='core.alimento', verbose_name='Alimento'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='doacao',
+            name='doador',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_realizadas', to=settings.AUTH_USER_MODEL, verbose_name='Doador'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='doacao',
+            name='ong',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doacoes_recebidas', to='core.ong', verbose_name='ONG Beneficiada'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='doacaoarquivada',
+            name='alimento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.alimento', verbose_name='Alimento'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='doacaoarquivada',
+            name='doador',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Doador'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='doacaoarquivada',
+            name='ong',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.ong', verbose_name='ONG Beneficiada'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='necessidadealimento',
+            name='alimento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='necessidades', to='core.alimento', verbose_name='Alimento'),
+        ),
+        AlterFieldForaDosShards(
+            model_name='necessidadealimento',
+            name='ong',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='necessidades', to='core.ong', verbose_name='ONG'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_restaura_constraints_fora_dos_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.CharField(max_length=32, verbose_name='Versão')),
+            ],
+            options={
+                'verbose_name': 'Versão do Catálogo',
+                'verbose_name_plural': 'Versões do Catálogo',
+            },
+        ),
+    ]
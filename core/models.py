@@ -1,4 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast, Greatest, Now
+from django.db.models.lookups import GreaterThanOrEqual
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -45,11 +50,16 @@ class ONG(models.Model):
     foto = models.ImageField(upload_to='ongs/', blank=True, null=True, verbose_name='Foto')
     ativa = models.BooleanField(default=True, verbose_name='Ativa')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Última Atualização')
     
     class Meta:
         verbose_name = 'ONG'
         verbose_name_plural = 'ONGs'
         ordering = ['nome']
+        indexes = [
+            # Cursor da sincronização incremental (core.sincronizacao)
+            models.Index(fields=['data_atualizacao', 'id'], name='ong_atualizacao_idx'),
+        ]
     
     def __str__(self):
         return self.nome
@@ -80,6 +90,12 @@ class Alimento(models.Model):
         verbose_name='Categoria'
     )
     descricao = models.TextField(blank=True, verbose_name='Descrição')
+    sinonimos = models.CharField(
+        max_length=500,
+        blank=True,
+        verbose_name='Sinônimos',
+        help_text='Outros nomes usados na busca, separados por vírgula (ex.: macaxeira, aipim)'
+    )
     unidade_medida = models.CharField(
         max_length=20,
         choices=[
@@ -104,6 +120,53 @@ class Alimento(models.Model):
         return f"{self.nome} ({self.get_unidade_medida_display()})"
 
 
+class VersaoCatalogo(models.Model):
+    """Carimbo de versão do catálogo em memória (core.catalogo), lido por todos os processos"""
+    versao = models.CharField(max_length=32, verbose_name='Versão')
+
+    class Meta:
+        verbose_name = 'Versão do Catálogo'
+        verbose_name_plural = 'Versões do Catálogo'
+
+    def __str__(self):
+        return self.versao
+
+
+class NecessidadeAlimentoQuerySet(models.QuerySet):
+    """Consultas sobre o progresso das necessidades, resolvidas no banco"""
+
+    def quase_completas(self, percentual_minimo=80):
+        """Necessidades ativas mais próximas da meta"""
+        return self.filter(
+            ativa=True,
+            percentual_recebido__gte=percentual_minimo
+        ).order_by('-percentual_recebido')
+
+    def pouco_atendidas(self, percentual_maximo=20):
+        """Necessidades ativas que receberam pouco em relação à meta"""
+        return self.filter(
+            ativa=True,
+            percentual_recebido__lt=percentual_maximo
+        ).order_by('percentual_recebido')
+
+    def mais_faltantes(self):
+        """Necessidades ativas ordenadas pela maior quantidade faltante"""
+        return self.filter(ativa=True).order_by('-quantidade_faltante')
+
+    def receber(self, quantidade):
+        """Soma `quantidade` ao recebido e desativa as que atingirem a meta, em um único UPDATE"""
+        novo_total = F('quantidade_recebida') + Value(Decimal(quantidade))
+        return self.update(
+            quantidade_recebida=novo_total,
+            # update() não passa pelo auto_now
+            data_atualizacao=Now(),
+            ativa=Case(
+                When(GreaterThanOrEqual(novo_total, F('quantidade_necessaria')), then=Value(False)),
+                default=F('ativa'),
+            ),
+        )
+
+
 class NecessidadeAlimento(models.Model):
     """Necessidades de alimentos das ONGs"""
     ong = models.ForeignKey(
@@ -143,25 +206,78 @@ class NecessidadeAlimento(models.Model):
     observacoes = models.TextField(blank=True, verbose_name='Observações')
     ativa = models.BooleanField(default=True, verbose_name='Ativa')
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Última Atualização')
+    
+    # Colunas calculadas pelo próprio banco, para permitir filtros e ordenação em SQL
+    quantidade_faltante = models.GeneratedField(
+        expression=Greatest(
+            F('quantidade_necessaria') - F('quantidade_recebida'),
+            Value(Decimal('0.00'))
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        verbose_name='Quantidade Faltante'
+    )
+    percentual_recebido = models.GeneratedField(
+        # Divisão em ponto flutuante: no SQLite, NUMERIC / NUMERIC truncaria o resultado
+        expression=Case(
+            When(
+                quantidade_necessaria__gt=0,
+                then=Cast('quantidade_recebida', models.FloatField()) * Value(100.0)
+                / Cast('quantidade_necessaria', models.FloatField())
+            ),
+            default=Value(0.0),
+            output_field=models.FloatField()
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        verbose_name='Percentual Recebido'
+    )
+    
+    objects = NecessidadeAlimentoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Necessidade de Alimento'
         verbose_name_plural = 'Necessidades de Alimentos'
         unique_together = ['ong', 'alimento']
         ordering = ['-prioridade', 'alimento__nome']
-    
-    def __str__(self):
-        return f"{self.ong.nome} - {self.alimento.nome} ({self.quantidade_necessaria})"
+        indexes = [
+            models.Index(fields=['ativa', 'percentual_recebido'], name='necessidade_ativa_pct_idx'),
+            models.Index(fields=['ativa', 'quantidade_faltante'], name='necessidade_ativa_falta_idx'),
+            models.Index(fields=['data_atualizacao', 'id'], name='necessidade_atualizacao_idx'),
+        ]
     
     @property
-    def quantidade_faltante(self):
-        return max(0, self.quantidade_necessaria - self.quantidade_recebida)
+    def alimento_catalogo(self):
+        """Alimento resolvido pelo snapshot do catálogo, sem consulta ao banco"""
+        from .catalogo import catalogo
+        return catalogo().alimento(self.alimento_id) or self.alimento
     
-    @property
-    def percentual_recebido(self):
-        if self.quantidade_necessaria > 0:
-            return (self.quantidade_recebida / self.quantidade_necessaria) * 100
-        return 0
+    def __str__(self):
+        return f"{self.ong.nome} - {self.alimento_catalogo.nome} ({self.quantidade_necessaria})"
+    
+    def save(self, *args, **kwargs):
+        # Lido antes do save(), que sempre deixa _state.adding = False
+        atualizacao = not self._state.adding
+        super().save(*args, **kwargs)
+        # O INSERT devolve as colunas geradas (RETURNING), mas o UPDATE não: depois
+        # de um UPDATE descarta os valores antigos para recarregá-los no próximo acesso
+        if atualizacao:
+            for campo in ('quantidade_faltante', 'percentual_recebido'):
+                self.__dict__.pop(campo, None)
+
+
+STATUS_DOACAO = [
+    ('pendente', 'Pendente'),
+    ('confirmada', 'Confirmada'),
+    ('em_transito', 'Em Trânsito'),
+    ('entregue', 'Entregue'),
+    ('cancelada', 'Cancelada'),
+    ('expirada', 'Expirada'),
+]
+
+# Status finais: doações nesses status podem ir para o arquivo
+STATUS_FINALIZADOS = ('entregue', 'cancelada', 'expirada')
 
 
 class Doacao(models.Model):
@@ -184,6 +300,16 @@ class Doacao(models.Model):
         related_name='doacoes',
         verbose_name='Alimento'
     )
+    # Ligação direta com a necessidade atendida (preenchida para doações antigas
+    # por manage.py executar_backfill doacao_necessidade)
+    necessidade = models.ForeignKey(
+        'NecessidadeAlimento',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='doacoes',
+        verbose_name='Necessidade'
+    )
     quantidade = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -191,13 +317,7 @@ class Doacao(models.Model):
     )
     status = models.CharField(
         max_length=20,
-        choices=[
-            ('pendente', 'Pendente'),
-            ('confirmada', 'Confirmada'),
-            ('em_transito', 'Em Trânsito'),
-            ('entregue', 'Entregue'),
-            ('cancelada', 'Cancelada'),
-        ],
+        choices=STATUS_DOACAO,
         default='pendente',
         verbose_name='Status'
     )
@@ -209,6 +329,338 @@ class Doacao(models.Model):
         verbose_name = 'Doação'
         verbose_name_plural = 'Doações'
         ordering = ['-data_doacao']
+        indexes = [
+            models.Index(fields=['data_doacao'], name='doacao_data_idx'),
+            models.Index(fields=['status', 'data_doacao'], name='doacao_status_data_idx'),
+            models.Index(fields=['doador', 'data_atualizacao', 'id'], name='doacao_doador_atualizacao_idx'),
+        ]
+    
+    @property
+    def alimento_catalogo(self):
+        """Alimento resolvido pelo snapshot do catálogo, sem consulta ao banco"""
+        from .catalogo import catalogo
+        return catalogo().alimento(self.alimento_id) or self.alimento
+    
+    def __str__(self):
+        return f"{self.doador.username} → {self.ong.nome} - {self.alimento_catalogo.nome} ({self.quantidade})"
+    
+    def registrar_recebimento(self):
+        """Soma a quantidade desta doação ao recebido da necessidade; retorna as linhas atualizadas"""
+        # A necessidade fica no mesmo banco (shard da ONG) que a doação
+        necessidades = NecessidadeAlimento.objects.db_manager(hints={'instance': self})
+        if self.necessidade_id is not None:
+            alvo = necessidades.filter(pk=self.necessidade_id)
+        else:
+            # Doação antiga ainda não preenchida: (ong, alimento) é único entre as necessidades
+            alvo = necessidades.filter(ong_id=self.ong_id, alimento_id=self.alimento_id)
+        return alvo.receber(self.quantidade)
+
+
+class DoacaoArquivada(models.Model):
+    """Doações finalizadas movidas da tabela principal (manage.py arquivar_doacoes)"""
+    # Mesmo id da doação original, para cruzar com o log de eventos
+    id = models.BigIntegerField(primary_key=True)
+    doador = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='+',
+        verbose_name='Doador'
+    )
+    ong = models.ForeignKey(
+        ONG,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='+',
+        verbose_name='ONG Beneficiada'
+    )
+    alimento = models.ForeignKey(
+        Alimento,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Alimento'
+    )
+    necessidade = models.ForeignKey(
+        'NecessidadeAlimento',
+        on_delete=models.SET_NULL,
+        null=True,
+        db_index=False,
+        related_name='+',
+        verbose_name='Necessidade'
+    )
+    quantidade = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Quantidade')
+    status = models.CharField(max_length=20, choices=STATUS_DOACAO, verbose_name='Status')
+    mensagem = models.TextField(blank=True, verbose_name='Mensagem do Doador')
+    data_doacao = models.DateTimeField(verbose_name='Data da Doação')
+    data_atualizacao = models.DateTimeField(verbose_name='Última Atualização')
+    data_arquivamento = models.DateTimeField(default=timezone.now, verbose_name='Data do Arquivamento')
+
+    class Meta:
+        verbose_name = 'Doação Arquivada'
+        verbose_name_plural = 'Doações Arquivadas'
+        ordering = ['-data_doacao']
+        indexes = [
+            models.Index(fields=['doador', 'data_doacao'], name='doacao_arq_doador_data_idx'),
+            models.Index(fields=['ong', 'data_doacao'], name='doacao_arq_ong_data_idx'),
+        ]
+
+    @property
+    def alimento_catalogo(self):
+        """Alimento resolvido pelo snapshot do catálogo, sem consulta ao banco"""
+        from .catalogo import catalogo
+        return catalogo().alimento(self.alimento_id) or self.alimento
+
+    def __str__(self):
+        return f"Arquivada {self.id}: {self.doador_id} → {self.ong_id} ({self.quantidade})"
+
+
+class DoacaoEvento(models.Model):
+    """Log append-only das transições de status das doações"""
+    # Sem restrição de chave estrangeira: o log sobrevive à remoção ou arquivamento da doação
+    doacao = models.ForeignKey(
+        Doacao,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='eventos',
+        verbose_name='Doação'
+    )
+    # Dimensões copiadas da doação para que os consumidores não precisem de JOIN
+    doador = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='Doador'
+    )
+    ong = models.ForeignKey(
+        ONG,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='ONG'
+    )
+    alimento = models.ForeignKey(
+        Alimento,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='Alimento'
+    )
+    status_anterior = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Status Anterior',
+        help_text='Vazio quando o evento registra a criação da doação'
+    )
+    status_novo = models.CharField(max_length=20, verbose_name='Status Novo')
+    quantidade = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Quantidade')
+    data_doacao = models.DateTimeField(verbose_name='Data da Doação')
+    data_evento = models.DateTimeField(default=timezone.now, verbose_name='Data do Evento')
+    
+    class Meta:
+        verbose_name = 'Evento de Doação'
+        verbose_name_plural = 'Eventos de Doações'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"Doação {self.doacao_id}: {self.status_anterior or '∅'} → {self.status_novo}"
+
+
+class ConsumidorEvento(models.Model):
+    """Posição de leitura de cada consumidor do log de eventos"""
+    nome = models.CharField(max_length=100, unique=True, verbose_name='Nome')
+    ultimo_evento_id = models.BigIntegerField(default=0, verbose_name='Último Evento Processado')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Última Atualização')
+    
+    class Meta:
+        verbose_name = 'Consumidor de Eventos'
+        verbose_name_plural = 'Consumidores de Eventos'
+        ordering = ['nome']
+    
+    def __str__(self):
+        return f"{self.nome} (evento {self.ultimo_evento_id})"
+
+
+class ContadorStatusDoacao(models.Model):
+    """Total de doações por status, mantido a partir do log de eventos"""
+    status = models.CharField(max_length=20, unique=True, verbose_name='Status')
+    total = models.BigIntegerField(default=0, verbose_name='Total')
+    
+    class Meta:
+        verbose_name = 'Contador de Status'
+        verbose_name_plural = 'Contadores de Status'
+        ordering = ['status']
+    
+    def __str__(self):
+        return f"{self.status}: {self.total}"
+
+
+class DoacaoDiaria(models.Model):
+    """Rollup diário de doações por ONG, alimento e status"""
+    dia = models.DateField(verbose_name='Dia')
+    ong = models.ForeignKey(
+        ONG,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='doacoes_diarias',
+        verbose_name='ONG'
+    )
+    alimento = models.ForeignKey(
+        Alimento,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='doacoes_diarias',
+        verbose_name='Alimento'
+    )
+    status = models.CharField(max_length=20, verbose_name='Status')
+    total = models.IntegerField(default=0, verbose_name='Total de Doações')
+    quantidade = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Quantidade'
+    )
+    
+    class Meta:
+        verbose_name = 'Doações do Dia'
+        verbose_name_plural = 'Doações por Dia'
+        ordering = ['-dia']
+        unique_together = ['dia', 'ong', 'alimento', 'status']
+        indexes = [
+            models.Index(fields=['ong', 'dia'], name='doacao_diaria_ong_dia_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dia} - ONG {self.ong_id} - {self.status}: {self.total}"
+
+
+DIMENSOES_PLACAR = (
+    ('ong', 'ONG'),
+    ('doador', 'Doador'),
+    ('alimento', 'Alimento'),
+)
+
+
+class PlacarEntregas(models.Model):
+    """Doações entregues por ONG, doador ou alimento em cada janela, mantido a partir do log de eventos"""
+    dimensao = models.CharField(max_length=10, choices=DIMENSOES_PLACAR, verbose_name='Dimensão')
+    janela = models.PositiveIntegerField(verbose_name='Janela (dias)', help_text='0 para todo o período')
+    # Sem chave estrangeira: aponta para ONG, usuário ou alimento conforme a dimensão
+    chave = models.BigIntegerField(verbose_name='Id')
+    total = models.IntegerField(default=0, verbose_name='Doações Entregues')
+    quantidade = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Quantidade Entregue'
+    )
+
+    class Meta:
+        verbose_name = 'Placar de Entregas'
+        verbose_name_plural = 'Placares de Entregas'
+        unique_together = ['dimensao', 'janela', 'chave']
+        indexes = [
+            # Top N e posição: leitura em ordem do índice, sem ordenar a tabela
+            models.Index(fields=['dimensao', 'janela', '-total', 'chave'], name='placar_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimensao} {self.chave} ({self.janela or 'total'}): {self.total}"
+
+
+class EntregaDiaria(models.Model):
+    """Doações entregues por dia de criação em cada dimensão do placar, para deslizar as janelas"""
+    dia = models.DateField(verbose_name='Dia')
+    dimensao = models.CharField(max_length=10, choices=DIMENSOES_PLACAR, verbose_name='Dimensão')
+    chave = models.BigIntegerField(verbose_name='Id')
+    total = models.IntegerField(default=0, verbose_name='Doações Entregues')
+    quantidade = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Quantidade Entregue'
+    )
+
+    class Meta:
+        verbose_name = 'Entregas do Dia'
+        verbose_name_plural = 'Entregas por Dia'
+        ordering = ['-dia']
+        unique_together = ['dia', 'dimensao', 'chave']
+
+    def __str__(self):
+        return f"{self.dia} - {self.dimensao} {self.chave}: {self.total}"
+
+
+class JanelaPlacar(models.Model):
+    """Primeiro dia contado em cada janela móvel do placar"""
+    janela = models.PositiveIntegerField(unique=True, verbose_name='Janela (dias)')
+    inicio = models.DateField(verbose_name='Início')
+
+    class Meta:
+        verbose_name = 'Janela do Placar'
+        verbose_name_plural = 'Janelas do Placar'
+        ordering = ['janela']
+
+    def __str__(self):
+        return f"{self.janela} dias desde {self.inicio}"
+
+
+class Tarefa(models.Model):
+    """Tarefa da fila de execução em segundo plano"""
+    STATUS_CHOICES = (
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    )
+    
+    nome = models.CharField(max_length=100, verbose_name='Nome')
+    argumentos = models.JSONField(default=list, blank=True, verbose_name='Argumentos')
+    argumentos_nomeados = models.JSONField(default=dict, blank=True, verbose_name='Argumentos Nomeados')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    max_tentativas = models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')
+    executar_em = models.DateTimeField(default=timezone.now, verbose_name='Executar Em')
+    reserva = models.CharField(max_length=32, blank=True, db_index=True, verbose_name='Reserva')
+    iniciada_em = models.DateTimeField(null=True, blank=True, verbose_name='Iniciada Em')
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluída Em')
+    erro = models.TextField(blank=True, verbose_name='Último Erro')
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-data_criacao']
+        indexes = [
+            models.Index(fields=['status', 'executar_em'], name='tarefa_status_executar_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nome} #{self.pk} ({self.get_status_display()})"
+
+
+class BackfillProgresso(models.Model):
+    """Checkpoint de cada backfill online (manage.py executar_backfill)"""
+    nome = models.CharField(max_length=100, unique=True, verbose_name='Nome')
+    ultimo_id = models.BigIntegerField(default=0, verbose_name='Último Id Processado')
+    linhas_processadas = models.BigIntegerField(default=0, verbose_name='Linhas Processadas')
+    lotes = models.PositiveIntegerField(default=0, verbose_name='Lotes')
+    iniciado_em = models.DateTimeField(default=timezone.now, verbose_name='Iniciado Em')
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluído Em')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Última Atualização')
+    
+    class Meta:
+        verbose_name = 'Progresso de Backfill'
+        verbose_name_plural = 'Progresso dos Backfills'
+        ordering = ['nome']
     
     def __str__(self):
-        return f"{self.doador.username} → {self.ong.nome} - {self.alimento.nome} ({self.quantidade})"
+        return f"{self.nome} (id {self.ultimo_id}{', concluído' if self.concluido_em else ''})"
@@ -0,0 +1,32 @@
+"""
+Notificações por email, executadas pela fila de tarefas.
+
+Importado em CoreConfig.ready() para que as tarefas fiquem registradas.
+"""
+from django.core.mail import send_mail
+
+from .models import Doacao
+from .tarefas import tarefa
+
+
+@tarefa(max_tentativas=5)
+def notificar_ong_nova_doacao(doacao_id):
+    """Avisa a ONG por email que recebeu uma nova doação"""
+    doacao = Doacao.objects.select_related('doador', 'ong', 'alimento').get(pk=doacao_id)
+    doador = doacao.doador.get_full_name() or doacao.doador.username
+
+    corpo = (
+        f'Olá, {doacao.ong.responsavel}!\n\n'
+        f'{doador} acabou de doar {doacao.quantidade} {doacao.alimento.get_unidade_medida_display()} '
+        f'de {doacao.alimento.nome} para a {doacao.ong.nome}.\n'
+    )
+    if doacao.mensagem:
+        corpo += f'\nMensagem do doador: "{doacao.mensagem}"\n'
+    corpo += '\nAcesse o painel da ONG no Alimenta+ para confirmar a doação.\n'
+
+    send_mail(
+        f'Nova doação de {doacao.alimento.nome} - Alimenta+',
+        corpo,
+        None,
+        [doacao.ong.email_contato],
+    )
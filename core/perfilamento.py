@@ -0,0 +1,165 @@
+"""
+Perfilamento sob demanda de requisições com cProfile.
+
+PerfilamentoMiddleware perfila uma fração aleatória das requisições
+(PERFILAMENTO['amostragem']) e toda requisição de um usuário staff que envie
+o cabeçalho configurado (por padrão, `X-Perfilar: 1`). O perfil cobre os
+middlewares seguintes, a view e a renderização do template. Cada perfil gera
+um arquivo .prof (para pstats/snakeviz) e um resumo .txt com as N funções de
+maior tempo acumulado, em um diretório que guarda só os arquivos mais recentes.
+
+Sem gatilho, o custo por requisição é um random() e uma busca no META.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import re
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _config():
+    return settings.PERFILAMENTO
+
+
+def _nome_base(request, duracao):
+    agora = time.time()
+    momento = time.strftime('%Y%m%d-%H%M%S', time.localtime(agora)) + f'{agora % 1:.3f}'[1:]
+    caminho = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'raiz'
+    return f'{momento}-{request.method}-{caminho[:60]}-{duracao:.0f}ms'
+
+
+def _rotacionar(diretorio, maximo):
+    """Mantém apenas os `maximo` perfis mais recentes (pares .prof + .txt)"""
+    perfis = sorted(diretorio.glob('*.prof'), key=lambda p: p.stat().st_mtime)
+    for antigo in perfis[:max(0, len(perfis) - maximo)]:
+        antigo.unlink(missing_ok=True)
+        antigo.with_suffix('.txt').unlink(missing_ok=True)
+
+
+def salvar_perfil(perfis, request, duracao):
+    """Grava o .prof e o resumo (somando os perfis de cada thread); retorna o nome base dos arquivos"""
+    config = _config()
+    diretorio = Path(config['diretorio'])
+    diretorio.mkdir(parents=True, exist_ok=True)
+    nome = _nome_base(request, duracao)
+
+    resumo = io.StringIO()
+    resumo.write(f'{request.method} {request.get_full_path()} - {duracao:.1f} ms\n\n')
+    estatisticas = pstats.Stats(*perfis, stream=resumo)
+    estatisticas.dump_stats(diretorio / f'{nome}.prof')
+    estatisticas.sort_stats('cumulative').print_stats(config['top'])
+    (diretorio / f'{nome}.txt').write_text(resumo.getvalue(), encoding='utf-8')
+
+    _rotacionar(diretorio, config['max_arquivos'])
+    return nome
+
+
+class PerfilamentoMiddleware:
+    """
+    Executa cProfile em volta da requisição quando amostrada ou pedida por staff.
+
+    Sob ASGI o cProfile só enxerga a thread em que foi ligado. O perfil da
+    thread do event loop cobre a parte assíncrona; process_view, que o Django
+    executa na thread de trabalho da requisição (a mesma das views e
+    middlewares síncronos), liga um segundo perfil lá. Os dois são somados no
+    mesmo arquivo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def _amostrada(self, config):
+        return bool(config['amostragem']) and random.random() < config['amostragem']
+
+    def _pedida(self, request, config):
+        # Só consulta o usuário (e a sessão) quando o cabeçalho foi enviado
+        return 'HTTP_' + config['cabecalho'].upper().replace('-', '_') in request.META
+
+    def deve_perfilar(self, request):
+        config = _config()
+        if not config['ativo']:
+            return False
+        return self._amostrada(config) or (self._pedida(request, config) and request.user.is_staff)
+
+    async def adeve_perfilar(self, request):
+        config = _config()
+        if not config['ativo']:
+            return False
+        return self._amostrada(config) or (self._pedida(request, config) and (await request.auser()).is_staff)
+
+    def _iniciar(self):
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Outro profiler já está ativo nesta thread
+            return None
+        return perfil
+
+    def _registrar(self, perfis, request, resposta, duracao):
+        try:
+            nome = salvar_perfil(perfis, request, duracao)
+        except OSError:
+            logger.exception('Falha ao gravar o perfil de %s', request.path)
+        else:
+            resposta['X-Perfil'] = nome
+        return resposta
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        if not self.deve_perfilar(request):
+            return self.get_response(request)
+
+        inicio = time.perf_counter()
+        perfil = self._iniciar()
+        if perfil is None:
+            return self.get_response(request)
+        try:
+            resposta = self.get_response(request)
+        finally:
+            perfil.disable()
+        return self._registrar([perfil], request, resposta, (time.perf_counter() - inicio) * 1000)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Só sob ASGI (marcado em __acall__): aqui já estamos na thread de trabalho
+        if getattr(request, '_perfilar_thread', False):
+            request._perfilar_thread = False
+            request._perfil_thread = self._iniciar()
+        return None
+
+    async def __acall__(self, request):
+        if not await self.adeve_perfilar(request):
+            return await self.get_response(request)
+
+        inicio = time.perf_counter()
+        perfil = self._iniciar()
+        if perfil is None:
+            return await self.get_response(request)
+        request._perfilar_thread = True
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            perfil.disable()
+            perfis = [perfil]
+            perfil_thread = getattr(request, '_perfil_thread', None)
+            if perfil_thread is not None:
+                # Desligar na mesma thread de trabalho em que process_view ligou
+                await sync_to_async(perfil_thread.disable)()
+                perfis.append(perfil_thread)
+        duracao = (time.perf_counter() - inicio) * 1000
+        # Gravar os arquivos fora do event loop
+        return await sync_to_async(self._registrar)(perfis, request, resposta, duracao)
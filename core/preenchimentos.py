@@ -0,0 +1,38 @@
+"""
+Backfills registrados do app core (manage.py executar_backfill <nome>).
+"""
+from django.db.models import OuterRef, Subquery
+
+from .backfill import Backfill, registrar_backfill
+from .models import Doacao, DoacaoArquivada, NecessidadeAlimento
+
+
+def _necessidade_correspondente():
+    # (ong, alimento) é único entre as necessidades
+    return Subquery(
+        NecessidadeAlimento.objects.filter(
+            ong_id=OuterRef('ong_id'),
+            alimento_id=OuterRef('alimento_id'),
+        ).values('id')[:1]
+    )
+
+
+@registrar_backfill
+class NecessidadeDasDoacoes(Backfill):
+    """Preenche Doacao.necessidade das doações criadas antes do campo existir"""
+    nome = 'doacao_necessidade'
+    modelo = Doacao
+    tamanho_lote = 5000
+
+    def pendentes(self, queryset):
+        return queryset.filter(necessidade__isnull=True)
+
+    def processar(self, lote):
+        return lote.update(necessidade_id=_necessidade_correspondente())
+
+
+@registrar_backfill
+class NecessidadeDasDoacoesArquivadas(NecessidadeDasDoacoes):
+    """O mesmo preenchimento para as doações já arquivadas"""
+    nome = 'doacao_arquivada_necessidade'
+    modelo = DoacaoArquivada
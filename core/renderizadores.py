@@ -0,0 +1,39 @@
+"""
+Renderizador JSON da API com codificador em C.
+
+A resposta é codificada pelo orjson (requirements.txt), que converte dicts,
+listas, datas e números direto para bytes, sem passar pelo json.JSONEncoder
+em Python do DRF; só a saída indentada (API navegável) usa o JSONRenderer
+padrão. Tipos que o orjson não conhece (Decimal, textos
+traduzíveis) são convertidos como no encoder do DRF: Decimal vira número e
+datas em UTC terminam em 'Z'.
+"""
+import decimal
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+def _padrao(valor):
+    if isinstance(valor, decimal.Decimal):
+        return float(valor)
+    if isinstance(valor, Promise):
+        return force_str(valor)
+    if hasattr(valor, 'tolist'):
+        return valor.tolist()
+    if hasattr(valor, '__iter__'):
+        return list(valor)
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """JSONRenderer que codifica com orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_padrao, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
@@ -0,0 +1,58 @@
+"""
+Serializadores de leitura da API sobre queryset.values().
+
+Um ModelSerializer instancia um modelo por linha e passa cada valor por um
+Field (to_representation) antes do renderizador. Para listas grandes só de
+leitura isso custa mais CPU que a própria consulta. Estes serializadores
+pedem ao banco só as colunas necessárias, como dicts, e fazem apenas os
+ajustes que o cliente precisa (nome do alimento pelo catálogo em memória,
+URL da foto); o resto é trabalho do JSONRapidoRenderer.
+"""
+from django.conf import settings
+
+from .catalogo import catalogo
+
+
+class LeituraValues:
+    """Base: `campos` vai para values(); `formatar(linha, indice)` ajusta cada dict"""
+    campos = ()
+
+    def formatar(self, linha, indice):
+        return linha
+
+    def serializar(self, queryset):
+        indice = catalogo()
+        formatar = self.formatar
+        return [formatar(linha, indice) for linha in queryset.values(*self.campos)]
+
+
+class OngLeitura(LeituraValues):
+    campos = ('id', 'nome', 'descricao', 'endereco_completo', 'telefone_contato', 'email_contato', 'foto')
+
+    def formatar(self, linha, indice):
+        linha['foto'] = f"{settings.MEDIA_URL}{linha['foto']}" if linha['foto'] else None
+        return linha
+
+
+class NecessidadeLeitura(LeituraValues):
+    campos = (
+        'id', 'ong_id', 'alimento_id', 'quantidade_necessaria', 'quantidade_recebida',
+        'quantidade_faltante', 'percentual_recebido', 'prioridade', 'observacoes',
+    )
+
+    def formatar(self, linha, indice):
+        alimento = indice.alimento(linha['alimento_id'])
+        linha['alimento'] = alimento.nome if alimento else ''
+        linha['unidade'] = alimento.get_unidade_medida_display() if alimento else ''
+        return linha
+
+
+class DoacaoLeitura(LeituraValues):
+    campos = (
+        'id', 'ong_id', 'alimento_id', 'necessidade_id', 'quantidade', 'status', 'mensagem', 'data_doacao',
+    )
+
+    def formatar(self, linha, indice):
+        alimento = indice.alimento(linha['alimento_id'])
+        linha['alimento'] = alimento.nome if alimento else ''
+        return linha
@@ -0,0 +1,216 @@
+"""
+Particionamento (sharding) dos dados de cada ONG entre vários bancos.
+
+As tabelas que crescem com as doações (necessidades, doações, arquivo e log
+de eventos) ficam nos aliases de settings.SHARDS, escolhidos pelo ong_id com
+jump consistent hash: cada ONG mora inteira em um shard, então as escritas de
+ONGs em shards diferentes não disputam a mesma trava de escrita. Usuários, ONGs,
+catálogo, contadores, rollups e a fila de tarefas continuam em 'default'.
+Com SHARDS vazio (o padrão) tudo fica em 'default' e nada muda.
+
+Como rotear:
+- Instâncias e managers relacionados são roteados sozinhos pelo
+  RoteadorShards (doacao.save(), ong.necessidades, doacao.necessidade...).
+- Consultas sem instância (Doacao.objects.filter(...)) precisam de
+  .using(shard_da_ong(ong_id)), ou de em_paralelo() para varrer todos os
+  shards; sem isso vão para 'default', que não tem essas tabelas, e falham.
+- Transações que escrevem nessas tabelas usam atomic(using=shard).
+
+Nos shards, as chaves estrangeiras para 'default' não têm constraint no
+banco (a migração 0015 só as recria fora dos shards). Cada shard começa as suas chaves primárias em
+indice * FAIXA_IDS, então os ids continuam únicos entre shards. Trocar o
+número de shards move cerca de 1/N das ONGs, e o rebalanceamento dos dados
+é manual.
+
+O sharding ainda não pode ser usado em produção. Leem só de 'default' e
+precisam ser convertidas antes: a vitrine de necessidades (home,
+dashboard_cliente, doar), a API, a sincronização, os eventos ao vivo, a
+alocação em lote, a importação, as telas de gerenciamento da ONG e as
+exclusões em cascata de usuários, ONGs e alimentos. Até lá,
+recusar_shards_ativos() (chamada em CoreConfig.ready) impede qualquer
+processo de subir com SHARDS preenchido: servidor WSGI/ASGI, runserver e
+todos os comandos de gerenciamento, inclusive os que dispensam as
+verificações do sistema. Os testes e benchmark_shards registram shards
+temporários depois da inicialização.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .models import ONG
+
+MODELOS_POR_ONG = frozenset({'necessidadealimento', 'doacao', 'doacaoarquivada', 'doacaoevento'})
+FAIXA_IDS = 10 ** 12
+# Bancos em que _sql_inicio_ids sabe posicionar a faixa de ids
+BANCOS_COM_FAIXA = ('sqlite', 'postgresql', 'mysql')
+
+
+def aliases():
+    """Aliases que guardam as tabelas por ONG; ('default',) sem sharding"""
+    return tuple(settings.SHARDS) or ('default',)
+
+
+def _jump(chave, baldes):
+    # Jump consistent hash (Lamping e Veach, 2014): com um balde a mais, só 1/n das chaves muda de balde
+    b, j = -1, 0
+    while j < baldes:
+        b = j
+        chave = (chave * 2862933555777941757 + 1) % 2 ** 64
+        j = int((b + 1) * (2 ** 31 / ((chave >> 33) + 1)))
+    return b
+
+
+def shard_da_ong(ong_id):
+    """Alias do shard de uma ONG"""
+    todos = aliases()
+    return todos[_jump(int(ong_id), len(todos))]
+
+
+def por_ong(model):
+    return model._meta.app_label == 'core' and model._meta.model_name in MODELOS_POR_ONG
+
+
+def agrupar_por_shard(objetos):
+    """{alias: [objetos]} pelo ong_id de cada objeto"""
+    grupos = {}
+    for objeto in objetos:
+        grupos.setdefault(shard_da_ong(objeto.ong_id), []).append(objeto)
+    return grupos
+
+
+def aliases_dos_filtros(filtros):
+    """Só o shard da ONG quando os filtros fixam uma; todos os shards nos demais casos"""
+    ong = filtros.get('ong', filtros.get('ong_id'))
+    if ong is None or isinstance(ong, (list, tuple, set)):
+        return aliases()
+    return (shard_da_ong(ong.pk if isinstance(ong, ONG) else ong),)
+
+
+def em_paralelo(funcao, alvos=None):
+    """
+    [funcao(alias) para cada shard], na ordem dos aliases.
+
+    Com mais de um shard as chamadas rodam em threads, uma conexão por shard;
+    com um só, roda na thread atual (e dentro da transação dela, se houver).
+    """
+    alvos = tuple(alvos or aliases())
+    if len(alvos) == 1:
+        return [funcao(alvos[0])]
+
+    def executar(alias):
+        try:
+            return funcao(alias)
+        finally:
+            # Conexões são por thread: fecha as abertas por esta antes de devolvê-la ao pool
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(alvos), thread_name_prefix='shard') as pool:
+        return list(pool.map(executar, alvos))
+
+
+class RoteadorShards:
+    """Roteador de banco: tabelas por ONG no shard da ONG, o resto em 'default'"""
+
+    def _shard(self, model, instancia):
+        if not por_ong(model):
+            return 'default'
+        if isinstance(instancia, ONG):
+            return shard_da_ong(instancia.pk)
+        ong_id = getattr(instancia, 'ong_id', None)
+        if ong_id is not None:
+            return shard_da_ong(ong_id)
+        # Sem ONG conhecida: quem chama precisa escolher o shard com using()
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Relações entre um shard e 'default' são permitidas (sem constraint no banco);
+        # entre dois shards, nunca
+        bancos = {obj1._state.db, obj2._state.db}
+        return len(bancos - {'default', None}) <= 1
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not settings.SHARDS:
+            return None
+        if app_label == 'core' and model_name in MODELOS_POR_ONG:
+            return db in settings.SHARDS
+        return db == 'default'
+
+
+def _sql_inicio_ids(vendor, tabela, inicio):
+    """Comandos SQL que levam a próxima chave automática de `tabela` a pelo menos `inicio`"""
+    if vendor == 'sqlite':
+        return [
+            ('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [inicio - 1, tabela, inicio - 1]),
+            (
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [tabela, inicio - 1, tabela],
+            ),
+        ]
+    if vendor == 'postgresql':
+        return [(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f'GREATEST(%s, (SELECT COALESCE(MAX(id), 0) + 1 FROM "{tabela}")), false)',
+            [tabela, inicio],
+        )]
+    if vendor == 'mysql':
+        # AUTO_INCREMENT nunca fica abaixo do maior id existente
+        return [(f'ALTER TABLE `{tabela}` AUTO_INCREMENT = {int(inicio)}', [])]
+    # Outros bancos são recusados antes, por verificar_shards (core.E003)
+    return []
+
+
+def recusar_shards_ativos():
+    """ImproperlyConfigured com SHARDS preenchido: há telas e comandos que ainda não roteiam por shard"""
+    if settings.SHARDS:
+        raise ImproperlyConfigured(
+            'SHARDS ainda não pode ser ativado: a vitrine de necessidades, a API, a sincronização, os eventos '
+            'ao vivo, a alocação, a importação, as telas da ONG e as exclusões em cascata só leem de '
+            "'default'. Deixe SHARDS = [] até que esses caminhos usem shard_da_ong() ou em_paralelo() "
+            '(core.shards).'
+        )
+
+
+@checks.register()
+def verificar_shards(app_configs, **kwargs):
+    """Shards que não existem em DATABASES ou sem faixa de ids"""
+    if not settings.SHARDS:
+        return []
+    erros = []
+    for indice, alias in enumerate(settings.SHARDS):
+        if alias not in connections.settings:
+            erros.append(checks.Error(f'O shard {alias!r} não está em DATABASES.', id='core.E002'))
+        elif indice and connections[alias].vendor not in BANCOS_COM_FAIXA:
+            erros.append(checks.Error(
+                f'O shard {alias!r} usa {connections[alias].vendor}, sem suporte à faixa de ids por shard.',
+                hint=f'Use um destes bancos: {", ".join(BANCOS_COM_FAIXA)}.',
+                id='core.E003',
+            ))
+    return erros
+
+
+@receiver(post_migrate)
+def _posicionar_ids(sender, using, **kwargs):
+    """Depois de migrar um shard, faz as chaves automáticas começarem na faixa dele"""
+    if sender.label != 'core' or using not in settings.SHARDS:
+        return
+    indice = settings.SHARDS.index(using)
+    if indice == 0:
+        return
+    conexao = connections[using]
+    with conexao.cursor() as cursor:
+        for model in sender.get_models():
+            if por_ong(model) and model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+                for sql, parametros in _sql_inicio_ids(conexao.vendor, model._meta.db_table, indice * FAIXA_IDS + 1):
+                    cursor.execute(sql, parametros)
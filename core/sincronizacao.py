@@ -0,0 +1,119 @@
+"""
+Sincronização incremental para o cliente: o que mudou desde um cursor.
+
+ONGs, necessidades e as doações do usuário são lidas pela posição
+(data_atualizacao, id) de cada uma, com índices nessas colunas: uma
+sincronização sem alterações faz três consultas que não encontram nada e
+devolve só um cursor novo. Linhas desativadas (ativa=False) voltam como
+tombstones, apenas o id em `removidos`; doações arquivadas não mudam mais e
+não precisam ser removidas do cliente.
+
+O cursor é opaco para o cliente (base64 das três posições). Ele nunca avança
+além de agora menos SINCRONIZACAO['margem_segundos']: uma transação ainda
+aberta pode gravar uma data_atualizacao um pouco anterior à das linhas já
+lidas, e a margem faz essas linhas recentes serem relidas na próxima
+sincronização em vez de perdidas. Por isso `mais` só vem ligado quando a
+página termina antes do teto. O cliente deve tratar cada linha como upsert
+pelo id.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .catalogo import catalogo
+from .models import Doacao, NecessidadeAlimento, ONG
+from .serializadores import DoacaoLeitura, NecessidadeLeitura, OngLeitura
+
+RECURSOS = ('ongs', 'necessidades', 'doacoes')
+LEITURAS = {
+    'ongs': OngLeitura(),
+    'necessidades': NecessidadeLeitura(),
+    'doacoes': DoacaoLeitura(),
+}
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+UM_MICROSSEGUNDO = timedelta(microseconds=1)
+
+
+class CursorInvalido(ValueError):
+    """Cursor que não foi gerado por esta API"""
+
+
+def _micros(data):
+    return (data - EPOCA) // UM_MICROSSEGUNDO
+
+
+def codificar_cursor(posicoes):
+    valores = [valor for recurso in RECURSOS for valor in posicoes[recurso]]
+    return base64.urlsafe_b64encode(json.dumps(valores, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """{recurso: (microssegundos, id)}; cursor vazio começa do zero"""
+    if not cursor:
+        return {recurso: (0, 0) for recurso in RECURSOS}
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorInvalido(cursor)
+    if (
+        not isinstance(valores, list) or len(valores) != 2 * len(RECURSOS)
+        or not all(isinstance(valor, int) and valor >= 0 for valor in valores)
+    ):
+        raise CursorInvalido(cursor)
+    return {recurso: (valores[2 * i], valores[2 * i + 1]) for i, recurso in enumerate(RECURSOS)}
+
+
+def _alteradas(queryset, posicao, campos, limite):
+    micros, ultimo_id = posicao
+    if micros or ultimo_id:
+        data = EPOCA + micros * UM_MICROSSEGUNDO
+        queryset = queryset.filter(Q(data_atualizacao__gt=data) | Q(data_atualizacao=data, id__gt=ultimo_id))
+    return list(queryset.order_by('data_atualizacao', 'id').values(*campos)[:limite + 1])
+
+
+def _querysets(usuario):
+    return {
+        'ongs': ONG.objects.all(),
+        'necessidades': NecessidadeAlimento.objects.all(),
+        'doacoes': Doacao.objects.filter(doador=usuario),
+    }
+
+
+def alteracoes(usuario, cursor='', limite=None):
+    """Linhas alteradas desde o cursor, tombstones das desativadas e o próximo cursor"""
+    config = settings.SINCRONIZACAO
+    limite = limite or config['limite']
+    posicoes = decodificar_cursor(cursor)
+    teto = (_micros(timezone.now() - timedelta(seconds=config['margem_segundos'])), 0)
+    indice = catalogo()
+
+    resposta = {recurso: [] for recurso in RECURSOS}
+    resposta['removidos'] = {'ongs': [], 'necessidades': []}
+    resposta['mais'] = False
+    for recurso, queryset in _querysets(usuario).items():
+        leitura = LEITURAS[recurso]
+        campos = leitura.campos + ('data_atualizacao',) + (('ativa',) if recurso != 'doacoes' else ())
+        linhas = _alteradas(queryset, posicoes[recurso], campos, limite)
+        excedentes = len(linhas) > limite
+        linhas = linhas[:limite]
+        if linhas:
+            # Posição da última linha lida, sem passar do teto nem voltar atrás
+            ultima = (_micros(linhas[-1]['data_atualizacao']), linhas[-1]['id'])
+            posicoes[recurso] = max(posicoes[recurso], min(ultima, teto))
+            # Página que termina depois do teto: o resto é ainda mais recente e só entra
+            # numa próxima sincronização; pedir já devolveria a mesma página
+            if excedentes and ultima <= teto:
+                resposta['mais'] = True
+        for linha in linhas:
+            del linha['data_atualizacao']
+            if linha.pop('ativa', True):
+                resposta[recurso].append(leitura.formatar(linha, indice))
+            else:
+                resposta['removidos'][recurso].append(linha['id'])
+    resposta['cursor'] = codificar_cursor(posicoes)
+    return resposta
@@ -0,0 +1,163 @@
+"""
+Fila de tarefas em segundo plano, guardada no próprio banco.
+
+Funções decoradas com @tarefa ganham um método `enfileirar(*args, **kwargs)`,
+que insere uma linha em Tarefa, e `enfileirar_lote(lista_argumentos)`, que
+insere várias em um único INSERT. Como a inserção usa a conexão e a transação
+correntes, a tarefa só fica visível para os workers quando a transação da
+requisição é confirmada (e desaparece junto se ela for desfeita).
+
+O comando `manage.py processar_tarefas` reserva lotes de tarefas e as executa
+em um pool de threads ou de processos, com novas tentativas e backoff
+exponencial em caso de erro.
+"""
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarefa
+
+_tarefas = {}
+
+
+def tarefa(func=None, *, max_tentativas=5):
+    """Registra uma função como tarefa executável pelo worker"""
+    def decorador(func):
+        if func.__name__ in _tarefas:
+            raise ValueError(f'Tarefa {func.__name__!r} já registrada')
+        _tarefas[func.__name__] = func
+
+        def enfileirar(*args, executar_em=None, **kwargs):
+            return Tarefa.objects.create(
+                nome=func.__name__,
+                argumentos=list(args),
+                argumentos_nomeados=kwargs,
+                max_tentativas=max_tentativas,
+                executar_em=executar_em or timezone.now(),
+            )
+
+        def enfileirar_lote(lista_argumentos, executar_em=None):
+            """Enfileira uma tarefa por tupla de argumentos, em um único INSERT"""
+            executar_em = executar_em or timezone.now()
+            return Tarefa.objects.bulk_create([
+                Tarefa(
+                    nome=func.__name__,
+                    argumentos=list(argumentos),
+                    argumentos_nomeados={},
+                    max_tentativas=max_tentativas,
+                    executar_em=executar_em,
+                )
+                for argumentos in lista_argumentos
+            ])
+
+        func.enfileirar = enfileirar
+        func.enfileirar_lote = enfileirar_lote
+        return func
+
+    if func is not None:
+        return decorador(func)
+    return decorador
+
+
+def tarefas_registradas():
+    return dict(_tarefas)
+
+
+def reservar_lote(limite):
+    """
+    Marca até `limite` tarefas prontas como em execução e as retorna.
+
+    Usa SELECT ... FOR UPDATE SKIP LOCKED quando o banco suporta, para que
+    vários workers reservem lotes diferentes sem esperar uns pelos outros.
+    Nos demais (SQLite), a reserva é um único UPDATE ... WHERE id IN (SELECT ...
+    LIMIT n), que o próprio banco serializa.
+    """
+    token = uuid.uuid4().hex
+    agora = timezone.now()
+    prontas = Tarefa.objects.filter(
+        status='pendente',
+        executar_em__lte=agora
+    ).order_by('executar_em', 'id')
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(prontas.select_for_update(skip_locked=True).values_list('id', flat=True)[:limite])
+            alvo = Tarefa.objects.filter(id__in=ids)
+        else:
+            alvo = Tarefa.objects.filter(id__in=prontas.values('id')[:limite])
+        alvo.filter(status='pendente').update(
+            status='executando',
+            reserva=token,
+            iniciada_em=agora,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(Tarefa.objects.filter(reserva=token, status='executando').values_list('id', flat=True))
+
+
+def liberar_travadas():
+    """
+    Trata tarefas em execução há mais de TAREFAS_TIMEOUT segundos (worker morto).
+
+    As que ainda têm tentativas voltam à fila; as que já esgotaram
+    max_tentativas são marcadas como 'falhou'. Retorna (devolvidas, falharam).
+    """
+    agora = timezone.now()
+    travadas = Tarefa.objects.filter(
+        status='executando',
+        iniciada_em__lt=agora - timedelta(seconds=settings.TAREFAS_TIMEOUT),
+    )
+    falharam = travadas.filter(tentativas__gte=F('max_tentativas')).update(
+        status='falhou',
+        reserva='',
+        concluida_em=agora,
+        erro='Tempo de execução esgotado na última tentativa',
+    )
+    devolvidas = travadas.update(status='pendente', reserva='')
+    return devolvidas, falharam
+
+
+def _backoff(tentativas):
+    espera = settings.TAREFAS_BACKOFF_BASE * 2 ** (tentativas - 1)
+    return timedelta(seconds=espera + random.uniform(0, espera / 10))
+
+
+def executar_tarefa(tarefa_id):
+    """
+    Executa uma tarefa reservada e registra o resultado; retorna o status final.
+
+    O resultado só é gravado se a reserva ainda for deste worker: se a tarefa
+    foi liberada por liberar_travadas() no meio da execução, retorna 'descartada'.
+    """
+    registro = Tarefa.objects.get(pk=tarefa_id)
+    reserva = registro.reserva
+    func = _tarefas.get(registro.nome)
+    try:
+        if func is None:
+            raise LookupError(f'Tarefa {registro.nome!r} não registrada')
+        func(*registro.argumentos, **registro.argumentos_nomeados)
+    except Exception:
+        registro.erro = traceback.format_exc()
+        if func is not None and registro.tentativas < registro.max_tentativas:
+            registro.status = 'pendente'
+            registro.executar_em = timezone.now() + _backoff(registro.tentativas)
+        else:
+            registro.status = 'falhou'
+            registro.concluida_em = timezone.now()
+    else:
+        registro.status = 'concluida'
+        registro.concluida_em = timezone.now()
+        registro.erro = ''
+    gravadas = Tarefa.objects.filter(pk=registro.pk, status='executando', reserva=reserva).update(
+        status=registro.status,
+        executar_em=registro.executar_em,
+        concluida_em=registro.concluida_em,
+        erro=registro.erro,
+        reserva='',
+    )
+    return registro.status if gravadas else 'descartada'
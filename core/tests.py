@@ -1,3 +1,1627 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import pstats
+from datetime import timedelta
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import (
+    alocacao, ao_vivo, consultas_lentas, contas, eventos, expiracao, shards, sincronizacao, tarefas,
+)
+from .admin import DoacaoAdmin, PaginatorContagemEstimada
+from .benchmarks import shards_descartaveis
+from .catalogo import catalogo
+from .consumidores import (
+    ContadoresStatus, Placares, RollupsDiarios, atualizar_placares, contagem_por_status, placar,
+    posicao_no_placar, resumo_tendencias, serie_diaria,
+)
+from .historico import contagem_status_historico, historico_doacoes, ranking_entregues
+from .models import (
+    User, ONG, CategoriaAlimento, Alimento, NecessidadeAlimento, Doacao,
+    DoacaoArquivada, DoacaoEvento, ConsumidorEvento, DoacaoDiaria, PlacarEntregas, Tarefa, BackfillProgresso,
+    STATUS_FINALIZADOS, VersaoCatalogo,
+)
+from .management.commands.tempo_importacao import ler_importtime
+from .renderizadores import JSONRapidoRenderer
+
+
+def contadores():
+    """Processa os eventos pendentes, como o processar_eventos, e lê os contadores"""
+    eventos.processar_pendentes(ContadoresStatus())
+    return contagem_por_status()
+
+
+def criar_ong(username='ong_teste', nome='ONG Teste', cnpj='00.000.000/0001-00'):
+    user = User.objects.create_user(username=username, password='senha123', user_type='ong')
+    return ONG.objects.create(
+        user=user,
+        nome=nome,
+        cnpj=cnpj,
+        descricao='ONG de teste',
+        endereco_completo='Rua Teste, 1 - São Paulo, SP',
+        telefone_contato='(11) 0000-0000',
+        email_contato=f'{username}@example.com',
+        responsavel='Responsável'
+    )
+
+
+def criar_alimento(nome='Arroz', unidade='kg'):
+    categoria, _ = CategoriaAlimento.objects.get_or_create(nome='Grãos e Cereais')
+    return Alimento.objects.create(nome=nome, categoria=categoria, unidade_medida=unidade)
+
+
+class NecessidadeProgressoTests(TestCase):
+    """Colunas geradas de progresso das necessidades"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+
+    def test_colunas_calculadas_no_insert_e_no_update(self):
+        necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=3
+        )
+        self.assertEqual(necessidade.quantidade_faltante, Decimal('3.00'))
+        self.assertEqual(necessidade.percentual_recebido, Decimal('0.00'))
+
+        necessidade.quantidade_recebida = 1
+        necessidade.save()
+        self.assertEqual(necessidade.quantidade_faltante, Decimal('2.00'))
+        self.assertEqual(necessidade.percentual_recebido, Decimal('33.33'))
+
+        necessidade.quantidade_recebida = Decimal('4.50')
+        necessidade.save()
+        self.assertEqual(necessidade.quantidade_faltante, Decimal('0.00'))
+        self.assertEqual(necessidade.percentual_recebido, Decimal('150.00'))
+
+    def test_consultas_de_progresso(self):
+        feijao = criar_alimento('Feijão')
+        quase = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=100, quantidade_recebida=90
+        )
+        pouco = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=feijao, quantidade_necessaria=200, quantidade_recebida=10
+        )
+
+        self.assertEqual(list(NecessidadeAlimento.objects.quase_completas()), [quase])
+        self.assertEqual(list(NecessidadeAlimento.objects.pouco_atendidas()), [pouco])
+        self.assertEqual(list(NecessidadeAlimento.objects.mais_faltantes()), [pouco, quase])
+
+
+class EventosDoacaoTests(TestCase):
+    """Log de eventos e consumidores incrementais"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=100
+        )
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+
+    def test_views_registram_transicoes(self):
+        self.client.force_login(self.cliente)
+        self.client.post(
+            reverse('core:doar_alimento', args=[self.necessidade.id]), {'quantidade': '10'}
+        )
+        doacao = Doacao.objects.get()
+
+        self.client.force_login(self.ong.user)
+        self.client.post(
+            reverse('core:atualizar_status_doacao', args=[doacao.id]), {'status': 'entregue'}
+        )
+
+        self.assertEqual(
+            list(DoacaoEvento.objects.values_list('doacao_id', 'status_anterior', 'status_novo')),
+            [(doacao.id, '', 'pendente'), (doacao.id, 'pendente', 'entregue')]
+        )
+
+    def test_consumidor_processa_apenas_eventos_novos(self):
+        eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=5
+        )
+        self.assertEqual(contadores(), {'pendente': 1})
+
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=7
+        )
+        eventos.alterar_status(doacao, 'cancelada')
+        self.assertEqual(eventos.processar_pendentes(ContadoresStatus()), 2)
+        self.assertEqual(eventos.processar_pendentes(ContadoresStatus()), 0)
+        self.assertEqual(contadores(), {'pendente': 1, 'cancelada': 1})
+
+        ultimo = DoacaoEvento.objects.latest('id').id
+        self.assertEqual(ConsumidorEvento.objects.get(nome='contadores_status').ultimo_evento_id, ultimo)
+
+    def test_reconstrucao_a_partir_da_tabela(self):
+        # Doações anteriores ao log são contadas pela reconstrução inicial
+        Doacao.objects.create(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=1, status='entregue'
+        )
+        self.assertEqual(contadores(), {'entregue': 1})
+
+    def test_remocoes_descontam_dos_consumidores(self):
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=5
+        )
+        eventos.alterar_status(doacao, 'entregue')
+        eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=2
+        )
+        self.assertEqual(contadores(), {'entregue': 1, 'pendente': 1})
+        atualizar_placares()
+        self.assertEqual(placar('doador'), [(self.cliente.id, 1, Decimal('5.00'))])
+
+        doacao.delete()
+        self.assertEqual(contadores(), {'entregue': 0, 'pendente': 1})
+        # A cascata do usuário também registra a remoção
+        self.cliente.delete()
+        self.assertEqual(contadores(), {'entregue': 0, 'pendente': 0})
+        self.assertEqual(
+            list(DoacaoEvento.objects.filter(status_novo='').values_list('status_anterior', flat=True)),
+            ['entregue', 'pendente']
+        )
+        atualizar_placares()
+        self.assertEqual(placar('doador'), [])
+
+    def test_arquivamento_nao_registra_remocao(self):
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=5
+        )
+        eventos.alterar_status(doacao, 'entregue')
+        self.assertEqual(contadores(), {'entregue': 1})
+        antiga = timezone.now() - timedelta(days=200)
+        Doacao.objects.filter(pk=doacao.pk).update(data_doacao=antiga, data_atualizacao=antiga)
+        call_command('arquivar_doacoes', dias=90, stdout=StringIO())
+
+        self.assertFalse(DoacaoEvento.objects.filter(status_novo='').exists())
+        self.assertEqual(contadores(), {'entregue': 1})
+
+
+class RollupsDiariosTests(TestCase):
+    """Rollups diários alimentados pelo log de eventos"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+
+    def doar(self, quantidade, dias_atras=0):
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=quantidade
+        )
+        if dias_atras:
+            data = timezone.now() - timedelta(days=dias_atras)
+            Doacao.objects.filter(pk=doacao.pk).update(data_doacao=data)
+            DoacaoEvento.objects.filter(doacao=doacao).update(data_doacao=data)
+            doacao.data_doacao = data
+        return doacao
+
+    def test_transicoes_movem_totais_entre_status(self):
+        eventos.processar_pendentes(RollupsDiarios())
+        doacao = self.doar(10)
+        self.doar(5, dias_atras=20)
+        eventos.alterar_status(doacao, 'entregue')
+        eventos.processar_pendentes(RollupsDiarios())
+
+        hoje = timezone.localdate()
+        self.assertEqual(
+            sorted(DoacaoDiaria.objects.filter(total__gt=0).values_list('dia', 'status', 'total', 'quantidade')),
+            sorted([
+                (hoje, 'entregue', 1, Decimal('10.00')),
+                (hoje - timedelta(days=20), 'pendente', 1, Decimal('5.00')),
+            ])
+        )
+        self.assertEqual(
+            resumo_tendencias(self.ong),
+            [
+                {'dias': 7, 'doacoes': 1, 'entregues': 1},
+                {'dias': 30, 'doacoes': 2, 'entregues': 1},
+                {'dias': 365, 'doacoes': 2, 'entregues': 1},
+            ]
+        )
+        serie = serie_diaria(30, self.ong)
+        self.assertEqual(len(serie), 30)
+        self.assertEqual(serie[-1], {'dia': hoje, 'total': 1, 'altura': 100})
+
+    def test_reconstrucao_igual_ao_incremental(self):
+        eventos.processar_pendentes(RollupsDiarios())
+        for quantidade in (1, 2, 3):
+            eventos.alterar_status(self.doar(quantidade, dias_atras=quantidade), 'confirmada')
+        eventos.processar_pendentes(RollupsDiarios())
+        incremental = set(DoacaoDiaria.objects.filter(total__gt=0).values_list(
+            'dia', 'ong_id', 'alimento_id', 'status', 'total', 'quantidade'
+        ))
+
+        eventos.reconstruir(RollupsDiarios())
+        reconstruido = set(DoacaoDiaria.objects.values_list(
+            'dia', 'ong_id', 'alimento_id', 'status', 'total', 'quantidade'
+        ))
+        self.assertEqual(incremental, reconstruido)
+
+    def test_reconstrucao_inclui_arquivadas(self):
+        eventos.processar_pendentes(RollupsDiarios())
+        contadores()
+        antigas = [self.doar(quantidade, dias_atras=200) for quantidade in (1, 2)]
+        for doacao in antigas:
+            eventos.alterar_status(doacao, 'entregue')
+        self.doar(4, dias_atras=200)
+        Doacao.objects.filter(pk__in=[d.pk for d in antigas]).update(data_atualizacao=antigas[0].data_doacao)
+        call_command('arquivar_doacoes', dias=90, lote=1, stdout=StringIO())
+        self.assertEqual(DoacaoArquivada.objects.count(), 2)
+
+        eventos.processar_pendentes(RollupsDiarios())
+        incremental = set(DoacaoDiaria.objects.filter(total__gt=0).values_list(
+            'dia', 'status', 'total', 'quantidade'
+        ))
+        incrementais = contadores()
+        self.assertEqual(incrementais, {'pendente': 1, 'entregue': 2})
+
+        eventos.reconstruir(RollupsDiarios())
+        eventos.reconstruir(ContadoresStatus())
+        self.assertEqual(incremental, set(DoacaoDiaria.objects.values_list('dia', 'status', 'total', 'quantidade')))
+        self.assertEqual(contadores(), incrementais)
+
+
+class PlacaresTests(TestCase):
+    """Placares de entregas mantidos pelo log de eventos, com janelas móveis"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.ana = User.objects.create_user(username='ana', password='senha123')
+        self.bia = User.objects.create_user(username='bia', password='senha123')
+
+    def entregar(self, doador, quantidade, dias_atras=0):
+        doacao = eventos.criar_doacao(doador=doador, ong=self.ong, alimento=self.alimento, quantidade=quantidade)
+        if dias_atras:
+            data = timezone.now() - timedelta(days=dias_atras)
+            Doacao.objects.filter(pk=doacao.pk).update(data_doacao=data)
+            DoacaoEvento.objects.filter(doacao=doacao).update(data_doacao=data)
+            doacao.data_doacao = data
+        eventos.alterar_status(doacao, 'entregue')
+        return doacao
+
+    def test_entradas_e_saidas_de_entregue_por_janela(self):
+        atualizar_placares()
+        self.entregar(self.ana, 10)
+        self.entregar(self.ana, 5, dias_atras=20)
+        self.entregar(self.bia, 3)
+        eventos.alterar_status(self.entregar(self.bia, 4), 'cancelada')
+        eventos.criar_doacao(doador=self.bia, ong=self.ong, alimento=self.alimento, quantidade=1)
+        atualizar_placares()
+
+        self.assertEqual(placar('doador'), [(self.ana.id, 2, Decimal('15.00')), (self.bia.id, 1, Decimal('3.00'))])
+        self.assertEqual(placar('doador', 7), [(self.ana.id, 1, Decimal('10.00')), (self.bia.id, 1, Decimal('3.00'))])
+        self.assertEqual(placar('ong', 30), [(self.ong.id, 3, Decimal('18.00'))])
+        self.assertEqual(placar('alimento', 365, limite=1), [(self.alimento.id, 3, Decimal('18.00'))])
+        self.assertEqual(posicao_no_placar('doador', self.bia.id), {'posicao': 2, 'total': 1, 'quantidade': Decimal('3.00')})
+        self.assertEqual(posicao_no_placar('doador', self.bia.id, 7)['posicao'], 1)
+        self.assertEqual(dict((chave, total) for chave, total, _ in placar('doador')), dict(ranking_entregues('doador_id')))
+
+        incremental = set(PlacarEntregas.objects.filter(total__gt=0).values_list(
+            'dimensao', 'janela', 'chave', 'total', 'quantidade'
+        ))
+        eventos.reconstruir(Placares())
+        self.assertEqual(incremental, set(PlacarEntregas.objects.values_list(
+            'dimensao', 'janela', 'chave', 'total', 'quantidade'
+        )))
+
+    def test_janelas_deslizam_com_os_dias(self):
+        atualizar_placares()
+        self.entregar(self.ana, 10, dias_atras=5)
+        atualizar_placares()
+        self.assertEqual(placar('doador', 7), [(self.ana.id, 1, Decimal('10.00'))])
+
+        agora = timezone.now()
+        with mock.patch('django.utils.timezone.now', return_value=agora + timedelta(days=3)):
+            # Sem eventos novos: quem desliza as janelas é a rodada do processar_eventos
+            call_command('processar_eventos', '--consumidor', 'placares', stdout=StringIO())
+            self.assertEqual(placar('doador', 7), [])
+            self.assertEqual(placar('doador', 30), [(self.ana.id, 1, Decimal('10.00'))])
+            self.assertEqual(placar('doador'), [(self.ana.id, 1, Decimal('10.00'))])
+
+    def test_dashboard_admin_ignora_removidos_e_remocoes_descontam(self):
+        self.entregar(self.ana, 10)
+        self.entregar(self.bia, 3)
+        atualizar_placares()
+        staff = User.objects.create_user(username='staff', password='senha123', is_staff=True)
+        self.ana.delete()
+        self.ong.delete()
+        self.alimento.delete()
+
+        # Remoções ainda não processadas: o placar tem ids que não existem mais
+        self.client.force_login(staff)
+        resposta = self.client.get(reverse('core:dashboard_admin'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['top_ongs'], [])
+        self.assertEqual([d.username for d in resposta.context['top_doadores']], ['bia'])
+        self.assertEqual(resposta.context['top_alimentos'], [])
+
+        atualizar_placares()
+        self.assertEqual(placar('doador'), [])
+        self.assertEqual(placar('ong'), [])
+
+    def test_top_n_lido_pelo_indice(self):
+        plano = PlacarEntregas.objects.filter(dimensao='doador', janela=0, total__gt=0).order_by(
+            '-total', 'chave'
+        )[:5].explain()
+        self.assertIn('placar_ranking_idx', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_doador_ve_a_propria_posicao(self):
+        self.entregar(self.ana, 10)
+        self.entregar(self.ana, 10)
+        self.entregar(self.bia, 3)
+        atualizar_placares()
+        self.client.login(username='bia', password='senha123')
+        resposta = self.client.get(reverse('core:dashboard_cliente'))
+        self.assertEqual(resposta.context['minhas_posicoes'][0], {
+            'janela': 0, 'posicao': 2, 'total': 1, 'quantidade': Decimal('3.00'),
+        })
+        self.assertContains(resposta, 'Minha Posição entre os Doadores')
+
+
+@tarefas.tarefa(max_tentativas=2)
+def tarefa_que_falha_nos_testes():
+    raise RuntimeError('falha proposital')
+
+
+@tarefas.tarefa
+def tarefa_liberada_nos_testes():
+    # Dada como travada e reservada por outro worker enquanto ainda executa
+    tarefas.liberar_travadas()
+    tarefas.reservar_lote(10)
+
+
+class FilaTarefasTests(TestCase):
+    """Fila de tarefas em segundo plano"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=100
+        )
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+
+    def test_doacao_enfileira_notificacao_da_ong(self):
+        self.client.force_login(self.cliente)
+        self.client.post(
+            reverse('core:doar_alimento', args=[self.necessidade.id]), {'quantidade': '3'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+        ids = tarefas.reservar_lote(10)
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(tarefas.reservar_lote(10), [])
+        self.assertEqual(tarefas.executar_tarefa(ids[0]), 'concluida')
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.ong.email_contato])
+
+    def test_nova_tentativa_com_backoff_e_falha_definitiva(self):
+        registro = tarefa_que_falha_nos_testes.enfileirar()
+
+        [tarefa_id] = tarefas.reservar_lote(10)
+        self.assertEqual(tarefas.executar_tarefa(tarefa_id), 'pendente')
+        registro.refresh_from_db()
+        self.assertGreater(registro.executar_em, timezone.now())
+        self.assertIn('falha proposital', registro.erro)
+
+        # Ainda em backoff: nada a reservar
+        self.assertEqual(tarefas.reservar_lote(10), [])
+
+        Tarefa.objects.filter(pk=registro.pk).update(executar_em=timezone.now())
+        [tarefa_id] = tarefas.reservar_lote(10)
+        self.assertEqual(tarefas.executar_tarefa(tarefa_id), 'falhou')
+
+    @override_settings(TAREFAS_TIMEOUT=0)
+    def test_resultado_descartado_sem_a_reserva(self):
+        registro = tarefa_liberada_nos_testes.enfileirar()
+        [tarefa_id] = tarefas.reservar_lote(10)
+        self.assertEqual(tarefas.executar_tarefa(tarefa_id), 'descartada')
+        registro.refresh_from_db()
+        self.assertEqual((registro.status, registro.tentativas), ('executando', 2))
+
+    @override_settings(TAREFAS_TIMEOUT=0)
+    def test_travada_sem_tentativas_falha(self):
+        registro = tarefa_que_falha_nos_testes.enfileirar()
+        tarefas.reservar_lote(10)
+        self.assertEqual(tarefas.liberar_travadas(), (1, 0))
+        tarefas.reservar_lote(10)
+        # Travada na última tentativa: falha em vez de voltar à fila
+        self.assertEqual(tarefas.liberar_travadas(), (0, 1))
+        registro.refresh_from_db()
+        self.assertEqual(registro.status, 'falhou')
+        self.assertEqual(tarefas.reservar_lote(10), [])
+
+
+@override_settings(LIMITES_TAXA={
+    'login': {'ip': (4, 0.001), 'conta': (2, 0.001)},
+    'api': {'ip': (2, 0.001)},
+})
+class LimiteTaxaTests(TestCase):
+    """Balde de tokens em login e na API"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='maria', password='senha123')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_login_rejeitado_antes_de_authenticate(self):
+        url = reverse('core:login')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'username': 'maria', 'password': 'x'}).status_code, 200)
+
+        with mock.patch('core.views.aauthenticate') as authenticate:
+            resposta = self.client.post(url, {'username': 'Maria', 'password': 'senha123'})
+        self.assertEqual(resposta.status_code, 429)
+        self.assertIn('Retry-After', resposta)
+        authenticate.assert_not_called()
+
+        # Outra conta, mesmo IP: tentativas rejeitadas também gastam o balde por IP
+        self.assertEqual(self.client.post(url, {'username': 'outra', 'password': 'x'}).status_code, 200)
+        self.assertEqual(self.client.post(url, {'username': 'mais_uma', 'password': 'x'}).status_code, 429)
+
+    def test_api_usa_o_mesmo_balde(self):
+        url = reverse('core:api_status')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+
+@override_settings(SENHAS_PBKDF2_ITERACOES=1000)
+class LoginAssincronoTests(TestCase):
+    """Login assíncrono com o hash de senha no pool"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='joana', password='senha123')
+
+    def test_login_valido_e_invalido(self):
+        url = reverse('core:login')
+        resposta = self.client.post(url, {'username': 'joana', 'password': 'senha123'})
+        self.assertRedirects(resposta, reverse('core:dashboard_cliente'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+        self.client.logout()
+        resposta = self.client.post(url, {'username': 'joana', 'password': 'errada'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_hash_regravado_quando_iteracoes_mudam(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(SENHAS_PBKDF2_ITERACOES=1200):
+            self.client.post(reverse('core:login'), {'username': 'joana', 'password': 'senha123'})
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1200$'))
+        self.assertTrue(self.user.check_password('senha123'))
+
+
+class CatalogoTests(TestCase):
+    """Snapshot do catálogo de alimentos em memória"""
+
+    def setUp(self):
+        cache.clear()
+        self.ong = criar_ong()
+        self.arroz = criar_alimento('Arroz')
+        self.leite = criar_alimento('Leite', 'l')
+
+    def test_resolve_sem_consultas_e_recarrega_ao_editar(self):
+        catalogo()
+        with self.assertNumQueries(0):
+            arroz = catalogo().alimento(str(self.arroz.pk))
+            self.assertEqual(arroz.categoria.nome, 'Grãos e Cereais')
+            self.assertEqual(str(catalogo().alimento(self.leite.pk)), 'Leite (Litro)')
+            self.assertEqual(len(catalogo().alimentos_da_categoria(arroz.categoria.id)), 2)
+            self.assertIsNone(catalogo().alimento('abc'))
+
+        self.arroz.nome = 'Arroz Integral'
+        self.arroz.save()
+        self.assertEqual(catalogo().alimento(self.arroz.pk).nome, 'Arroz Integral')
+
+    def test_alteracao_de_outro_processo_vale_apos_o_intervalo(self):
+        catalogo()
+        # Outro processo grava um alimento e troca o carimbo no banco
+        [feijao] = Alimento.objects.bulk_create([Alimento(nome='Feijão', categoria=self.arroz.categoria)])
+        VersaoCatalogo.objects.filter(pk=1).update(versao='outro-processo')
+
+        with override_settings(CATALOGO={'intervalo_versao': 60}):
+            with self.assertNumQueries(0):
+                self.assertIsNone(catalogo().alimento(feijao.pk))
+        with override_settings(CATALOGO={'intervalo_versao': 0}):
+            self.assertEqual(catalogo().alimento(feijao.pk).nome, 'Feijão')
+            self.assertEqual(catalogo().versao, 'outro-processo')
+
+    def test_adicionar_necessidade_usa_o_catalogo(self):
+        self.client.force_login(self.ong.user)
+        url = reverse('core:adicionar_necessidade')
+        self.client.post(url, {'alimento': self.leite.pk, 'quantidade_necessaria': '10', 'prioridade': 'alta'})
+        self.assertTrue(NecessidadeAlimento.objects.filter(ong=self.ong, alimento=self.leite).exists())
+
+        resposta = self.client.post(url, {'alimento': 999, 'quantidade_necessaria': '10', 'prioridade': 'alta'})
+        self.assertEqual(resposta.status_code, 200)
+        # O formulário usa o autocompletar em vez de listar o catálogo
+        self.assertContains(resposta, reverse('core:buscar_alimentos'))
+        self.assertNotContains(resposta, 'Arroz')
+
+    def test_autocompletar_por_prefixo_sem_acentos(self):
+        feijao = criar_alimento('Feijão Preto')
+        mandioca = criar_alimento('Mandioca')
+        mandioca.sinonimos = 'Macaxeira, aipim'
+        mandioca.save()
+
+        def nomes(prefixo, limite=10):
+            return [alimento.nome for alimento in catalogo().buscar_alimentos(prefixo, limite)]
+
+        self.assertEqual(nomes('FEIJAO'), ['Feijão Preto'])
+        self.assertEqual(nomes('pre'), ['Feijão Preto'])
+        self.assertEqual(nomes('aip'), ['Mandioca'])
+        # Início do nome antes de sinônimos e de outras palavras
+        self.assertEqual(nomes('ma'), ['Mandioca'])
+        self.assertEqual(nomes('a'), ['Arroz', 'Mandioca'])
+        self.assertEqual(nomes('a', limite=1), ['Arroz'])
+        self.assertEqual(nomes('  '), [])
+
+        feijao.sinonimos = 'feijão de corda'
+        feijao.save()
+        self.assertEqual(nomes('corda'), ['Feijão Preto'])
+
+        self.client.force_login(self.ong.user)
+        catalogo()
+        with self.assertNumQueries(2):
+            resposta = self.client.get(reverse('core:buscar_alimentos'), {'q': 'Leí'})
+        self.assertEqual(resposta.json(), {'resultados': [{
+            'id': self.leite.pk,
+            'nome': 'Leite',
+            'categoria': 'Grãos e Cereais',
+            'unidade_medida': 'l',
+            'unidade': 'Litro',
+        }]})
+
+
+class NecessidadeDaDoacaoTests(TestCase):
+    """Ligação direta entre doação e necessidade"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=10
+        )
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+
+    def test_entrega_atualiza_necessidade_em_um_update(self):
+        doacao = Doacao.objects.create(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento,
+            necessidade=self.necessidade, quantidade=10
+        )
+        self.client.force_login(self.ong.user)
+        url = reverse('core:atualizar_status_doacao', args=[doacao.id])
+        self.client.get(url)  # carrega a sessão e o catálogo antes de contar as consultas
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(url, {'status': 'entregue'})
+        atualizacoes = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "core_necessidadealimento"')]
+        self.assertEqual(len(atualizacoes), 1)
+        self.assertFalse(any(
+            q['sql'].startswith('SELECT') and 'FROM "core_necessidadealimento"' in q['sql'] for q in consultas
+        ))
+
+        self.necessidade.refresh_from_db()
+        self.assertEqual(self.necessidade.quantidade_recebida, 10)
+        self.assertFalse(self.necessidade.ativa)
+
+    def test_preenchimento_em_lotes(self):
+        doacoes = [
+            Doacao.objects.create(doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=1)
+            for _ in range(3)
+        ]
+        Doacao.objects.filter(id__in=[d.id for d in doacoes]).update(necessidade=None)
+
+        # Para no meio: o checkpoint guarda o último id do lote confirmado
+        call_command('executar_backfill', 'doacao_necessidade', lote=2, max_lotes=1, stdout=StringIO())
+        progresso = BackfillProgresso.objects.get(nome='doacao_necessidade')
+        self.assertEqual((progresso.ultimo_id, progresso.lotes), (doacoes[1].id, 1))
+        self.assertIsNone(progresso.concluido_em)
+        self.assertIsNone(Doacao.objects.get(pk=doacoes[2].pk).necessidade_id)
+
+        # A próxima execução retoma dali e conclui
+        call_command('executar_backfill', 'doacao_necessidade', lote=2, stdout=StringIO())
+        progresso.refresh_from_db()
+        self.assertIsNotNone(progresso.concluido_em)
+        self.assertEqual(progresso.linhas_processadas, 3)
+        self.assertEqual(
+            set(Doacao.objects.filter(id__in=[d.id for d in doacoes]).values_list('necessidade_id', flat=True)),
+            {self.necessidade.id}
+        )
+
+
+class ArquivamentoDoacoesTests(TestCase):
+    """Arquivamento de doações finalizadas e histórico nas duas tabelas"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+        antiga = timezone.now() - timedelta(days=200)
+        self.doacoes = {}
+        for status, data in [('entregue', antiga), ('pendente', antiga), ('cancelada', timezone.now())]:
+            doacao = Doacao.objects.create(
+                doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=1, status=status
+            )
+            Doacao.objects.filter(pk=doacao.pk).update(data_doacao=data, data_atualizacao=data)
+            self.doacoes[status] = doacao
+
+    def test_move_apenas_finalizadas_antigas(self):
+        call_command('arquivar_doacoes', dias=90, lote=1, stdout=StringIO())
+
+        arquivada = DoacaoArquivada.objects.get()
+        self.assertEqual(arquivada.id, self.doacoes['entregue'].id)
+        self.assertEqual(arquivada.status, 'entregue')
+        self.assertEqual(
+            set(Doacao.objects.values_list('status', flat=True)), {'pendente', 'cancelada'}
+        )
+        # Rodar de novo não move mais nada
+        call_command('arquivar_doacoes', dias=90, stdout=StringIO())
+        self.assertEqual(DoacaoArquivada.objects.count(), 1)
+
+    def test_historico_le_as_duas_tabelas(self):
+        call_command('arquivar_doacoes', dias=90, stdout=StringIO())
+
+        self.client.force_login(self.cliente)
+        resposta = self.client.get(reverse('core:minhas_doacoes'))
+        self.assertEqual(
+            [d.id for d in resposta.context['doacoes']],
+            [self.doacoes['cancelada'].id, self.doacoes['pendente'].id, self.doacoes['entregue'].id]
+        )
+
+        self.client.force_login(self.ong.user)
+        resposta = self.client.get(reverse('core:gerenciar_doacoes_ong'), {'status': 'entregue'})
+        self.assertEqual([d.id for d in resposta.context['doacoes']], [self.doacoes['entregue'].id])
+        self.assertEqual(resposta.context['stats']['entregue'], 1)
+        self.assertEqual(resposta.context['stats']['pendente'], 1)
+
+
+class ExpiracaoDoacoesTests(TestCase):
+    """Expiração em lotes de doações pendentes antigas"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+        antiga = timezone.now() - timedelta(days=45)
+        self.doacoes = []
+        for status, data in [('pendente', antiga), ('pendente', antiga), ('confirmada', antiga), ('pendente', None)]:
+            doacao = eventos.criar_doacao(doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=2)
+            if status != 'pendente':
+                eventos.alterar_status(doacao, status)
+            if data:
+                Doacao.objects.filter(pk=doacao.pk).update(data_doacao=data)
+            self.doacoes.append(doacao)
+
+    def test_expira_pendentes_antigas_em_lotes_com_eventos(self):
+        saida = StringIO()
+        call_command('expirar_doacoes', dias=30, lote=1, stdout=saida)
+
+        self.assertIn('2 doação(ões) expirada(s) em 2 lote(s)', saida.getvalue())
+        self.assertEqual(
+            list(Doacao.objects.order_by('id').values_list('status', flat=True)),
+            ['expirada', 'expirada', 'confirmada', 'pendente']
+        )
+        self.assertEqual(
+            sorted(DoacaoEvento.objects.filter(status_novo='expirada').values_list('doacao_id', 'status_anterior')),
+            [(self.doacoes[0].id, 'pendente'), (self.doacoes[1].id, 'pendente')]
+        )
+        self.assertEqual(contadores(), {'pendente': 1, 'confirmada': 1, 'expirada': 2})
+
+        # Rodar de novo não expira mais nada
+        call_command('expirar_doacoes', dias=30, stdout=StringIO())
+        self.assertEqual(DoacaoEvento.objects.filter(status_novo='expirada').count(), 2)
+
+    def test_confirmacao_concorrente_vence_a_expiracao(self):
+        pendente = self.doacoes[0]
+        consulta_original = expiracao.expiraveis
+
+        def confirmar_no_meio(dias, alias='default'):
+            # A ONG confirma depois de o varredor escolher o lote e antes do UPDATE
+            ids = list(consulta_original(dias, alias).values_list('id', flat=True))
+            Doacao.objects.filter(pk=pendente.pk).update(status='confirmada')
+            return Doacao.objects.using(alias).filter(id__in=ids)
+
+        with mock.patch.object(expiracao, 'expiraveis', confirmar_no_meio):
+            self.assertEqual(expiracao.expirar_lote(30), (2, 1))
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.status, 'confirmada')
+        self.assertFalse(DoacaoEvento.objects.filter(doacao=pendente, status_novo='expirada').exists())
+
+    def test_lote_todo_confirmado_nao_encerra_a_varredura(self):
+        primeira, segunda = self.doacoes[:2]
+        consulta_original = expiracao.expiraveis
+        chamadas = []
+
+        def confirmar_primeiro_lote(dias, alias='default'):
+            chamadas.append(dias)
+            if len(chamadas) > 1:
+                return consulta_original(dias, alias)
+            # A ONG confirma a única doação do primeiro lote depois da seleção e antes do UPDATE
+            Doacao.objects.filter(pk=primeira.pk).update(status='confirmada')
+            return Doacao.objects.using(alias).filter(pk=primeira.pk)
+
+        with mock.patch.object(expiracao, 'expiraveis', confirmar_primeiro_lote):
+            saida = StringIO()
+            call_command('expirar_doacoes', dias=30, lote=1, stdout=saida)
+        self.assertIn('1 doação(ões) expirada(s) em 2 lote(s)', saida.getvalue())
+        segunda.refresh_from_db()
+        self.assertEqual(segunda.status, 'expirada')
+
+    def test_ong_nao_altera_doacao_finalizada(self):
+        expirada = self.doacoes[0]
+        call_command('expirar_doacoes', dias=30, stdout=StringIO())
+        self.client.force_login(self.ong.user)
+        url = reverse('core:atualizar_status_doacao', args=[expirada.id])
+        resposta = self.client.post(url, {'status': 'confirmada'}, follow=True)
+        self.assertContains(resposta, 'não pode mais ser alterado')
+        expirada.refresh_from_db()
+        self.assertEqual(expirada.status, 'expirada')
+        self.assertFalse(DoacaoEvento.objects.filter(doacao=expirada, status_anterior='expirada').exists())
+
+
+class ChangelistGrandeTests(TestCase):
+    """Paginação do admin com contagem limitada"""
+
+    def setUp(self):
+        ong = criar_ong()
+        alimento = criar_alimento()
+        doador = User.objects.create_user(username='doador', password='senha123')
+        Doacao.objects.bulk_create([
+            Doacao(doador=doador, ong=ong, alimento=alimento, quantidade=1) for _ in range(12)
+        ])
+        staff = User.objects.create_superuser(username='staff', password='senha123', email='staff@teste.com')
+        self.client.force_login(staff)
+
+    @mock.patch.object(PaginatorContagemEstimada, 'limite_contagem', 5)
+    @mock.patch.object(DoacaoAdmin, 'list_per_page', 2)
+    def test_paginas_alem_do_limite_da_contagem(self):
+        url = reverse('admin:core_doacao_changelist')
+        resposta = self.client.get(url)
+        self.assertEqual(str(resposta.context['cl'].result_count), '5+')
+        self.assertContains(resposta, '5+ Doações')
+
+        # Página 6 de 2 em 2: além das 5 linhas contadas, sem redirecionar para ?e=1
+        resposta = self.client.get(url, {'p': 6})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.context['cl'].result_list), 2)
+        self.assertEqual(resposta.context['cl'].result_count, 12)
+
+
+class PerfilamentoTests(TestCase):
+    """Perfilamento sob demanda por cabeçalho de staff"""
+
+    def setUp(self):
+        self.diretorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        config = {
+            'ativo': True, 'amostragem': 0.0, 'cabecalho': 'X-Perfilar',
+            'diretorio': self.diretorio, 'max_arquivos': 2, 'top': 10,
+        }
+        self.ajuste = self.settings(PERFILAMENTO=config)
+        self.ajuste.enable()
+        self.addCleanup(self.ajuste.disable)
+
+    def test_cabecalho_so_vale_para_staff(self):
+        comum = User.objects.create_user(username='comum', password='senha123')
+        self.client.force_login(comum)
+        resposta = self.client.get(reverse('core:home'), headers={'X-Perfilar': '1'})
+        self.assertNotIn('X-Perfil', resposta)
+        self.assertEqual(list(self.diretorio.iterdir()), [])
+
+        staff = User.objects.create_user(username='staff', password='senha123', is_staff=True)
+        self.client.force_login(staff)
+        for _ in range(3):
+            resposta = self.client.get(reverse('core:home'), headers={'X-Perfilar': '1'})
+        nome = resposta['X-Perfil']
+        self.assertIn('cumulative', (self.diretorio / f'{nome}.txt').read_text())
+        # Rotação: só os dois perfis mais recentes ficam no diretório
+        self.assertEqual(len(list(self.diretorio.glob('*.prof'))), 2)
+
+    async def test_perfila_requisicao_assincrona(self):
+        staff = await sync_to_async(User.objects.create_user)(username='staff', password='senha123', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        resposta = await self.async_client.get(reverse('core:login'), headers={'X-Perfilar': '1'})
+        self.assertTrue((self.diretorio / f"{resposta['X-Perfil']}.prof").exists())
+
+    async def test_perfil_assincrono_inclui_view_sincrona(self):
+        staff = await sync_to_async(User.objects.create_user)(username='staff', password='senha123', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        resposta = await self.async_client.get(reverse('core:home'), headers={'X-Perfilar': '1'})
+        estatisticas = pstats.Stats(str(self.diretorio / f"{resposta['X-Perfil']}.prof"))
+        # A view síncrona roda na thread de trabalho, fora do event loop
+        funcoes = {(Path(arquivo).name, nome) for arquivo, _, nome in estatisticas.stats}
+        self.assertIn(('views.py', 'home'), funcoes)
+
+
+class ConsultasLentasTests(TestCase):
+    """Log de consultas lentas com formas normalizadas e planos"""
+
+    def setUp(self):
+        self.diretorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        config = {
+            'ativo': True, 'limite_ms': 0, 'max_ocorrencias': 50, 'max_formas': 50,
+            'arquivo': self.diretorio / 'lentas.jsonl', 'max_bytes': 1024 * 1024, 'backups': 1,
+        }
+        self.ajuste = self.settings(CONSULTAS_LENTAS=config)
+        self.ajuste.enable()
+        self.addCleanup(self.ajuste.disable)
+        consultas_lentas.reiniciar()
+        self.addCleanup(consultas_lentas.reiniciar)
+
+    def test_normalizar_agrupa_valores(self):
+        self.assertEqual(
+            consultas_lentas.normalizar('SELECT * FROM t WHERE a = 1 AND b IN (%s, %s, %s) AND c = \'x\''),
+            consultas_lentas.normalizar('SELECT *  FROM t WHERE a = 25 AND b IN (%s) AND c = \'yy\''),
+        )
+
+    def test_registra_view_plano_e_arquivo(self):
+        staff = User.objects.create_user(username='staff', password='senha123', is_staff=True)
+        self.client.force_login(staff)
+        for _ in range(2):
+            self.client.get(reverse('core:minhas_doacoes'))
+
+        formas = consultas_lentas.registro().formas_por_tempo()
+        doacoes = [f for f in formas if 'core_doacao' in f['forma'] and f['forma'].startswith('SELECT')]
+        self.assertTrue(doacoes)
+        self.assertEqual(doacoes[0]['contagem'], 2)
+        self.assertEqual(doacoes[0]['views'], ['core:minhas_doacoes'])
+        self.assertTrue(doacoes[0]['plano'])
+
+        resposta = self.client.get(reverse('core:consultas_lentas'))
+        self.assertContains(resposta, 'core:minhas_doacoes')
+
+        saida = StringIO()
+        call_command('consultas_lentas', view='core:minhas_doacoes', stdout=saida)
+        self.assertIn('core_doacao', saida.getvalue())
+
+    async def test_monitora_view_assincrona(self):
+        usuario = await sync_to_async(User.objects.create_user)(username='cliente', password='senha123')
+        await self.async_client.aforce_login(usuario)
+        await self.async_client.get(reverse('core:login'))
+
+        formas = await sync_to_async(consultas_lentas.registro().formas_por_tempo)()
+        sessoes = [f for f in formas if 'django_session' in f['forma']]
+        self.assertTrue(sessoes)
+        self.assertEqual(sessoes[0]['views'], ['core:login'])
+
+
+class AlocacaoTests(TestCase):
+    """Divisão de uma doação grande entre várias necessidades"""
+
+    def setUp(self):
+        cache.clear()
+        self.alimento = criar_alimento()
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+        self.necessidades = {}
+        for i, (prioridade, quantidade) in enumerate([('media', 50), ('urgente', 10), ('urgente', 30), ('baixa', 100)]):
+            ong = criar_ong(f'ong{i}', f'ONG {i}', f'00.000.000/000{i}-00')
+            self.necessidades[(prioridade, quantidade)] = NecessidadeAlimento.objects.create(
+                ong=ong, alimento=self.alimento, quantidade_necessaria=quantidade, prioridade=prioridade
+            )
+        # 20 já a caminho da necessidade média: restam 30
+        Doacao.objects.create(
+            doador=self.cliente, ong=self.necessidades[('media', 50)].ong,
+            alimento=self.alimento, quantidade=20
+        )
+
+    def test_planeja_por_prioridade_e_restante(self):
+        parcelas, sobra = alocacao.planejar(self.alimento.id, 60)
+        self.assertEqual(
+            [(p.necessidade_id, p.quantidade) for p in parcelas],
+            [
+                (self.necessidades[('urgente', 30)].id, 30),
+                (self.necessidades[('urgente', 10)].id, 10),
+                (self.necessidades[('media', 50)].id, 20),
+            ]
+        )
+        self.assertEqual(sobra, 0)
+
+        # As 20 unidades finais não completam nenhuma necessidade e ficam abaixo do mínimo
+        parcelas, sobra = alocacao.planejar(self.alimento.id, 60, minimo=Decimal('25'))
+        self.assertEqual([p.quantidade for p in parcelas], [30, 10])
+        self.assertEqual(sobra, 20)
+
+    def test_doacao_confirmada_desconta_uma_vez(self):
+        necessidade = self.necessidades[('urgente', 30)]
+        doacao = Doacao.objects.create(
+            doador=self.cliente, ong=necessidade.ong, alimento=self.alimento,
+            necessidade=necessidade, quantidade=10
+        )
+        doacao.status = 'confirmada'
+        doacao.save()
+        doacao.registrar_recebimento()
+
+        # Já somada a quantidade_recebida: restam 20, não 10
+        restantes = {
+            necessidade_id: restante
+            for necessidade_id, _, _, restante in alocacao.candidatas(self.alimento.id)
+        }
+        self.assertEqual(restantes[necessidade.id], 20)
+        self.assertEqual(restantes[self.necessidades[('media', 50)].id], 30)
+
+    def test_view_cria_doacoes_eventos_e_notificacoes(self):
+        self.client.force_login(self.cliente)
+        url = reverse('core:doar_em_lote')
+        dados = {'alimento': self.alimento.id, 'quantidade': '500'}
+
+        resposta = self.client.post(url, dados)
+        self.assertEqual(len(resposta.context['plano']), 4)
+        self.assertEqual(resposta.context['sobra'], 500 - 30 - 10 - 30 - 100)
+        self.assertEqual(Doacao.objects.count(), 1)
+
+        self.client.post(url, dict(dados, confirmar='1'))
+        self.assertEqual(Doacao.objects.count(), 5)
+        self.assertEqual(DoacaoEvento.objects.count(), 4)
+        self.assertEqual(Tarefa.objects.filter(nome='notificar_ong_nova_doacao').count(), 4)
+
+
+class ImportacaoNecessidadesTests(TestCase):
+    """Importação de necessidades por planilha, com upsert e erros por linha"""
+
+    def setUp(self):
+        cache.clear()
+        self.ong = criar_ong()
+        self.arroz = criar_alimento('Arroz')
+        self.feijao = criar_alimento('Feijão Carioca')
+        self.existente = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.arroz, quantidade_necessaria=10, quantidade_recebida=4
+        )
+
+    def importar(self, conteudo, nome='necessidades.csv'):
+        self.client.force_login(self.ong.user)
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode('utf-8')
+        arquivo = SimpleUploadedFile(nome, conteudo)
+        return self.client.post(reverse('core:importar_necessidades'), {'arquivo': arquivo})
+
+    def test_cria_atualiza_e_relata_erros(self):
+        resposta = self.importar(
+            'Alimento;Quantidade;Prioridade;Observações\n'
+            'arroz;1.250,5;Urgente;estoque do mês\n'
+            'FEIJAO  carioca;30;;\n'
+            'Macarrão;5;alta;\n'
+            f'{self.feijao.id};abc;alta;\n'
+            ';;;\n'
+            'Arroz;20;alta;repetido: vale a última linha\n'
+        )
+        resultado = resposta.context['resultado']
+        self.assertEqual((resultado.linhas, resultado.criadas, resultado.atualizadas), (5, 1, 1))
+        self.assertEqual([linha for linha, _ in resultado.erros], [4, 5])
+
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.quantidade_necessaria, Decimal('20.00'))
+        self.assertEqual(self.existente.quantidade_recebida, Decimal('4.00'))
+        self.assertEqual(self.existente.prioridade, 'alta')
+        feijao = NecessidadeAlimento.objects.get(ong=self.ong, alimento=self.feijao)
+        self.assertEqual((feijao.quantidade_necessaria, feijao.prioridade), (Decimal('30.00'), 'media'))
+
+    def test_arquivo_invalido(self):
+        resposta = self.importar('nome,qtd\narroz,1\n')
+        self.assertIsNone(resposta.context['resultado'])
+        self.assertIn('obrigatória', str(list(resposta.context['messages'])[0]))
+
+        resposta = self.importar('alimento,quantidade\n', nome='necessidades.txt')
+        self.assertIsNone(resposta.context['resultado'])
+        self.assertEqual(NecessidadeAlimento.objects.count(), 1)
+
+        # Campo acima do limite do módulo csv
+        resposta = self.importar('alimento,quantidade\n"' + 'a' * 200000 + '",1\n')
+        self.assertIsNone(resposta.context['resultado'])
+        self.assertIn('CSV inválido', str(list(resposta.context['messages'])[0]))
+
+    def test_quantidades_nao_finitas_sao_erros_de_linha(self):
+        resposta = self.importar('alimento,quantidade\narroz,NaN\narroz,inf\narroz,-Infinity\nfeijao carioca,2\n')
+        resultado = resposta.context['resultado']
+        self.assertEqual([linha for linha, _ in resultado.erros], [2, 3, 4])
+        self.assertEqual(resultado.criadas, 1)
+
+    def test_nao_pede_menos_que_o_recebido(self):
+        resposta = self.importar('alimento,quantidade\narroz,3\narroz,4\n')
+        resultado = resposta.context['resultado']
+        self.assertEqual([linha for linha, _ in resultado.erros], [2])
+        self.assertIn('já recebida', resultado.erros[0][1])
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.quantidade_necessaria, Decimal('4.00'))
+
+    def test_importa_xlsx(self):
+        from openpyxl import Workbook
+
+        pasta = Workbook()
+        planilha = pasta.active
+        planilha.append(['Alimento', 'Quantidade', 'Prioridade', 'Ativa'])
+        planilha.append(['Feijão Carioca', 12.5, 'Urgente', 'sim'])
+        planilha.append([None, None, None, None])
+        planilha.append([self.arroz.id, 8, None, 'não'])
+        planilha.append(['Macarrão', 1, None, None])
+        conteudo = BytesIO()
+        pasta.save(conteudo)
+
+        resultado = self.importar(conteudo.getvalue(), nome='necessidades.xlsx').context['resultado']
+        self.assertEqual((resultado.linhas, resultado.criadas, resultado.atualizadas), (3, 1, 1))
+        self.assertEqual([linha for linha, _ in resultado.erros], [5])
+        feijao = NecessidadeAlimento.objects.get(ong=self.ong, alimento=self.feijao)
+        self.assertEqual((feijao.quantidade_necessaria, feijao.prioridade), (Decimal('12.50'), 'urgente'))
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.quantidade_necessaria, self.existente.ativa), (Decimal('8.00'), False))
+
+
+@override_settings(SENHAS_PBKDF2_ITERACOES=1000)
+class ImportacaoContasTests(TestCase):
+    """Importação em massa de doadores e ONGs"""
+
+    def setUp(self):
+        self.ong = criar_ong()
+        self.arquivo = Path(tempfile.mkdtemp()) / 'contas.csv'
+        self.addCleanup(shutil.rmtree, self.arquivo.parent)
+
+    def test_valida_cnpj(self):
+        self.assertEqual(contas.validar_cnpj('11222333000181'), '11.222.333/0001-81')
+        for invalido in ('11.222.333/0001-82', '11111111111111', '123'):
+            with self.assertRaises(ValueError):
+                contas.validar_cnpj(invalido)
+
+    def test_cria_contas_e_perfis_e_relata_erros(self):
+        self.arquivo.write_text(
+            'username,email,senha,nome,cnpj,ong,endereco_completo\n'
+            'maria,Maria@example.com,s3nha-forte,Maria,,,\n'
+            'ong_nova,contato@ong.org,,,11.222.333/0001-81,ONG Nova,"Rua A, 1"\n'
+            'ong_teste,outro@example.com,x,,,,\n'
+            'joao,maria@example.com,x,,,,\n'
+            'ong_ruim,ruim@ong.org,x,,11.222.333/0001-82,ONG Ruim,Rua B\n'
+            'ong_dup,dup@ong.org,x,,11222333000181,ONG Dup,Rua C\n',
+            encoding='utf-8'
+        )
+        saida = StringIO()
+        call_command('importar_contas', str(self.arquivo), processos=1, stdout=saida)
+        self.assertIn('2 conta(s) criada(s), 4 erro(s)', saida.getvalue())
+
+        maria = User.objects.get(username='maria')
+        self.assertEqual((maria.email, maria.user_type), ('maria@example.com', 'cliente'))
+        self.assertTrue(maria.check_password('s3nha-forte'))
+
+        ong = ONG.objects.get(cnpj='11.222.333/0001-81')
+        self.assertEqual((ong.user.username, ong.user.user_type), ('ong_nova', 'ong'))
+        self.assertEqual((ong.email_contato, ong.responsavel), ('contato@ong.org', 'ong_nova'))
+        self.assertFalse(ong.user.has_usable_password())
+
+    def test_simulacao_nao_grava(self):
+        self.arquivo.write_text('username,email\nmaria,maria@example.com\n', encoding='utf-8')
+        call_command('importar_contas', str(self.arquivo), simular=True, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username='maria').exists())
+
+
+@override_settings(AO_VIVO=dict(settings.AO_VIVO, intervalo_consulta=0.05, heartbeat=0.2))
+class EventosAoVivoTests(TestCase):
+    """Fluxo SSE de progresso e doações"""
+
+    def setUp(self):
+        cache.clear()
+        self.ong = criar_ong()
+        self.outra = criar_ong('outra', 'Outra ONG', '11.111.111/0001-11')
+        self.alimento = criar_alimento()
+        self.necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=10
+        )
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+
+    def doar_e_entregar(self):
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento,
+            necessidade=self.necessidade, quantidade=4,
+        )
+        eventos.alterar_status(doacao, 'entregue')
+        doacao.registrar_recebimento()
+        return doacao
+
+    async def ler_ate(self, fluxo, tipo):
+        recebidas = []
+        async for parte in fluxo:
+            # A resposta HTTP entrega bytes; o gerador de ao_vivo, str
+            parte = parte.decode() if isinstance(parte, bytes) else parte
+            recebidas.append(parte)
+            if f'event: {tipo}\n' in parte:
+                return parte, recebidas
+        self.fail(f'fluxo encerrado sem {tipo}')
+
+    def test_progresso_quando_a_pendente_e_recebida(self):
+        doacao = eventos.criar_doacao(
+            doador=self.cliente, ong=self.ong, alimento=self.alimento,
+            necessidade=self.necessidade, quantidade=4,
+        )
+        eventos.alterar_status(doacao, 'confirmada')
+        doacao.registrar_recebimento()
+        eventos.alterar_status(doacao, 'entregue')
+
+        log = list(DoacaoEvento.objects.order_by('id'))
+        progresso = [m.id for m in ao_vivo.mensagens(log) if m.tipo == 'progresso']
+        # Só a confirmação altera a quantidade recebida; a entrega depois dela, não
+        self.assertEqual(progresso, [log[1].id])
+        self.assertEqual([m.id for m in ao_vivo.reenviar(['catalogo'], 0)], [log[1].id])
+
+    def test_sem_fluxo_sob_wsgi(self):
+        self.client.force_login(self.ong.user)
+        resposta = self.client.get(reverse('core:eventos_ao_vivo'), {'canais': f'ong:{self.ong.id}'})
+        self.assertEqual(resposta.status_code, 204)
+        self.assertNotContains(self.client.get(reverse('core:dashboard_ong')), 'EventSource')
+
+    async def test_script_incluido_sob_asgi(self):
+        await self.async_client.aforce_login(self.ong.user)
+        resposta = await self.async_client.get(reverse('core:dashboard_ong'))
+        self.assertContains(resposta, 'EventSource')
+
+    async def test_permissoes_e_canais(self):
+        await self.async_client.aforce_login(self.ong.user)
+        url = reverse('core:eventos_ao_vivo')
+        resposta = await self.async_client.get(url, {'canais': 'ong:1;drop'})
+        self.assertEqual(resposta.status_code, 400)
+        resposta = await self.async_client.get(url, {'canais': f'doacoes:{self.outra.id}'})
+        self.assertEqual(resposta.status_code, 403)
+
+    async def test_reenvio_pelo_last_event_id(self):
+        await sync_to_async(self.doar_e_entregar)()
+        await self.async_client.aforce_login(self.ong.user)
+        resposta = await self.async_client.get(
+            reverse('core:eventos_ao_vivo'),
+            {'canais': f'ong:{self.ong.id},doacoes:{self.ong.id}'},
+            headers={'Last-Event-ID': '0'},
+        )
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        fluxo = aiter(resposta.streaming_content)
+        try:
+            parte, recebidas = await self.ler_ate(fluxo, 'progresso')
+        finally:
+            await fluxo.aclose()
+        self.assertIn('"percentual_recebido": "40.00"', parte)
+        self.assertEqual(sum('event: doacao\n' in p for p in recebidas), 2)
+
+    async def test_ao_vivo_pelo_leitor_do_log(self):
+        fluxo = ao_vivo.fluxo(['catalogo'])
+        try:
+            self.assertTrue((await anext(fluxo)).startswith('retry:'))
+            proxima = asyncio.ensure_future(self.ler_ate(fluxo, 'progresso'))
+            await asyncio.sleep(0.1)
+            with self.captureOnCommitCallbacks(execute=True):
+                await sync_to_async(self.doar_e_entregar)()
+            parte, recebidas = await asyncio.wait_for(proxima, timeout=5)
+        finally:
+            await fluxo.aclose()
+        self.assertIn(f'"necessidade_id": {self.necessidade.id}', parte)
+        # Canal público: as doações (privadas) da ONG não aparecem
+        self.assertFalse(any('event: doacao\n' in p for p in recebidas))
+        self.assertEqual(ao_vivo.distribuidor().total, 0)
+
+
+@override_settings(SINCRONIZACAO={'limite': 500, 'margem_segundos': 0})
+class SincronizacaoTests(TestCase):
+    """API de sincronização incremental por cursor"""
+
+    def setUp(self):
+        cache.clear()
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        self.necessidade = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=self.alimento, quantidade_necessaria=10
+        )
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+        outro = User.objects.create_user(username='outro', password='senha123')
+        self.doacao = Doacao.objects.create(doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=2)
+        Doacao.objects.create(doador=outro, ong=self.ong, alimento=self.alimento, quantidade=3)
+        self.client.force_login(self.cliente)
+        self.url = reverse('core:api_sincronizar')
+
+    def sincronizar(self, cursor=''):
+        resposta = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json(), len(resposta.content)
+
+    def test_alteracoes_desde_o_cursor(self):
+        dados, _ = self.sincronizar()
+        self.assertEqual([o['id'] for o in dados['ongs']], [self.ong.id])
+        self.assertEqual(dados['necessidades'][0]['alimento'], 'Arroz')
+        self.assertEqual([d['id'] for d in dados['doacoes']], [self.doacao.id])
+
+        # Sem alterações: só o cursor, em poucas centenas de bytes
+        vazio, tamanho = self.sincronizar(dados['cursor'])
+        self.assertEqual((vazio['ongs'], vazio['necessidades'], vazio['doacoes']), ([], [], []))
+        self.assertLess(tamanho, 300)
+
+        NecessidadeAlimento.objects.filter(pk=self.necessidade.pk).receber(4)
+        dados, _ = self.sincronizar(vazio['cursor'])
+        self.assertEqual(dados['necessidades'][0]['quantidade_recebida'], 4.0)
+        self.assertEqual((dados['ongs'], dados['doacoes']), ([], []))
+
+        self.necessidade.ativa = False
+        self.necessidade.save()
+        dados, _ = self.sincronizar(dados['cursor'])
+        self.assertEqual(dados['necessidades'], [])
+        self.assertEqual(dados['removidos']['necessidades'], [self.necessidade.id])
+
+    def test_mais_so_quando_o_cursor_avanca(self):
+        segunda = NecessidadeAlimento.objects.create(
+            ong=self.ong, alimento=criar_alimento('Feijão'), quantidade_necessaria=5
+        )
+        dados = sincronizacao.alteracoes(self.cliente, limite=1)
+        self.assertTrue(dados['mais'])
+        dados = sincronizacao.alteracoes(self.cliente, dados['cursor'], limite=1)
+        self.assertEqual([n['id'] for n in dados['necessidades']], [segunda.id])
+        self.assertFalse(dados['mais'])
+
+        # Tudo dentro da margem: o cursor não passa do teto, então não há próxima página a pedir
+        with override_settings(SINCRONIZACAO={'limite': 500, 'margem_segundos': 3600}):
+            dados = sincronizacao.alteracoes(self.cliente, limite=1)
+            self.assertFalse(dados['mais'])
+            repetida = sincronizacao.alteracoes(self.cliente, dados['cursor'], limite=1)
+            self.assertEqual(repetida['necessidades'], dados['necessidades'])
+
+    def test_cursor_invalido_e_autenticacao(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nao-e-um-cursor'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SerializacaoApiTests(TestCase):
+    """Listas da API com values() e o renderizador rápido"""
+
+    def setUp(self):
+        cache.clear()
+        self.ong = criar_ong()
+        self.alimento = criar_alimento()
+        ongs = [self.ong] + [criar_ong(f'ong{i}', f'ONG {i}', f'00.000.000/000{i}-00') for i in (2, 3)]
+        self.necessidades = [
+            NecessidadeAlimento.objects.create(ong=ong, alimento=self.alimento, quantidade_necessaria=10)
+            for ong in ongs
+        ]
+        self.cliente = User.objects.create_user(username='cliente', password='senha123')
+        self.client.force_login(self.cliente)
+
+    def test_renderizador_igual_ao_padrao(self):
+        dados = {'valor': Decimal('1.50'), 'data': timezone.now(), 1: 'chave numérica', 'lista': [None, True]}
+        self.assertEqual(json.loads(JSONRapidoRenderer().render(dados)), json.loads(JSONRenderer().render(dados)))
+
+    def test_necessidades_paginadas_e_filtradas(self):
+        url = reverse('core:api_necessidades')
+        dados = self.client.get(url, {'limite': 2}).json()
+        self.assertEqual([n['id'] for n in dados['resultados']], [n.id for n in self.necessidades[:2]])
+        self.assertEqual(dados['resultados'][0]['alimento'], 'Arroz')
+        dados = self.client.get(url, {'limite': 2, 'apos': dados['proximo']}).json()
+        self.assertEqual(([n['id'] for n in dados['resultados']], dados['proximo']), ([self.necessidades[2].id], None))
+        self.assertEqual(self.client.get(url, {'alimento': self.alimento.id + 1}).json()['resultados'], [])
+        # limite=0 vale como 1
+        dados = self.client.get(url, {'limite': 0}).json()
+        primeira = self.necessidades[0].id
+        self.assertEqual(([n['id'] for n in dados['resultados']], dados['proximo']), ([primeira], primeira))
+
+    def test_minhas_doacoes_inclui_arquivadas(self):
+        doacao = Doacao.objects.create(doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=2)
+        arquivada = DoacaoArquivada.objects.create(
+            id=doacao.id + 100, doador=self.cliente, ong=self.ong, alimento=self.alimento, quantidade=5,
+            status='entregue', data_doacao=timezone.now(), data_atualizacao=timezone.now(),
+        )
+        dados = self.client.get(reverse('core:api_minhas_doacoes')).json()
+        self.assertEqual([d['id'] for d in dados['resultados']], [arquivada.id, doacao.id])
+        dados = self.client.get(reverse('core:api_minhas_doacoes'), {'antes': arquivada.id}).json()
+        self.assertEqual([d['id'] for d in dados['resultados']], [doacao.id])
+        dados = self.client.get(reverse('core:api_minhas_doacoes'), {'limite': 0}).json()
+        self.assertEqual(dados['proximo'], arquivada.id)
+
+
+class PartidaTests(TestCase):
+    """Importações na partida do worker e dos comandos"""
+
+    def test_drf_so_carrega_na_primeira_requisicao_da_api(self):
+        codigo = (
+            'import sys, django\n'
+            'django.setup()\n'
+            'from django.urls import get_resolver\n'
+            'get_resolver().url_patterns\n'
+            'print("rest_framework.views" in sys.modules)\n'
+        )
+        processo = subprocess.run(
+            [sys.executable, '-c', codigo], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'donation_project.settings'},
+        )
+        self.assertEqual(processo.stdout.strip(), 'False', processo.stderr)
+        self.assertEqual(self.client.get(reverse('core:api_status')).json()['status'], 'online')
+
+    def test_ler_importtime(self):
+        saida = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:       300 |        420 | django\n'
+        )
+        self.assertEqual(ler_importtime(saida), [('django.utils', 1, 120, 120), ('django', 0, 300, 420)])
+
+
+class ShardsTests(TransactionTestCase):
+    """Dados por ONG em dois bancos SQLite temporários (core.shards)"""
+    # Os shards só existem a partir de setUpClass, depois das verificações do runner
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.aliases = cls.enterClassContext(shards_descartaveis(2))
+        super().setUpClass()
+
+    def test_jump_consistente(self):
+        with override_settings(SHARDS=[]):
+            self.assertEqual(shards.shard_da_ong(7), 'default')
+        with override_settings(SHARDS=['a', 'b', 'c', 'd']):
+            antes = [shards.shard_da_ong(ong_id) for ong_id in range(2000)]
+        with override_settings(SHARDS=['a', 'b', 'c', 'd', 'e']):
+            depois = [shards.shard_da_ong(ong_id) for ong_id in range(2000)]
+        # Com um shard a mais, só as ONGs que vão para ele mudam de lugar (~1/5)
+        movidas = [novo for velho, novo in zip(antes, depois) if velho != novo]
+        self.assertEqual(set(movidas), {'e'})
+        self.assertAlmostEqual(len(movidas) / 2000, 0.2, delta=0.05)
+
+    def test_verificacoes_e_constraints(self):
+        self.assertEqual(shards.verificar_shards(None), [])
+        with override_settings(SHARDS=self.aliases + ['inexistente']):
+            self.assertEqual([erro.id for erro in shards.verificar_shards(None)], ['core.E002'])
+        with mock.patch.object(connections[self.aliases[1]], 'vendor', 'oracle'):
+            self.assertEqual([erro.id for erro in shards.verificar_shards(None)], ['core.E003'])
+
+        # Ainda não pode ser ativado: a inicialização do app recusa SHARDS preenchido
+        with self.assertRaisesMessage(ImproperlyConfigured, 'SHARDS ainda não pode ser ativado'):
+            apps.get_app_config('core').ready()
+        with override_settings(SHARDS=[]):
+            apps.get_app_config('core').ready()
+
+        # Constraints das chaves estrangeiras: mantidas em 'default', ausentes nos shards
+        def chaves(alias):
+            with connections[alias].cursor() as cursor:
+                restricoes = connections[alias].introspection.get_constraints(cursor, 'core_doacao')
+            return {tuple(r['columns']) for r in restricoes.values() if r['foreign_key']}
+
+        self.assertTrue({('doador_id',), ('ong_id',), ('alimento_id',)} <= chaves('default'))
+        self.assertEqual(chaves(self.aliases[0]) & {('doador_id',), ('ong_id',), ('alimento_id',)}, set())
+
+    def test_escritas_no_shard_da_ong_e_leituras_em_paralelo(self):
+        alimento = criar_alimento()
+        doador = User.objects.create_user(username='doador', password='senha123')
+        staff = User.objects.create_user(username='staff', password='senha123', is_staff=True)
+        ongs = [criar_ong(f'ong{i}', f'ONG {i}', f'00.000.000/000{i}-00') for i in range(6)]
+        por_shard = {alias: [o for o in ongs if shards.shard_da_ong(o.id) == alias] for alias in self.aliases}
+        self.assertTrue(all(por_shard.values()))
+
+        for ong in ongs:
+            necessidade = ong.necessidades.create(alimento=alimento, quantidade_necessaria=10)
+            doacao = eventos.criar_doacao(
+                doador=doador, ong=ong, alimento=alimento, necessidade=necessidade, quantidade=4
+            )
+            self.assertEqual(doacao._state.db, shards.shard_da_ong(ong.id))
+            eventos.alterar_status(doacao, 'entregue')
+            self.assertEqual(doacao.registrar_recebimento(), 1)
+
+        for indice, alias in enumerate(self.aliases):
+            ids = list(Doacao.objects.using(alias).values_list('id', flat=True))
+            self.assertEqual(len(ids), len(por_shard[alias]))
+            # Faixas de ids por shard: únicos entre os bancos
+            self.assertTrue(all(indice * shards.FAIXA_IDS < id <= (indice + 1) * shards.FAIXA_IDS for id in ids))
+            self.assertEqual(DoacaoEvento.objects.using(alias).count(), 2 * len(por_shard[alias]))
+            self.assertEqual(
+                set(NecessidadeAlimento.objects.using(alias).order_by().values_list('quantidade_recebida', flat=True)),
+                {Decimal('4')},
+            )
+
+        # Consumidores leem o log de cada shard; histórico e ranking varrem todos
+        self.assertEqual(contadores(), {'entregue': 6})
+        self.assertEqual(contagem_status_historico(), {'entregue': 6})
+        self.assertEqual(len(ranking_entregues('ong_id', limite=10)), 6)
+        recentes = historico_doacoes(4, ('ong',))
+        self.assertEqual([d.ong.nome for d in recentes], ['ONG 5', 'ONG 4', 'ONG 3', 'ONG 2'])
+        self.assertEqual({d._state.db for d in historico_doacoes(ong=ongs[0])}, {shards.shard_da_ong(ongs[0].id)})
+
+        self.client.force_login(staff)
+        resposta = self.client.get(reverse('core:dashboard_admin'))
+        self.assertEqual(resposta.context['total_necessidades'], 6)
+        self.assertEqual(len(resposta.context['ultimas_doacoes']), 6)
+
+
+# (rótulo, nome da URL, usuário, método, consultas, orçamento em ms) de cada view de core/urls.py
+ORCAMENTOS = [
+    ('home', 'home', None, 'get', 0, 200),
+    ('login', 'login', None, 'get', 0, 200),
+    ('register', 'register', None, 'get', 0, 200),
+    ('logout', 'logout', 'cliente', 'get', 4, 200),
+    ('dashboard_cliente', 'dashboard_cliente', 'cliente', 'get', 14, 500),
+    ('dashboard_ong', 'dashboard_ong', 'ong', 'get', 12, 500),
+    ('dashboard_admin', 'dashboard_admin', 'staff', 'get', 19, 500),
+    ('consultas_lentas', 'consultas_lentas', 'staff', 'get', 2, 200),
+    ('doar_alimento', 'doar_alimento', 'cliente', 'get', 3, 200),
+    ('doar_alimento POST', 'doar_alimento', 'cliente', 'post', 10, 300),
+    ('doar_em_lote', 'doar_em_lote', 'cliente', 'get', 2, 200),
+    ('minhas_doacoes', 'minhas_doacoes', 'cliente', 'get', 4, 500),
+    ('gerenciar_doacoes_ong', 'gerenciar_doacoes_ong', 'ong', 'get', 7, 500),
+    ('atualizar_status_doacao POST', 'atualizar_status_doacao', 'ong', 'post', 12, 300),
+    ('gerenciar_necessidades_ong', 'gerenciar_necessidades_ong', 'ong', 'get', 6, 300),
+    ('adicionar_necessidade', 'adicionar_necessidade', 'ong', 'get', 3, 200),
+    ('importar_necessidades', 'importar_necessidades', 'ong', 'get', 3, 200),
+    ('editar_necessidade', 'editar_necessidade', 'ong', 'get', 6, 200),
+    ('excluir_necessidade POST', 'excluir_necessidade', 'ong', 'post', 6, 300),
+    ('ong_detalhes', 'ong_detalhes', 'cliente', 'get', 4, 200),
+    ('buscar_alimentos', 'buscar_alimentos', 'ong', 'get', 2, 100),
+    ('api_status', 'api_status', 'cliente', 'get', 6, 200),
+    ('api_sincronizar', 'api_sincronizar', 'cliente', 'get', 5, 500),
+    ('api_necessidades', 'api_necessidades', 'cliente', 'get', 3, 300),
+    ('api_minhas_doacoes', 'api_minhas_doacoes', 'cliente', 'get', 3, 300),
+    # Sob WSGI (o cliente de testes) o fluxo SSE responde 204; o fluxo em si é coberto por EventosAoVivoTests
+    ('eventos_ao_vivo', 'eventos_ao_vivo', 'cliente', 'get', 0, 100),
+]
+# GETs que gravam por natureza: o logout apaga a sessão
+GET_COM_ESCRITA = {'logout'}
+STATUS_POPULADOS = ('pendente', 'confirmada', 'em_transito', 'entregue', 'entregue', 'cancelada', 'expirada')
+
+
+@override_settings(
+    LIMITES_TAXA_ATIVO=False,
+    CONSULTAS_LENTAS={**settings.CONSULTAS_LENTAS, 'ativo': False},
+    # Releitura do carimbo do catálogo por tempo deixaria a contagem de consultas variável
+    CATALOGO={'intervalo_versao': 3600},
+)
+class OrcamentoViewsTests(TestCase):
+    """
+    Número exato de consultas e tempo máximo de cada view, em dois tamanhos de base.
+
+    A mesma contagem nos dois tamanhos (cerca de mil e de 16 mil doações)
+    mostra que ela não cresce com os dados (sem N+1). O log de eventos é
+    drenado com processar_eventos antes das medições, como em produção, e
+    cada view é medida na primeira requisição; GETs não podem gravar nada. O
+    tempo sempre vai para o relatório (ORCAMENTO_VIEWS['relatorio']), mas só
+    é verificado com ORCAMENTO_VIEWS['verificar_tempo'], para não depender da
+    máquina que roda a suíte.
+    """
+
+    def setUp(self):
+        self.usuarios = {
+            'cliente': User.objects.create_user(username='cliente', password='senha123'),
+            'ong': criar_ong(),
+            'staff': User.objects.create_user(username='staff', password='senha123', is_staff=True),
+        }
+        self.ong = self.usuarios['ong']
+        self.usuarios['ong'] = self.ong.user
+        self.outro_doador = User.objects.create_user(username='outro', password='senha123')
+        # O cliente é um entre muitos doadores: o histórico dele cresce bem menos que a base
+        self.doadores = [self.usuarios['cliente'], self.outro_doador] + User.objects.bulk_create([
+            User(username=f'doador{i}', password='!') for i in range(48)
+        ])
+        self.necessidades_livres = []
+        self.linhas = []
+
+    def popular(self, rodada, total_ongs, doacoes_por_necessidade):
+        """Cada rodada soma ONGs, alimentos, necessidades e doações em todos os status, parte delas arquivada"""
+        categoria, _ = CategoriaAlimento.objects.get_or_create(nome='Grãos e Cereais')
+        alimentos = [
+            Alimento.objects.create(nome=f'Alimento {rodada}-{i}', categoria=categoria, unidade_medida='kg')
+            for i in range(4)
+        ]
+        ongs = [self.ong] + [
+            criar_ong(f'ong_{rodada}_{i}', f'ONG {rodada}-{i}', f'{rodada:02d}.{i:03d}.000/0001-00')
+            for i in range(total_ongs)
+        ]
+        necessidades = NecessidadeAlimento.objects.bulk_create([
+            NecessidadeAlimento(ong=ong, alimento=alimento, quantidade_necessaria=100000, prioridade='alta')
+            for ong in ongs for alimento in alimentos
+        ])
+        doacoes = Doacao.objects.bulk_create([
+            Doacao(
+                doador=self.doadores[(necessidade.id + i) % len(self.doadores)], ong_id=necessidade.ong_id, alimento_id=necessidade.alimento_id,
+                necessidade=necessidade, quantidade=5, status=STATUS_POPULADOS[i % len(STATUS_POPULADOS)],
+            )
+            for necessidade in necessidades for i in range(doacoes_por_necessidade)
+        ])
+        eventos.registrar_criacoes(doacoes)
+        # As finalizadas dos outros doadores envelhecem e vão para o arquivo; as do cliente
+        # ficam recentes, nas janelas curtas do placar
+        antiga = timezone.now() - timedelta(days=200)
+        Doacao.objects.filter(alimento__in=alimentos, status__in=STATUS_FINALIZADOS).exclude(
+            doador=self.usuarios['cliente']
+        ).update(data_doacao=antiga, data_atualizacao=antiga)
+        self.necessidades_livres += [n for n in necessidades if n.ong_id == self.ong.id]
+        call_command('arquivar_doacoes', dias=90, stdout=StringIO())
+        # Estado que os processos em segundo plano mantêm: log drenado e catálogo carregado
+        call_command('processar_eventos', stdout=StringIO())
+        catalogo()
+
+    def preparar(self, nome, usuario):
+        """Faz o login e devolve (url, dados), com argumentos novos a cada chamada para as views que alteram dados"""
+        argumentos, dados = {}, {}
+        if nome in ('doar_alimento', 'editar_necessidade'):
+            argumentos = {'necessidade_id': self.necessidades_livres[-1].id}
+            dados = {'quantidade': '1'}
+        elif nome == 'excluir_necessidade':
+            argumentos = {'necessidade_id': self.necessidades_livres.pop(0).id}
+        elif nome == 'atualizar_status_doacao':
+            doacao = eventos.criar_doacao(
+                doador=self.outro_doador, ong=self.ong, alimento=self.necessidades_livres[-1].alimento, quantidade=1
+            )
+            argumentos, dados = {'doacao_id': doacao.id}, {'status': 'confirmada'}
+        elif nome == 'ong_detalhes':
+            argumentos = {'ong_id': self.ong.id}
+        elif nome == 'buscar_alimentos':
+            dados = {'q': 'alim'}
+        if usuario:
+            self.client.force_login(self.usuarios[usuario])
+        else:
+            self.client.logout()
+        return reverse(f'core:{nome}', kwargs=argumentos), dados
+
+    def medir(self):
+        tamanho = Doacao.objects.count() + DoacaoArquivada.objects.count()
+        config = settings.ORCAMENTO_VIEWS
+        for rotulo, nome, usuario, metodo, consultas, orcamento_ms in ORCAMENTOS:
+            url, dados = self.preparar(nome, usuario)
+            with self.subTest(rotulo, doacoes=tamanho), self.assertNumQueries(consultas) as capturadas:
+                inicio = time.perf_counter()
+                resposta = getattr(self.client, metodo)(url, dados)
+                duracao_ms = (time.perf_counter() - inicio) * 1000
+                self.linhas.append({
+                    'view': rotulo,
+                    'doacoes': tamanho,
+                    'status': resposta.status_code,
+                    'consultas': len(capturadas),
+                    'orcamento_consultas': consultas,
+                    'ms': round(duracao_ms, 1),
+                    'orcamento_ms': orcamento_ms * config['fator_tempo'],
+                })
+                self.assertLess(resposta.status_code, 400)
+                if metodo == 'get' and rotulo not in GET_COM_ESCRITA:
+                    escritas = [
+                        consulta['sql'] for consulta in capturadas.captured_queries
+                        if consulta['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+                    ]
+                    self.assertEqual(escritas, [])
+                if config['verificar_tempo']:
+                    self.assertLessEqual(duracao_ms, orcamento_ms * config['fator_tempo'])
+
+    def test_todas_as_urls_tem_orcamento(self):
+        from .urls import urlpatterns
+        self.assertEqual(
+            {padrao.name for padrao in urlpatterns},
+            {nome for _, nome, _, _, _, _ in ORCAMENTOS},
+        )
+
+    def test_consultas_constantes_e_tempo_dentro_do_orcamento(self):
+        try:
+            self.popular(1, 5, 40)
+            self.medir()
+            self.popular(2, 25, 150)
+            self.medir()
+        finally:
+            relatorio = Path(settings.ORCAMENTO_VIEWS['relatorio'])
+            relatorio.parent.mkdir(parents=True, exist_ok=True)
+            relatorio.write_text(json.dumps(self.linhas, indent=2, ensure_ascii=False), encoding='utf-8')
@@ -0,0 +1,22 @@
+"""
+Throttle do Django REST Framework baseado nos baldes de core.limites.
+
+Referenciado apenas por caminho em REST_FRAMEWORK, para que o DRF só seja
+importado quando uma view da API é usada.
+"""
+from rest_framework.throttling import BaseThrottle
+
+from . import limites
+
+
+class ThrottleBaldeTokens(BaseThrottle):
+    """Aplica o escopo 'api' de LIMITES_TAXA por IP e por usuário autenticado"""
+    escopo = 'api'
+
+    def allow_request(self, request, view):
+        conta = request.user.pk if request.user and request.user.is_authenticated else None
+        self.espera = limites.verificar(self.escopo, self.get_ident(request), conta)
+        return self.espera is None
+
+    def wait(self):
+        return self.espera
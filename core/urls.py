@@ -1,8 +1,23 @@
+from importlib import import_module
+
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
 from . import views
 
 app_name = 'core'
 
+
+def api(nome):
+    """View de core.api importada só na primeira requisição (evita carregar o DRF no boot)"""
+    # O DRF aplica a própria verificação de CSRF (SessionAuthentication)
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        return getattr(import_module('core.api'), nome)(request, *args, **kwargs)
+    view.__name__ = nome
+    return view
+
+
 urlpatterns = [
     # Autenticação
     path('', views.home, name='home'),
@@ -14,9 +29,11 @@ urlpatterns = [
     path('dashboard/cliente/', views.dashboard_cliente, name='dashboard_cliente'),
     path('dashboard/ong/', views.dashboard_ong, name='dashboard_ong'),
     path('dashboard/admin/', views.dashboard_admin, name='dashboard_admin'),
+    path('dashboard/admin/consultas-lentas/', views.consultas_lentas_admin, name='consultas_lentas'),
     
     # Doações
     path('doar/<int:necessidade_id>/', views.doar_alimento, name='doar_alimento'),
+    path('doar/lote/', views.doar_em_lote, name='doar_em_lote'),
     path('minhas-doacoes/', views.minhas_doacoes, name='minhas_doacoes'),
     
     # Gerenciamento ONG - Doações
@@ -26,12 +43,22 @@ urlpatterns = [
     # Gerenciamento ONG - Necessidades
     path('ong/gerenciar-necessidades/', views.gerenciar_necessidades_ong, name='gerenciar_necessidades_ong'),
     path('ong/adicionar-necessidade/', views.adicionar_necessidade, name='adicionar_necessidade'),
+    path('ong/importar-necessidades/', views.importar_necessidades, name='importar_necessidades'),
     path('ong/editar-necessidade/<int:necessidade_id>/', views.editar_necessidade, name='editar_necessidade'),
     path('ong/excluir-necessidade/<int:necessidade_id>/', views.excluir_necessidade, name='excluir_necessidade'),
     
     # ONGs
     path('ong/<int:ong_id>/', views.ong_detalhes, name='ong_detalhes'),
     
+    # Alimentos
+    path('alimentos/buscar/', views.buscar_alimentos, name='buscar_alimentos'),
+    
+    # Eventos ao vivo (SSE)
+    path('ao-vivo/', views.eventos_ao_vivo, name='eventos_ao_vivo'),
+    
     # API
-    path('api/status/', views.api_status, name='api_status'),
+    path('api/status/', api('api_status'), name='api_status'),
+    path('api/sincronizar/', api('api_sincronizar'), name='api_sincronizar'),
+    path('api/necessidades/', api('api_necessidades'), name='api_necessidades'),
+    path('api/minhas-doacoes/', api('api_minhas_doacoes'), name='api_minhas_doacoes'),
 ]
@@ -1,12 +1,26 @@
+import heapq
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, logout, authenticate
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import Count, Q, Sum, prefetch_related_objects
 from decimal import Decimal, InvalidOperation
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from .models import User, ONG, Alimento, NecessidadeAlimento, Doacao, CategoriaAlimento
+from .models import STATUS_FINALIZADOS, User, ONG, Alimento, NecessidadeAlimento, Doacao
+from .catalogo import catalogo
+from . import alocacao, ao_vivo, consultas_lentas, importacao, shards
+from .historico import historico_doacoes, contagem_status_historico
+from .consumidores import (
+    JANELAS_PLACAR, contagem_por_status, placar, posicao_no_placar,
+    resumo_tendencias, serie_diaria,
+)
+from .eventos import criar_doacao, alterar_status
+from .notificacoes import notificar_ong_nova_doacao
+from .limites import limitar_taxa, conta_do_formulario, conta_autenticada
 
 
 def home(request):
@@ -19,18 +33,20 @@ def home(request):
     return render(request, 'core/home.html')
 
 
-def login_view(request):
-    """View de login"""
-    if request.user.is_authenticated:
+@limitar_taxa('login', conta=conta_do_formulario('username'))
+async def login_view(request):
+    """View de login (assíncrona: o hash da senha é verificado fora do event loop)"""
+    usuario = await request.auser()
+    if usuario.is_authenticated:
         return redirect('core:home')
     
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
-        user = authenticate(request, username=username, password=password)
+        user = await aauthenticate(request, username=username, password=password)
         
         if user is not None:
-            login(request, user)
+            await alogin(request, user)
             messages.success(request, f'Bem-vindo, {user.first_name or user.username}!')
             
             # Redireciona baseado no tipo de usuário
@@ -41,9 +57,10 @@ def login_view(request):
         else:
             messages.error(request, 'Usuário ou senha inválidos.')
     
-    return render(request, 'core/login.html')
+    return await sync_to_async(render)(request, 'core/login.html')
 
 
+@limitar_taxa('cadastro')
 def register_view(request):
     """View de registro"""
     if request.user.is_authenticated:
@@ -96,11 +113,13 @@ def dashboard_cliente(request):
         return redirect('core:dashboard_ong')
     
     # Buscar todas as ONGs ativas
-    ongs = ONG.objects.filter(ativa=True).prefetch_related('necessidades__alimento')
+    # (a lista de ONGs só usa a contagem de necessidades)
+    ongs = ONG.objects.filter(ativa=True).prefetch_related('necessidades')
     
     # Filtros
     search = request.GET.get('search', '')
     categoria_id = request.GET.get('categoria', '')
+    ordenar = request.GET.get('ordenar', '')
     
     if search:
         ongs = ongs.filter(
@@ -112,30 +131,48 @@ def dashboard_cliente(request):
     necessidades = NecessidadeAlimento.objects.filter(
         ativa=True,
         ong__ativa=True
-    ).select_related('ong', 'alimento', 'alimento__categoria')
+    ).select_related('ong')
     
+    # Alimentos e categorias vêm do catálogo em memória, sem JOIN nem consulta extra
+    cat = catalogo()
     if categoria_id:
-        necessidades = necessidades.filter(alimento__categoria_id=categoria_id)
+        necessidades = necessidades.filter(
+            alimento_id__in=[a.id for a in cat.alimentos_da_categoria(categoria_id)]
+        )
     
     if search:
+        termo = search.casefold()
         necessidades = necessidades.filter(
             Q(ong__nome__icontains=search) |
-            Q(alimento__nome__icontains=search)
+            Q(alimento_id__in=[a.id for a in cat.alimentos if termo in a.nome.casefold()])
         )
     
+    # Ordenação pelas colunas de progresso calculadas no banco
+    if ordenar == 'quase_completas':
+        necessidades = necessidades.order_by('-percentual_recebido')
+    elif ordenar == 'mais_faltantes':
+        necessidades = necessidades.order_by('-quantidade_faltante')
+    elif ordenar == 'pouco_atendidas':
+        necessidades = necessidades.order_by('percentual_recebido')
+    
     # Minhas doações recentes
-    minhas_doacoes = Doacao.objects.filter(doador=request.user).select_related(
-        'ong', 'alimento'
-    )[:5]
+    minhas_doacoes = Doacao.objects.filter(doador=request.user).select_related('ong')[:5]
     
-    categorias = CategoriaAlimento.objects.all()
+    # Posição do doador nos placares de entregas (atualizados pelo processar_eventos)
+    minhas_posicoes = [
+        {'janela': janela, **posicao}
+        for janela in JANELAS_PLACAR
+        if (posicao := posicao_no_placar('doador', request.user.id, janela))
+    ]
     
     context = {
         'ongs': ongs,
         'necessidades': necessidades,
         'minhas_doacoes': minhas_doacoes,
-        'categorias': categorias,
+        'minhas_posicoes': minhas_posicoes,
+        'categorias': cat.categorias,
         'search': search,
+        'ordenar': ordenar,
     }
     return render(request, 'core/dashboard_cliente.html', context)
 
@@ -155,28 +192,33 @@ def dashboard_ong(request):
     # Necessidades da ONG
     necessidades = NecessidadeAlimento.objects.filter(ong=ong).select_related('alimento')
     
-    # Doações recebidas
-    doacoes_recebidas = Doacao.objects.filter(ong=ong).select_related(
-        'doador', 'alimento'
-    ).order_by('-data_doacao')[:10]
+    # Doações recebidas (tabela principal e arquivo)
+    doacoes_recebidas = historico_doacoes(10, ('doador', 'alimento'), ong=ong)
     
     # Estatísticas
-    total_doacoes = Doacao.objects.filter(ong=ong, status='entregue').count()
+    total_doacoes = contagem_status_historico(ong=ong)['entregue']
     total_alimentos = necessidades.aggregate(
         total=Sum('quantidade_recebida')
     )['total'] or 0
     
+    # Tendências da ONG, lidas dos rollups diários
+    tendencias = resumo_tendencias(ong)
+    serie_30_dias = serie_diaria(30, ong)
+    
     context = {
         'ong': ong,
         'necessidades': necessidades,
         'doacoes_recebidas': doacoes_recebidas,
         'total_doacoes': total_doacoes,
         'total_alimentos': total_alimentos,
+        'tendencias': tendencias,
+        'serie_30_dias': serie_30_dias,
     }
     return render(request, 'core/dashboard_ong.html', context)
 
 
 @login_required
+@limitar_taxa('doacao', conta=conta_autenticada)
 def doar_alimento(request, necessidade_id):
     """Realizar doação para uma necessidade específica"""
     if request.user.user_type != 'cliente':
@@ -198,15 +240,18 @@ def doar_alimento(request, necessidade_id):
             if quantidade <= 0:
                 raise ValueError()
             
-            # Criar doação
-            doacao = Doacao.objects.create(
-                doador=request.user,
-                ong=necessidade.ong,
-                alimento=necessidade.alimento,
-                quantidade=quantidade,
-                mensagem=mensagem,
-                status='pendente'
-            )
+            # Criar doação, o evento de criação e a notificação da ONG na mesma transação
+            with transaction.atomic():
+                doacao = criar_doacao(
+                    doador=request.user,
+                    ong=necessidade.ong,
+                    alimento=necessidade.alimento,
+                    necessidade=necessidade,
+                    quantidade=quantidade,
+                    mensagem=mensagem,
+                    status='pendente'
+                )
+                notificar_ong_nova_doacao.enfileirar(doacao.id)
             
             messages.success(
                 request,
@@ -224,15 +269,64 @@ def doar_alimento(request, necessidade_id):
     return render(request, 'core/doar_alimento.html', context)
 
 
+@login_required
+@limitar_taxa('doacao', conta=conta_autenticada)
+def doar_em_lote(request):
+    """Divide uma doação grande entre as necessidades ativas do alimento"""
+    if request.user.user_type != 'cliente':
+        messages.error(request, 'Apenas clientes podem fazer doações.')
+        return redirect('core:home')
+    
+    plano = None
+    sobra = None
+    dados = request.POST if request.method == 'POST' else {}
+    alimento = catalogo().alimento(dados.get('alimento'))
+    regiao = dados.get('regiao', '').strip()
+    
+    if request.method == 'POST':
+        try:
+            quantidade = Decimal(dados.get('quantidade', ''))
+            if quantidade <= 0 or alimento is None:
+                raise ValueError()
+        except (InvalidOperation, ValueError):
+            messages.error(request, 'Informe o alimento e uma quantidade válida.')
+        else:
+            if 'confirmar' in dados:
+                doacoes, sobra = alocacao.alocar(
+                    request.user, alimento.id, quantidade, regiao or None,
+                    mensagem=dados.get('mensagem', '')
+                )
+                if doacoes:
+                    messages.success(
+                        request,
+                        f'{len(doacoes)} doação(ões) de {alimento.nome} criada(s) para '
+                        f'{quantidade - sobra} {alimento.get_unidade_medida_display()}.'
+                    )
+                    return redirect('core:minhas_doacoes')
+                messages.error(request, 'Nenhuma necessidade ativa para este alimento no momento.')
+            else:
+                parcelas, sobra = alocacao.planejar(alimento.id, quantidade, regiao or None)
+                ongs = ONG.objects.in_bulk([parcela.ong_id for parcela in parcelas])
+                plano = [(ongs[parcela.ong_id], parcela) for parcela in parcelas]
+    
+    context = {
+        'alimentos': catalogo().alimentos,
+        'alimento': alimento,
+        'regiao': regiao,
+        'dados': dados,
+        'plano': plano,
+        'sobra': sobra,
+    }
+    return render(request, 'core/doar_em_lote.html', context)
+
+
 @login_required
 def minhas_doacoes(request):
     """Ver histórico de doações do cliente"""
     if request.user.user_type != 'cliente':
         return redirect('core:dashboard_ong')
     
-    doacoes = Doacao.objects.filter(doador=request.user).select_related(
-        'ong', 'alimento'
-    ).order_by('-data_doacao')
+    doacoes = historico_doacoes(select_related=('ong', 'alimento'), doador=request.user)
     
     context = {
         'doacoes': doacoes,
@@ -269,44 +363,55 @@ def atualizar_status_doacao(request, doacao_id):
         messages.error(request, 'Você precisa ter um perfil de ONG cadastrado.')
         return redirect('core:home')
     
-    doacao = get_object_or_404(Doacao, id=doacao_id, ong=ong)
+    # A necessidade vem no mesmo SELECT da doação, só para montar a mensagem;
+    # ong.doacoes_recebidas lê do shard da ONG
+    doacao = get_object_or_404(ong.doacoes_recebidas.select_related('necessidade'), id=doacao_id)
     
     if request.method == 'POST':
         novo_status = request.POST.get('status')
         
         if novo_status in ['confirmada', 'em_transito', 'entregue', 'cancelada']:
-            status_anterior = doacao.status
-            doacao.status = novo_status
-            doacao.save()
+            alimento = doacao.alimento_catalogo
+            
+            with transaction.atomic(using=doacao._state.db):
+                # Relê o status com a linha travada: uma expiração concorrente não pode ser sobrescrita
+                doacao.status = ong.doacoes_recebidas.select_for_update().values_list(
+                    'status', flat=True
+                ).get(pk=doacao.pk)
+                status_anterior = doacao.status
+                
+                # Atualizar quantidade recebida quando confirmada ou entregue:
+                # um único UPDATE pela chave primária, que também encerra a necessidade completada
+                atualizadas = 0
+                if status_anterior not in STATUS_FINALIZADOS:
+                    alterar_status(doacao, novo_status)
+                    if novo_status in ['confirmada', 'entregue'] and status_anterior == 'pendente':
+                        atualizadas = doacao.registrar_recebimento()
             
-            # Atualizar quantidade recebida quando confirmada ou entregue
-            if novo_status in ['confirmada', 'entregue'] and status_anterior == 'pendente':
-                try:
-                    necessidade = NecessidadeAlimento.objects.get(
-                        ong=ong,
-                        alimento=doacao.alimento
+            if status_anterior in STATUS_FINALIZADOS:
+                messages.error(
+                    request,
+                    f'Esta doação já está {doacao.get_status_display().lower()}; o status não pode mais ser alterado.'
+                )
+                return redirect('core:dashboard_ong')
+            
+            necessidade = doacao.necessidade
+            if atualizadas and necessidade is not None:
+                recebido = necessidade.quantidade_recebida + doacao.quantidade
+                if recebido >= necessidade.quantidade_necessaria:
+                    messages.success(
+                        request,
+                        f'🎉 Parabéns! A necessidade de {alimento.nome} foi completada! '
+                        f'Total recebido: {recebido} {alimento.get_unidade_medida_display()}'
+                    )
+                else:
+                    percentual = recebido * 100 / necessidade.quantidade_necessaria
+                    messages.success(
+                        request,
+                        f'Doação {doacao.get_status_display().lower()}! Quantidade atualizada: '
+                        f'+{doacao.quantidade} {alimento.get_unidade_medida_display()} '
+                        f'({percentual:.0f}% da meta)'
                     )
-                    necessidade.quantidade_recebida += doacao.quantidade
-                    necessidade.save()
-                    
-                    # Verificar se a necessidade foi completada
-                    if necessidade.quantidade_recebida >= necessidade.quantidade_necessaria:
-                        necessidade.ativa = False
-                        necessidade.save()
-                        messages.success(
-                            request,
-                            f'🎉 Parabéns! A necessidade de {doacao.alimento.nome} foi completada! '
-                            f'Total recebido: {necessidade.quantidade_recebida} {doacao.alimento.get_unidade_medida_display()}'
-                        )
-                    else:
-                        messages.success(
-                            request,
-                            f'Doação {doacao.get_status_display().lower()}! Quantidade atualizada: '
-                            f'+{doacao.quantidade} {doacao.alimento.get_unidade_medida_display()} '
-                            f'({necessidade.percentual_recebido:.0f}% da meta)'
-                        )
-                except NecessidadeAlimento.DoesNotExist:
-                    messages.success(request, f'Status atualizado para: {doacao.get_status_display()}')
             else:
                 messages.success(request, f'Status atualizado para: {doacao.get_status_display()}')
         else:
@@ -365,7 +470,9 @@ def adicionar_necessidade(request):
         observacoes = request.POST.get('observacoes', '')
         
         try:
-            alimento = Alimento.objects.get(id=alimento_id)
+            alimento = catalogo().alimento(alimento_id)
+            if alimento is None:
+                raise Alimento.DoesNotExist
             
             # Converter e validar quantidade
             quantidade_dec = Decimal(str(quantidade_str))
@@ -373,17 +480,16 @@ def adicionar_necessidade(request):
                 messages.error(request, 'A quantidade deve ser maior que zero.')
                 return render(request, 'core/adicionar_necessidade.html', {
                     'ong': ong,
-                    'alimentos': Alimento.objects.all().select_related('categoria').order_by('categoria__nome', 'nome'),
-                    'categorias': CategoriaAlimento.objects.all(),
+                    'alimento_escolhido': alimento,
                 })
             
             # Verificar se já existe necessidade ativa para este alimento
-            if NecessidadeAlimento.objects.filter(ong=ong, alimento=alimento, ativa=True).exists():
+            if NecessidadeAlimento.objects.filter(ong=ong, alimento_id=alimento.id, ativa=True).exists():
                 messages.error(request, f'Já existe uma necessidade ativa para {alimento.nome}.')
             else:
                 NecessidadeAlimento.objects.create(
                     ong=ong,
-                    alimento=alimento,
+                    alimento_id=alimento.id,
                     quantidade_necessaria=quantidade_dec,
                     prioridade=prioridade,
                     observacoes=observacoes,
@@ -397,17 +503,74 @@ def adicionar_necessidade(request):
         except (InvalidOperation, TypeError, ValueError):
             messages.error(request, 'Quantidade inválida.')
     
-    alimentos = Alimento.objects.all().select_related('categoria').order_by('categoria__nome', 'nome')
-    categorias = CategoriaAlimento.objects.all()
-    
+    # O alimento é escolhido pelo autocompletar (buscar_alimentos): a página não lista o catálogo
     context = {
         'ong': ong,
-        'alimentos': alimentos,
-        'categorias': categorias,
     }
     return render(request, 'core/adicionar_necessidade.html', context)
 
 
+@login_required
+def buscar_alimentos(request):
+    """Autocompletar de alimentos: ?q=<prefixo>, pelo índice em memória do catálogo"""
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), 50)
+    except ValueError:
+        return HttpResponseBadRequest('Limite inválido.')
+    
+    resultados = [
+        {
+            'id': alimento.id,
+            'nome': alimento.nome,
+            'categoria': alimento.categoria.nome if alimento.categoria else '',
+            'unidade_medida': alimento.unidade_medida,
+            'unidade': alimento.get_unidade_medida_display(),
+        }
+        for alimento in catalogo().buscar_alimentos(request.GET.get('q', ''), limite)
+    ]
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def importar_necessidades(request):
+    """Importar necessidades em massa a partir de um arquivo CSV ou XLSX"""
+    if request.user.user_type != 'ong':
+        return redirect('core:dashboard_cliente')
+    
+    try:
+        ong = request.user.ong_profile
+    except ONG.DoesNotExist:
+        messages.error(request, 'Você precisa ter um perfil de ONG cadastrado.')
+        return redirect('core:home')
+    
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            messages.error(request, 'Selecione um arquivo para importar.')
+        else:
+            try:
+                resultado = importacao.importar_necessidades(ong, importacao.ler_arquivo(arquivo, arquivo.name))
+            except importacao.ErroImportacao as erro:
+                messages.error(request, str(erro))
+            else:
+                if resultado.importadas:
+                    messages.success(
+                        request,
+                        f'{resultado.criadas} necessidade(s) criada(s) e {resultado.atualizadas} atualizada(s).'
+                    )
+                if resultado.erros:
+                    messages.warning(request, f'{len(resultado.erros)} linha(s) não importada(s).')
+    
+    context = {
+        'ong': ong,
+        'resultado': resultado,
+        # Relatório limitado: um arquivo todo errado não gera uma página enorme
+        'erros': resultado.erros[:200] if resultado else [],
+    }
+    return render(request, 'core/importar_necessidades.html', context)
+
+
 @login_required
 def editar_necessidade(request, necessidade_id):
     """Editar necessidade existente"""
@@ -488,18 +651,16 @@ def gerenciar_doacoes_ong(request):
     # Filtros
     status_filter = request.GET.get('status', '')
     
-    doacoes = Doacao.objects.filter(ong=ong).select_related('doador', 'alimento').order_by('-data_doacao')
-    
+    filtros = {'ong': ong}
     if status_filter:
-        doacoes = doacoes.filter(status=status_filter)
+        filtros['status'] = status_filter
+    doacoes = historico_doacoes(select_related=('doador', 'alimento'), **filtros)
     
-    # Estatísticas por status
+    # Estatísticas por status (um GROUP BY por tabela)
+    por_status = contagem_status_historico(ong=ong)
     stats = {
-        'pendente': Doacao.objects.filter(ong=ong, status='pendente').count(),
-        'confirmada': Doacao.objects.filter(ong=ong, status='confirmada').count(),
-        'em_transito': Doacao.objects.filter(ong=ong, status='em_transito').count(),
-        'entregue': Doacao.objects.filter(ong=ong, status='entregue').count(),
-        'cancelada': Doacao.objects.filter(ong=ong, status='cancelada').count(),
+        status: por_status[status]
+        for status in ('pendente', 'confirmada', 'em_transito', 'entregue', 'cancelada')
     }
     
     context = {
@@ -511,6 +672,15 @@ def gerenciar_doacoes_ong(request):
     return render(request, 'core/gerenciar_doacoes.html', context)
 
 
+def _janela_placar(request):
+    """Janela do placar pedida em ?janela=, ou todo o período"""
+    try:
+        janela = int(request.GET.get('janela', 0))
+    except ValueError:
+        return 0
+    return janela if janela in JANELAS_PLACAR else 0
+
+
 @login_required
 def dashboard_admin(request):
     """Dashboard administrativo completo"""
@@ -518,9 +688,6 @@ def dashboard_admin(request):
         messages.error(request, 'Acesso negado. Apenas administradores.')
         return redirect('core:home')
     
-    from django.db.models import Count, Sum, Q
-    from datetime import datetime, timedelta
-    
     # Estatísticas gerais
     total_usuarios = User.objects.count()
     total_clientes = User.objects.filter(user_type='cliente').count()
@@ -528,41 +695,71 @@ def dashboard_admin(request):
     total_ongs = ONG.objects.count()
     ongs_ativas = ONG.objects.filter(ativa=True).count()
     
-    total_alimentos = Alimento.objects.count()
-    total_categorias = CategoriaAlimento.objects.count()
-    
-    total_necessidades = NecessidadeAlimento.objects.count()
-    necessidades_ativas = NecessidadeAlimento.objects.filter(ativa=True).count()
-    necessidades_completadas = NecessidadeAlimento.objects.filter(ativa=False).count()
-    
-    total_doacoes = Doacao.objects.count()
-    doacoes_pendentes = Doacao.objects.filter(status='pendente').count()
-    doacoes_confirmadas = Doacao.objects.filter(status='confirmada').count()
-    doacoes_em_transito = Doacao.objects.filter(status='em_transito').count()
-    doacoes_entregues = Doacao.objects.filter(status='entregue').count()
-    doacoes_canceladas = Doacao.objects.filter(status='cancelada').count()
-    
-    # Doações dos últimos 7 dias
-    sete_dias_atras = datetime.now() - timedelta(days=7)
-    doacoes_recentes = Doacao.objects.filter(data_doacao__gte=sete_dias_atras).count()
-    
-    # Top 5 ONGs que mais receberam doações
-    top_ongs = ONG.objects.annotate(
-        num_doacoes=Count('doacoes_recebidas', filter=Q(doacoes_recebidas__status='entregue'))
-    ).order_by('-num_doacoes')[:5]
-    
-    # Top 5 doadores
-    top_doadores = User.objects.filter(user_type='cliente').annotate(
-        num_doacoes=Count('doacoes_realizadas', filter=Q(doacoes_realizadas__status='entregue'))
-    ).order_by('-num_doacoes')[:5]
-    
-    # Top 5 alimentos mais doados
-    top_alimentos = Alimento.objects.annotate(
-        total_doacoes=Count('doacoes', filter=Q(doacoes__status='entregue'))
-    ).order_by('-total_doacoes')[:5]
+    total_alimentos = len(catalogo().alimentos)
+    total_categorias = len(catalogo().categorias)
+    
+    # Necessidades ficam nos shards: uma agregação por shard, em paralelo, somadas aqui
+    contagens = shards.em_paralelo(lambda alias: NecessidadeAlimento.objects.using(alias).aggregate(
+        total=Count('id'), ativas=Count('id', filter=Q(ativa=True))
+    ))
+    total_necessidades = sum(contagem['total'] for contagem in contagens)
+    necessidades_ativas = sum(contagem['ativas'] for contagem in contagens)
+    necessidades_completadas = total_necessidades - necessidades_ativas
+    
+    # Contadores e rollups que o processar_eventos mantém a partir do log de eventos (só leitura)
+    por_status = contagem_por_status()
+    total_doacoes = sum(por_status.values())
+    doacoes_pendentes = por_status.get('pendente', 0)
+    doacoes_confirmadas = por_status.get('confirmada', 0)
+    doacoes_em_transito = por_status.get('em_transito', 0)
+    doacoes_entregues = por_status.get('entregue', 0)
+    doacoes_canceladas = por_status.get('cancelada', 0)
+    
+    # Tendências lidas dos rollups diários
+    tendencias = resumo_tendencias()
+    serie_30_dias = serie_diaria(30)
+    doacoes_recentes = tendencias[0]['doacoes']
+    
+    # Top 5 ONGs, doadores e alimentos por doações entregues (incluindo as arquivadas),
+    # lidos dos placares que o processar_eventos mantém a partir do log de eventos.
+    # Removidos desde a última rodada ainda podem aparecer no placar: ficam de fora
+    janela_placar = _janela_placar(request)
+    ranking_ongs = placar('ong', janela_placar)
+    ongs_por_id = ONG.objects.in_bulk([ong_id for ong_id, _, _ in ranking_ongs])
+    top_ongs = []
+    for ong_id, total, _ in ranking_ongs:
+        ong = ongs_por_id.get(ong_id)
+        if ong is None:
+            continue
+        ong.num_doacoes = total
+        top_ongs.append(ong)
+    
+    ranking_doadores = placar('doador', janela_placar)
+    doadores_por_id = User.objects.in_bulk([doador_id for doador_id, _, _ in ranking_doadores])
+    top_doadores = []
+    for doador_id, total, _ in ranking_doadores:
+        doador = doadores_por_id.get(doador_id)
+        if doador is None:
+            continue
+        doador.num_doacoes = total
+        top_doadores.append(doador)
+    
+    top_alimentos = [
+        {'nome': alimento.nome, 'total_doacoes': total}
+        for alimento_id, total, _ in placar('alimento', janela_placar)
+        if (alimento := catalogo().alimento(alimento_id)) is not None
+    ]
+    
+    # Necessidades perto da meta (índice em ativa + percentual_recebido): top 5 de cada shard, intercalados
+    necessidades_quase_completas = list(heapq.merge(
+        *shards.em_paralelo(lambda alias: list(NecessidadeAlimento.objects.using(alias).quase_completas()[:5])),
+        key=lambda necessidade: necessidade.percentual_recebido,
+        reverse=True,
+    ))[:5]
+    prefetch_related_objects(necessidades_quase_completas, 'ong', 'alimento')
     
     # Últimas atividades
-    ultimas_doacoes = Doacao.objects.select_related('doador', 'ong', 'alimento').order_by('-data_doacao')[:10]
+    ultimas_doacoes = historico_doacoes(10, ('doador', 'ong', 'alimento'))
     ultimos_usuarios = User.objects.order_by('-date_joined')[:10]
     
     context = {
@@ -583,22 +780,64 @@ def dashboard_admin(request):
         'doacoes_entregues': doacoes_entregues,
         'doacoes_canceladas': doacoes_canceladas,
         'doacoes_recentes': doacoes_recentes,
+        'tendencias': tendencias,
+        'serie_30_dias': serie_30_dias,
+        'janelas_placar': JANELAS_PLACAR,
+        'janela_placar': janela_placar,
         'top_ongs': top_ongs,
         'top_doadores': top_doadores,
         'top_alimentos': top_alimentos,
+        'necessidades_quase_completas': necessidades_quase_completas,
         'ultimas_doacoes': ultimas_doacoes,
         'ultimos_usuarios': ultimos_usuarios,
     }
     return render(request, 'core/dashboard_admin.html', context)
 
 
-@api_view(['GET'])
-def api_status(request):
-    """Endpoint de API para verificar o status do sistema"""
-    return Response({
-        'status': 'online',
-        'message': 'Alimenta+ API está funcionando!',
-        'total_ongs': ONG.objects.filter(ativa=True).count(),
-        'total_necessidades': NecessidadeAlimento.objects.filter(ativa=True).count(),
-        'total_doacoes': Doacao.objects.count(),
-    })
+@login_required
+def consultas_lentas_admin(request):
+    """Consultas lentas registradas por este processo (somente staff)"""
+    if not request.user.is_staff:
+        messages.error(request, 'Acesso negado. Apenas administradores.')
+        return redirect('core:home')
+    
+    registro = consultas_lentas.registro()
+    context = {
+        'formas': registro.formas_por_tempo(),
+        'recentes': registro.recentes()[:100],
+        'limite_ms': settings.CONSULTAS_LENTAS['limite_ms'],
+    }
+    return render(request, 'core/consultas_lentas.html', context)
+
+
+async def eventos_ao_vivo(request):
+    """Fluxo SSE com o progresso das necessidades e as doações da ONG (requer ASGI)"""
+    if not ao_vivo.disponivel(request):
+        # Sob WSGI o fluxo sem fim prenderia uma thread do servidor para sempre;
+        # com 204 o EventSource desiste em vez de reconectar
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    
+    canais = [canal for canal in request.GET.get('canais', '').split(',') if canal]
+    if not canais or len(canais) > 10 or not all(ao_vivo.CANAL_VALIDO.match(canal) for canal in canais):
+        return HttpResponseBadRequest('Canais inválidos.')
+    
+    # Doações são privadas: só a própria ONG acompanha as suas
+    privados = {canal for canal in canais if canal.startswith('doacoes:')}
+    if privados:
+        ong_id = await ONG.objects.filter(user=user).values_list('id', flat=True).afirst()
+        if privados != {f'doacoes:{ong_id}'}:
+            return HttpResponseForbidden()
+    
+    ultimo_id = request.headers.get('Last-Event-ID', '')
+    resposta = StreamingHttpResponse(
+        ao_vivo.fluxo(canais, int(ultimo_id) if ultimo_id.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    resposta['Cache-Control'] = 'no-cache'
+    # Impede que proxies (nginx) acumulem o fluxo em buffer
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
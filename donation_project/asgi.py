@@ -2,6 +2,8 @@
 ASGI config for donation_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Os eventos ao vivo (core.ao_vivo, /ao-vivo/) precisam deste ponto de entrada,
+por exemplo: uvicorn donation_project.asgi:application
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
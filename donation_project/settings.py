@@ -55,6 +55,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Depois da autenticação: o gatilho por cabeçalho é restrito a staff
+    'core.perfilamento.PerfilamentoMiddleware',
+    'core.consultas_lentas.ConsultasLentasMiddleware',
 ]
 
 ROOT_URLCONF = 'donation_project.urls'
@@ -69,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.ao_vivo.contexto',
             ],
         },
     },
@@ -87,6 +91,15 @@ DATABASES = {
     }
 }
 
+# Shards por ONG (core.shards): aliases de DATABASES com necessidades, doações e eventos.
+# Vazio: tudo em 'default'. Cada shard é migrado com `manage.py migrate --database <alias>`.
+# Ainda não pode ser preenchido: parte das telas só lê de 'default', e o projeto se recusa a
+# subir com SHARDS preenchido (core.shards.recusar_shards_ativos).
+# Ex.: SHARDS = ['shard_0', 'shard_1'] e
+#      DATABASES['shard_0'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'shard_0.sqlite3'}
+SHARDS = []
+DATABASE_ROUTERS = ['core.shards.RoteadorShards']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,11 +150,112 @@ CORS_ALLOWED_ORIGINS = [
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
 
+# Autenticação: no login assíncrono o hash da senha roda em um pool, fora do event loop
+AUTHENTICATION_BACKENDS = ['core.autenticacao.BackendHashEmPool']
+
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2ConfiguravelHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Alterar as iterações regrava o hash de cada usuário no próximo login
+SENHAS_PBKDF2_ITERACOES = 1_000_000
+SENHAS_POOL_TIPO = 'threads'  # 'threads' ou 'processos'
+SENHAS_POOL_TAMANHO = 4
+
 # Login URLs
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Django REST Framework
+REST_FRAMEWORK = {
+    # orjson quando instalado; sem ele, o mesmo resultado do JSONRenderer padrão
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderizadores.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ThrottleBaldeTokens',
+    ],
+}
+
+# Limites de taxa (core.limites): escopo -> dimensão -> (capacidade, tokens por segundo)
+LIMITES_TAXA_ATIVO = True
+LIMITES_TAXA = {
+    'login': {'ip': (10, 10 / 60), 'conta': (5, 5 / 300)},
+    'cadastro': {'ip': (5, 5 / 600)},
+    'doacao': {'ip': (30, 30 / 60), 'conta': (10, 10 / 60)},
+    'api': {'ip': (120, 2), 'conta': (120, 2)},
+}
+
+# Email
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Alimenta+ <nao-responda@alimentamais.org>'
+
+# Fila de tarefas em segundo plano (manage.py processar_tarefas)
+TAREFAS_CONCORRENCIA = 4
+TAREFAS_BACKOFF_BASE = 10  # segundos; dobra a cada nova tentativa
+TAREFAS_TIMEOUT = 600  # segundos até uma tarefa em execução ser considerada travada
+
+# Arquivamento de doações finalizadas (manage.py arquivar_doacoes)
+ARQUIVO_DOACOES_DIAS = 90
+
+# Expiração de doações pendentes que a ONG nunca confirmou (manage.py expirar_doacoes)
+EXPIRACAO_DOACOES_DIAS = 30
+
+# Perfilamento sob demanda (core.perfilamento): fração amostrada ou cabeçalho enviado por staff
+PERFILAMENTO = {
+    'ativo': True,
+    'amostragem': 0.0,  # ex.: 0.001 perfila 1 em cada 1000 requisições
+    'cabecalho': 'X-Perfilar',
+    'diretorio': BASE_DIR / 'perfis',
+    'max_arquivos': 50,
+    'top': 40,
+}
+
+# Catálogo de alimentos em memória (core.catalogo)
+CATALOGO = {
+    'intervalo_versao': 2.0,  # segundos entre leituras do carimbo de versão no banco
+}
+
+# Log de consultas lentas (core.consultas_lentas)
+CONSULTAS_LENTAS = {
+    'ativo': True,
+    'limite_ms': 100,
+    'max_ocorrencias': 500,  # ocorrências recentes mantidas em memória por processo
+    'max_formas': 200,
+    'arquivo': BASE_DIR / 'logs' / 'consultas_lentas.jsonl',
+    'max_bytes': 5 * 1024 * 1024,
+    'backups': 3,
+}
+
+# Eventos ao vivo por SSE (core.ao_vivo); exigem um servidor ASGI (donation_project.asgi)
+AO_VIVO = {
+    'intervalo_consulta': 2.0,  # segundos entre leituras do log quando nenhum evento local acorda o leitor
+    'heartbeat': 15,
+    'max_fila': 100,  # mensagens pendentes por conexão antes de derrubá-la
+    'max_reenvio': 200,
+    'reconexao_ms': 3000,
+}
+
+# Sincronização incremental da API (core.sincronizacao)
+SINCRONIZACAO = {
+    'limite': 500,  # linhas por recurso em cada resposta
+    'margem_segundos': 5,  # o cursor fica esse tempo atrás do relógio: releitura em vez de perda
+}
+
+# Testes de orçamento das views (core.tests.OrcamentoViewsTests)
+ORCAMENTO_VIEWS = {
+    'relatorio': BASE_DIR / 'logs' / 'orcamento_views.json',
+    'verificar_tempo': False,  # tempos só no relatório; ligue em máquinas dedicadas
+    'fator_tempo': 1.0,  # multiplica os orçamentos de tempo em máquinas mais lentas
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 